@@ -0,0 +1,372 @@
+"""
+Benchmark the DICOM viewer pipeline on synthetic data
+
+Generates reproducible DICOM folders (single-frame CT, an RLE compressed
+multi-frame file and files with large private tags), then times loading,
+tag extraction, anonymization, thumbnail creation and image rendering
+under an offscreen Qt platform. Each stage reports wall time, the peak
+RSS sampled while it ran and how far that peak rose above the RSS at
+its start, and traced Python allocations.
+
+    python benchmark_viewer.py --output results.json
+    python benchmark_viewer.py --baseline results.json --tolerance 0.2
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+import argparse
+import tempfile
+import tracemalloc
+import importlib.util
+from collections import OrderedDict
+
+# Qt must not try to open a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+import pydicom
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, RLELossless, generate_uid
+
+VIEWER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dicom_viewer (5).py')
+SCENARIOS = ['ct', 'multiframe', 'private']
+
+
+def load_viewer_module(path=VIEWER_PATH):
+    """
+    Import the viewer script, whose file name is not a valid module name
+    """
+    spec = importlib.util.spec_from_file_location('dicom_viewer', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_dataset(rng, rows, columns, series_uid, study_uid, instance_number, frames=1):
+    """
+    Create a CT-like dataset with random 12-bit pixels
+    """
+    ds = Dataset()
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.MediaStorageSOPClassUID = '1.2.840.10008.5.1.4.1.1.2'
+    ds.file_meta.MediaStorageSOPInstanceUID = generate_uid(entropy_srcs=[series_uid, str(instance_number)])
+    ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds.SOPClassUID = ds.file_meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
+    ds.StudyInstanceUID = study_uid
+    ds.SeriesInstanceUID = series_uid
+    ds.PatientName = 'Benchmark^Patient'
+    ds.PatientID = 'BENCH0001'
+    ds.PatientBirthDate = '19700101'
+    ds.ReferringPhysicianName = 'Benchmark^Physician'
+    ds.StudyDescription = 'Synthetic benchmark study'
+    ds.Modality = 'CT'
+    ds.InstanceNumber = instance_number
+    ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+    ds.ImagePositionPatient = [0, 0, float(instance_number)]
+    ds.PixelSpacing = [0.7, 0.7]
+    ds.SliceThickness = 1.0
+    ds.RescaleSlope = 1
+    ds.RescaleIntercept = -1024
+    ds.WindowCenter = 40
+    ds.WindowWidth = 400
+
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = 'MONOCHROME2'
+    ds.Rows = rows
+    ds.Columns = columns
+    ds.BitsAllocated = 16
+    ds.BitsStored = 12
+    ds.HighBit = 11
+    ds.PixelRepresentation = 0
+    shape = (frames, rows, columns) if frames > 1 else (rows, columns)
+    if frames > 1:
+        ds.NumberOfFrames = frames
+    # Smooth gradient plus noise, so compressed data is not trivially small
+    gradient = np.linspace(0, 2047, columns, dtype=np.float32)
+    pixels = gradient + rng.normal(0, 60, size=shape).astype(np.float32)
+    ds.PixelData = np.clip(pixels, 0, 4095).astype(np.uint16).tobytes()
+    return ds
+
+
+def save(ds, path):
+    try:
+        # pydicom >= 3
+        ds.save_as(path, enforce_file_format=True)
+    except TypeError:
+        ds.is_little_endian = True
+        ds.is_implicit_VR = False
+        ds.save_as(path, write_like_original=False)
+
+
+def generate_folder(root, scenario, scale=1.0, seed=0):
+    """
+    Write one synthetic scenario folder
+
+    Args:
+        root (str): Parent directory
+        scenario (str): 'ct', 'multiframe' or 'private'
+        scale (float): Multiplier for the number of images
+        seed (int): Random seed, the same seed gives the same files
+
+    Returns:
+        str: Path of the scenario folder
+    """
+    rng = np.random.default_rng(seed)
+    folder = os.path.join(root, scenario)
+    os.makedirs(folder, exist_ok=True)
+    study_uid = generate_uid(entropy_srcs=['benchmark', scenario])
+    series_uid = generate_uid(entropy_srcs=['benchmark', scenario, 'series'])
+
+    if scenario == 'ct':
+        for i in range(max(1, int(120 * scale))):
+            ds = make_dataset(rng, 512, 512, series_uid, study_uid, i + 1)
+            save(ds, os.path.join(folder, f"ct_{i:04d}.dcm"))
+
+    elif scenario == 'multiframe':
+        ds = make_dataset(rng, 256, 256, series_uid, study_uid, 1, frames=max(2, int(100 * scale)))
+        ds.compress(RLELossless)
+        save(ds, os.path.join(folder, 'multiframe.dcm'))
+
+    elif scenario == 'private':
+        for i in range(max(1, int(20 * scale))):
+            ds = make_dataset(rng, 256, 256, series_uid, study_uid, i + 1)
+            block = ds.private_block(0x0041, 'BENCHMARK', create=True)
+            # A large binary blob and many small text values
+            block.add_new(0x00, 'OB', rng.integers(0, 256, 8 * 1024 * 1024, dtype=np.uint8).tobytes())
+            for element in range(1, 255):
+                block.add_new(element, 'LO', f"private value {element}")
+            save(ds, os.path.join(folder, f"private_{i:04d}.dcm"))
+
+    else:
+        raise ValueError(f"Unknown scenario: {scenario}")
+    return folder
+
+
+def current_rss_mb():
+    """
+    Current resident set size of this process, in MB
+
+    The lifetime peak from getrusage only grows, so every stage after the
+    most expensive one would report the same value.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return float('nan')
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+class RssSampler:
+    """
+    Track the highest RSS seen while a block of code runs
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.baseline = self.peak = float('nan')
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.baseline = self.peak = current_rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+
+def measure(stage, repeat):
+    """
+    Run a stage several times for timing, then once more under tracemalloc
+
+    Returns:
+        dict: Median and best time, RSS peak and rise during the timed
+        runs, and traced allocations
+    """
+    times = []
+    with RssSampler() as rss:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            stage()
+            times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    stage()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'median_s': float(np.median(times)),
+        'best_s': min(times),
+        'peak_rss_mb': rss.peak,
+        'rss_growth_mb': rss.peak - rss.baseline,
+        'alloc_peak_mb': peak / (1024 * 1024),
+        'alloc_retained_mb': current / (1024 * 1024),
+    }
+
+
+def run_scenario(module, app, folder, repeat, scenario=None):
+    """
+    Benchmark every stage on one folder
+
+    The multi-frame scenario is opened with load_dicom_file, like the
+    viewer's multi-frame action, so every frame is an image of its own.
+
+    Returns:
+        OrderedDict: Stage name -> measurements
+    """
+    viewer = module.DicomFolderViewer()
+    handler = viewer.dicom_handler
+    engine = module.ThumbnailEngine(200)
+
+    if scenario == 'multiframe':
+        load_stage = 'load_dicom_file'
+
+        def load():
+            handler.load_dicom_file(os.path.join(folder, 'multiframe.dcm'))
+    else:
+        load_stage = 'load_dicom_folder'
+
+        def load():
+            handler.load_dicom_folder(folder)
+
+    def tags():
+        for index in range(handler.image_count()):
+            handler.get_dicom_tags(index)
+
+    def anonymize():
+        handler.anonymize_folder('BENCH')
+
+    def thumbnails():
+        for index in range(handler.image_count()):
+            frame_index = handler.frame_map[index][1]
+            engine.from_dataset(handler.get_dataset(index), frame_index,
+                                decode=lambda _, index=index: handler.decode_image(index))
+
+    def render():
+        # Cold caches, so each image is decoded, windowed and drawn
+        handler.frame_cache.clear()
+        handler.display_pipeline.clear()
+        # Sets up the slider range for the loaded images
+        viewer.show_loaded_files()
+        for index in range(handler.image_count()):
+            viewer.image_slider.setValue(index)
+            viewer.update_image()
+            viewer.image_view.viewport().repaint()
+            app.processEvents()
+
+    stages = OrderedDict([
+        (load_stage, load),
+        ('get_dicom_tags', tags),
+        ('anonymize_folder', anonymize),
+        ('thumbnails', thumbnails),
+        ('update_image', render),
+    ])
+
+    results = OrderedDict()
+    for name, stage in stages.items():
+        if name != load_stage and not handler.image_count():
+            load()
+        results[name] = measure(stage, repeat)
+    # Let the tag worker finish before the viewer and its thread pool are
+    # deleted, the pool would wait for it while holding the GIL
+    viewer.tags_model.thread_pool.waitForDone()
+    app.processEvents()
+    viewer.close()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    List stages whose median time regressed past the tolerance
+    """
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, values in stages.items():
+            reference = baseline.get(scenario, {}).get(stage)
+            if reference is None:
+                continue
+            limit = reference['median_s'] * (1 + tolerance)
+            if values['median_s'] > limit:
+                regressions.append(f"{scenario}/{stage}: {values['median_s']:.3f}s "
+                                   f"(baseline {reference['median_s']:.3f}s)")
+    return regressions
+
+
+def print_results(results):
+    header = f"{'scenario':<12}{'stage':<20}{'median s':>10}{'best s':>10}{'peak RSS MB':>13}" \
+             f"{'RSS rise MB':>13}{'alloc peak MB':>15}{'retained MB':>13}"
+    print(header)
+    print('-' * len(header))
+    for scenario, stages in results.items():
+        for stage, values in stages.items():
+            print(f"{scenario:<12}{stage:<20}{values['median_s']:>10.3f}{values['best_s']:>10.3f}"
+                  f"{values['peak_rss_mb']:>13.1f}{values['rss_growth_mb']:>13.1f}{values['alloc_peak_mb']:>15.1f}"
+                  f"{values['alloc_retained_mb']:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the DICOM viewer pipeline on synthetic data')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for the number of images')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help='Keep generated data here instead of a temporary folder')
+    parser.add_argument('--output', help='Write results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    module = load_viewer_module()
+    app = module.QApplication.instance() or module.QApplication(sys.argv)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='dicom_benchmark_')
+    results = OrderedDict()
+    try:
+        for scenario in args.scenarios:
+            folder = os.path.join(data_dir, scenario)
+            if not os.path.isdir(folder):
+                start = time.perf_counter()
+                generate_folder(data_dir, scenario, args.scale, args.seed)
+                print(f"Generated {scenario} data in {time.perf_counter() - start:.1f}s")
+            results[scenario] = run_scenario(module, app, folder, args.repeat, scenario)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'pydicom': pydicom.__version__, 'scale': args.scale, 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('\nRegressions:')
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,26 @@
 import os
 import sys
+import io
+import json
+import math
+import queue
+import http.client
+import urllib.parse
+import sqlite3
+import tempfile
+import time
+import threading
+from collections import OrderedDict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor, CancelledError,
+                                wait, FIRST_COMPLETED)
 import pydicom
 import numpy as np
 from PyQt5.QtWidgets import (QMainWindow, QApplication, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QLabel, QLineEdit, QTextEdit, QFileDialog, 
                              QWidget, QTabWidget, QTableWidget, QTableWidgetItem,
                              QSlider, QMessageBox, QComboBox, QDialog, 
-                             QListWidget, QListWidgetItem,QScrollArea, QGridLayout)
+                             QListWidget, QListWidgetItem, QGridLayout)
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (QMainWindow, QApplication, QVBoxLayout, QHBoxLayout, 
@@ -18,12 +32,446 @@ from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import Qt
 
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from faker import Faker
 import random
 import pydicom.datadict as datadict
-from matplotlib.figure import Figure
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import (QTimer, QObject, QRunnable, QThreadPool, QAbstractListModel,
+                          QAbstractTableModel, QSortFilterProxyModel, QModelIndex, QSize, pyqtSignal)
+from PyQt5.QtCore import QPointF, QRectF, QEvent
+from PyQt5.QtGui import QPainter
+from PyQt5.QtWidgets import (QListView, QTableView, QHeaderView, QCheckBox, QInputDialog,
+                             QGraphicsView, QGraphicsScene, QGraphicsItem)
+try:
+    # pydicom >= 3 can decode a single frame straight from the dataset
+    from pydicom.pixels import get_decoder
+except ImportError:
+    get_decoder = None
+try:
+    # Optional, used to decode JPEG and JPEG 2000 thumbnails at reduced resolution
+    from PIL import Image
+except ImportError:
+    Image = None
+def encapsulated_frame(dataset, frame_index):
+    """
+    Get the compressed bytes of one frame from encapsulated Pixel Data
+
+    Args:
+        dataset (pydicom.Dataset): Dataset with compressed Pixel Data
+        frame_index (int): Index of the frame
+
+    Returns:
+        bytes: Compressed frame
+    """
+    number_of_frames = int(getattr(dataset, 'NumberOfFrames', 1) or 1)
+    try:
+        # pydicom >= 3 jumps straight to the frame using the offset table
+        from pydicom.encaps import get_frame
+        return get_frame(dataset.PixelData, frame_index, number_of_frames=number_of_frames)
+    except ImportError:
+        from pydicom.encaps import generate_pixel_data_frame
+        for index, frame in enumerate(generate_pixel_data_frame(dataset.PixelData, number_of_frames)):
+            if index == frame_index:
+                return frame
+    raise IndexError(f"Frame {frame_index} not found in Pixel Data")
+
+
+class ThumbnailEngine:
+    """
+    Create small 8-bit thumbnails without normalizing full resolution images
+
+    JPEG and JPEG 2000 frames are decoded at reduced resolution when Pillow
+    is available (DCT scaling and resolution levels). Anything else is block
+    averaged down first, and percentile windowing runs on the small image.
+    """
+    JPEG_SYNTAXES = {'1.2.840.10008.1.2.4.50', '1.2.840.10008.1.2.4.51'}
+    JPEG2000_SYNTAXES = {'1.2.840.10008.1.2.4.90', '1.2.840.10008.1.2.4.91'}
+
+    def __init__(self, size=200, low_percentile=1.0, high_percentile=99.0):
+        self.size = size
+        self.low_percentile = low_percentile
+        self.high_percentile = high_percentile
+
+    def from_dataset(self, dataset, frame_index=0, decode=None):
+        """
+        Create a thumbnail for one frame of a dataset
+
+        Args:
+            dataset (pydicom.Dataset): Dataset holding the frame
+            frame_index (int): Index of the frame
+            decode (callable): Full resolution decoder for the frame, used
+                when reduced decoding is not possible
+
+        Returns:
+            tuple: (uint8 thumbnail, timings dict in milliseconds)
+        """
+        timings = {}
+        start = time.perf_counter()
+        small = self._decode_reduced(dataset, frame_index)
+        timings['method'] = 'reduced' if small is not None else 'full'
+        if small is None:
+            small = decode(frame_index) if decode is not None else dataset.pixel_array
+            if small.ndim == 3 and small.shape[-1] not in (3, 4):
+                small = small[frame_index]
+        timings['decode_ms'] = (time.perf_counter() - start) * 1000
+
+        thumbnail = self.from_array(small, timings,
+                                    getattr(dataset, 'PhotometricInterpretation', '') == 'MONOCHROME1')
+        timings['total_ms'] = (time.perf_counter() - start) * 1000
+        return thumbnail, timings
+
+    def from_array(self, pixel_array, timings=None, invert=False):
+        """
+        Downsample and window a decoded image into an 8-bit thumbnail
+
+        Args:
+            pixel_array (numpy.ndarray): Decoded image
+            timings (dict): Optional dict receiving stage timings
+            invert (bool): Invert grey levels (MONOCHROME1)
+
+        Returns:
+            numpy.ndarray: uint8 thumbnail no larger than size in either direction
+        """
+        timings = timings if timings is not None else {}
+
+        start = time.perf_counter()
+        factor = max(1, math.ceil(max(pixel_array.shape[:2]) / self.size))
+        small = self.block_average(pixel_array, factor)
+        timings['downsample_ms'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        low, high = np.percentile(small, [self.low_percentile, self.high_percentile])
+        scale = 255.0 / (high - low) if high > low else 0.0
+        thumbnail = np.clip((small - low) * scale, 0, 255).astype(np.uint8)
+        if invert:
+            thumbnail = 255 - thumbnail
+        timings['window_ms'] = (time.perf_counter() - start) * 1000
+        return np.ascontiguousarray(thumbnail)
+
+    @staticmethod
+    def block_average(pixel_array, factor):
+        """
+        Downsample by averaging factor x factor blocks
+
+        Args:
+            pixel_array (numpy.ndarray): 2D or colour (H, W, C) image
+            factor (int): Block size
+
+        Returns:
+            numpy.ndarray: float32 downsampled image
+        """
+        if factor <= 1:
+            return pixel_array.astype(np.float32)
+        height = pixel_array.shape[0] // factor * factor
+        width = pixel_array.shape[1] // factor * factor
+        cropped = pixel_array[:height, :width]
+        blocks = cropped.reshape((height // factor, factor, width // factor, factor) + cropped.shape[2:])
+        return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+    def _decode_reduced(self, dataset, frame_index):
+        """
+        Decode a frame at reduced resolution, or None if the codec does not allow it
+        """
+        if Image is None or 'PixelData' not in dataset:
+            return None
+        transfer_syntax = str(dataset.file_meta.TransferSyntaxUID)
+        if transfer_syntax not in self.JPEG_SYNTAXES | self.JPEG2000_SYNTAXES:
+            return None
+
+        try:
+            image = Image.open(io.BytesIO(encapsulated_frame(dataset, frame_index)))
+            if transfer_syntax in self.JPEG_SYNTAXES:
+                # DCT scaling decodes at 1/2, 1/4 or 1/8 of the size
+                image.draft(image.mode, (self.size, self.size))
+            else:
+                # Discard resolution levels above what the thumbnail needs
+                levels = int(math.log2(max(image.size) / self.size)) if max(image.size) > self.size else 0
+                image.reduce = max(0, min(levels, 5))
+            return np.asarray(image)
+        except Exception:
+            return None
+
+    def generate_batch(self, paths, workers=None):
+        """
+        Create thumbnails for many files in a process pool
+
+        Args:
+            paths (list): DICOM file paths
+            workers (int): Number of processes, defaults to the CPU count
+
+        Returns:
+            list: One dict per file with the thumbnail (or error) and timings
+        """
+        jobs = [(path, self.size, self.low_percentile, self.high_percentile) for path in paths]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_batch_thumbnail, jobs, chunksize=8))
+
+
+def _batch_thumbnail(job):
+    # Module level so it can be pickled into worker processes
+    path, size, low_percentile, high_percentile = job
+    engine = ThumbnailEngine(size, low_percentile, high_percentile)
+    try:
+        dataset = pydicom.dcmread(path)
+        thumbnail, timings = engine.from_dataset(dataset, 0)
+        return {'path': path, 'thumbnail': thumbnail, **timings}
+    except Exception as e:
+        return {'path': path, 'thumbnail': None, 'error': str(e)}
+
+
+THUMBNAIL_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'dicom_viewer', 'thumbnails')
+
+
+class ThumbnailSignals(QObject):
+    # row, generation, thumbnail (null image if it could not be created)
+    ready = pyqtSignal(int, int, QImage)
+
+
+class ThumbnailTask(QRunnable):
+    """
+    Create one thumbnail on a worker thread, going through the disk cache
+    """
+    def __init__(self, dicom_handler, row, generation, size, cache_path, signals):
+        super().__init__()
+        self.dicom_handler = dicom_handler
+        self.engine = ThumbnailEngine(max(size))
+        self.row = row
+        self.generation = generation
+        self.size = size
+        self.cache_path = cache_path
+        self.signals = signals
+
+    def run(self):
+        image = QImage()
+        try:
+            if self.cache_path and os.path.exists(self.cache_path):
+                image = QImage(self.cache_path)
+            if image.isNull():
+                dataset = self.dicom_handler.get_dataset(self.row)
+                frame_index = self.dicom_handler.frame_map[self.row][1]
+                thumbnail, _ = self.engine.from_dataset(
+                    dataset, frame_index, lambda frame: self.dicom_handler.decode_image(self.row))
+                image = TilesDialog.thumbnail_image(thumbnail, self.size)
+                if self.cache_path:
+                    os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+                    image.save(self.cache_path, 'PNG')
+        except Exception as e:
+            print(f"Could not create tile for image {self.row}: {e}")
+            image = QImage()
+        self.signals.ready.emit(self.row, self.generation, image)
+
+
+class ThumbnailModel(QAbstractListModel):
+    """
+    List model that creates thumbnails lazily, only for the tiles a view asks for
+    """
+    def __init__(self, dicom_handler, size=(200, 200), max_pixmaps=500, parent=None):
+        super().__init__(parent)
+        self.dicom_handler = dicom_handler
+        self.size = size
+        self.max_pixmaps = max_pixmaps
+        self._pixmaps = OrderedDict()
+        self._failed = set()
+        self._requested = set()
+        self._generation = 0
+
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max(2, (os.cpu_count() or 2) - 1))
+        self.signals = ThumbnailSignals()
+        self.signals.ready.connect(self.on_thumbnail_ready)
+
+        # Grey tile shown until the thumbnail is ready
+        self.placeholder = QPixmap(size[0], size[1])
+        self.placeholder.fill(Qt.darkGray)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.dicom_handler.image_count()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return f"Image {row + 1}"
+        if role == Qt.DecorationRole:
+            pixmap = self._pixmaps.get(row)
+            if pixmap is not None:
+                self._pixmaps.move_to_end(row)
+                return pixmap
+            if row not in self._failed:
+                self.request_thumbnail(row)
+            return self.placeholder
+        return None
+
+    def thumbnail_cache_path(self, row):
+        """
+        Path of the on-disk thumbnail for an image, or None without a SOPInstanceUID
+        """
+        dataset = self.dicom_handler.get_dataset(row)
+        uid = getattr(dataset, 'SOPInstanceUID', None)
+        if not uid:
+            return None
+        frame = self.dicom_handler.frame_map[row][1]
+        return os.path.join(THUMBNAIL_CACHE_DIR, f"{uid}_{frame}_{self.size[0]}x{self.size[1]}.png")
+
+    def request_thumbnail(self, row):
+        if row in self._requested:
+            return
+        self._requested.add(row)
+        self.thread_pool.start(ThumbnailTask(self.dicom_handler, row, self._generation, self.size,
+                                             self.thumbnail_cache_path(row), self.signals))
+
+    def cancel_pending(self):
+        """
+        Drop queued thumbnails, the view asks again for the tiles still visible
+        """
+        self.thread_pool.clear()
+        self._requested = set(self._pixmaps)
+
+    def shutdown(self):
+        self._generation += 1
+        self.thread_pool.clear()
+
+    def on_thumbnail_ready(self, row, generation, image):
+        if generation != self._generation:
+            return
+        if image.isNull():
+            self._failed.add(row)
+        else:
+            self._pixmaps[row] = QPixmap.fromImage(image)
+            while len(self._pixmaps) > self.max_pixmaps:
+                evicted, _ = self._pixmaps.popitem(last=False)
+                self._requested.discard(evicted)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+class DicomImageItem(QGraphicsItem):
+    """
+    Graphics item drawing an 8-bit numpy buffer through a QImage that
+    shares its memory, so no pixels are copied per frame
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._buffer = None
+        self.image = QImage()
+
+    def set_buffer(self, buffer):
+        """
+        Show a uint8 grayscale (rows, columns) or RGB (rows, columns, 3) buffer
+
+        The item keeps a reference to the buffer for as long as the QImage
+        points into it.
+        """
+        if buffer.ndim == 3:
+            buffer = buffer[..., :3]
+        # Only non-contiguous views (e.g. dropped alpha) need a copy
+        buffer = np.ascontiguousarray(buffer, dtype=np.uint8)
+        height, width = buffer.shape[:2]
+        image_format = QImage.Format_RGB888 if buffer.ndim == 3 else QImage.Format_Grayscale8
+
+        if (width, height) != (self.image.width(), self.image.height()):
+            self.prepareGeometryChange()
+        self.image = QImage(buffer.data, width, height, buffer.strides[0], image_format)
+        self._buffer = buffer
+        self.update()
+
+    def clear(self):
+        self.prepareGeometryChange()
+        self.image = QImage()
+        self._buffer = None
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.image.width(), self.image.height())
+
+    def paint(self, painter, option, widget=None):
+        if not self.image.isNull():
+            painter.drawImage(QPointF(0, 0), self.image)
+
+
+class DicomImageView(QGraphicsView):
+    """
+    Image display with wheel zoom and left-drag pan done through the view
+    transform; right-drag is reported for window/level adjustment
+    """
+    window_press = pyqtSignal(int, int)
+    window_drag = pyqtSignal(int, int)
+    window_release = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setScene(QGraphicsScene(self))
+        self.image_item = DicomImageItem()
+        self.scene().addItem(self.image_item)
+
+        self.setBackgroundBrush(Qt.black)
+        self.setRenderHint(QPainter.SmoothPixmapTransform)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.setResizeAnchor(QGraphicsView.AnchorViewCenter)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self._right_dragging = False
+        self._fitted = True
+
+    def set_image(self, buffer):
+        """
+        Display a windowed uint8 buffer, keeping zoom and pan unless the
+        image size changes
+        """
+        old_size = (self.image_item.image.width(), self.image_item.image.height())
+        self.image_item.set_buffer(buffer)
+        new_size = (self.image_item.image.width(), self.image_item.image.height())
+        if new_size != old_size:
+            self.scene().setSceneRect(self.image_item.boundingRect())
+            self.fit_image()
+
+    def clear(self):
+        self.image_item.clear()
+
+    def fit_image(self):
+        """
+        Reset zoom and pan so the whole image fits the view
+        """
+        self.fitInView(self.image_item, Qt.KeepAspectRatio)
+        self._fitted = True
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Keep fitting until the user zooms
+        if self._fitted:
+            self.fitInView(self.image_item, Qt.KeepAspectRatio)
+
+    def wheelEvent(self, event):
+        factor = 1.1 if event.angleDelta().y() > 0 else 1 / 1.1
+        self.scale(factor, factor)
+        self._fitted = False
+
+    def mouseDoubleClickEvent(self, event):
+        self.fit_image()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.RightButton:
+            self._right_dragging = True
+            self.window_press.emit(event.x(), event.y())
+            return
+        super().mousePressEvent(event)
+        if event.button() == Qt.LeftButton:
+            self._fitted = False
+
+    def mouseMoveEvent(self, event):
+        if self._right_dragging:
+            self.window_drag.emit(event.x(), event.y())
+            return
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.RightButton and self._right_dragging:
+            self._right_dragging = False
+            self.window_release.emit()
+            return
+        super().mouseReleaseEvent(event)
+
+
 class TilesDialog(QDialog):
     def __init__(self, dicom_handler, parent=None):
         super().__init__(parent)
@@ -34,60 +482,26 @@ class TilesDialog(QDialog):
         # Main layout
         main_layout = QVBoxLayout()
 
-        # Scroll area for tiles
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-
-        # Widget to hold the grid of tiles
-        tiles_widget = QWidget()
-        grid_layout = QGridLayout(tiles_widget)
+        # Virtualized grid: only the visible tiles are painted and requested
+        self.model = ThumbnailModel(self.dicom_handler, (200, 200), parent=self)
+        self.tiles_view = QListView()
+        self.tiles_view.setViewMode(QListView.IconMode)
+        self.tiles_view.setIconSize(QSize(200, 200))
+        self.tiles_view.setGridSize(QSize(220, 240))
+        self.tiles_view.setUniformItemSizes(True)
+        self.tiles_view.setResizeMode(QListView.Adjust)
+        self.tiles_view.setMovement(QListView.Static)
+        self.tiles_view.setLayoutMode(QListView.Batched)
+        self.tiles_view.setBatchSize(200)
+        self.tiles_view.setModel(self.model)
 
-        # Create tiles for each DICOM image
-        update_index= len(self.dicom_handler.current_datasets)/30
-        for i, dataset in enumerate(self.dicom_handler.current_datasets[::]):
-            try:
-                # Get pixel array and create thumbnail
-                pixel_array = dataset.pixel_array
-
-                # Resize to a standard thumbnail size
-                thumbnail = self.create_thumbnail(pixel_array, (200, 200))
-
-                # Create a label with the thumbnail
-                tile_label = QLabel()
-                tile_label.setPixmap(thumbnail)
-                tile_label.setToolTip(f"Image {i * 5 + 1}")
-
-                # Add hover effect
-                tile_label.setStyleSheet("""
-                    QLabel { 
-                        border: 2px solid transparent; 
-                        padding: 5px; 
-                    }
-                    QLabel:hover { 
-                        border: 2px solid blue; 
-                    }
-                """)
-
-                # Calculate grid position
-                row = i // 5  # 5 tiles per row
-                col = i % 5
-
-                grid_layout.addWidget(tile_label, row, col)
-
-                # Add click event to switch to this image in main viewer
-                tile_label.mousePressEvent = lambda event, index=i * 5: self.select_image(index)
-            
-
-                
-            
-            except Exception as e:
-                print(f"Could not create tile for image {i}: {e}")
+        # Add click event to switch to this image in main viewer
+        self.tiles_view.clicked.connect(lambda index: self.select_image(index.row()))
 
-        # Set the grid layout to the scroll area widget
-        scroll_area.setWidget(tiles_widget)
+        # Tiles scrolled out of view are not worth creating any more
+        self.tiles_view.verticalScrollBar().valueChanged.connect(self.model.cancel_pending)
 
-        # Add scroll area to main layout
-        main_layout.addWidget(scroll_area)
+        main_layout.addWidget(self.tiles_view)
 
         # Close button
         close_btn = QPushButton('Close')
@@ -96,29 +510,47 @@ class TilesDialog(QDialog):
 
         self.setLayout(main_layout)
 
-    def create_thumbnail(self, pixel_array, size):
+    def done(self, result):
+        self.model.shutdown()
+        super().done(result)
+
+    @staticmethod
+    def create_thumbnail(pixel_array, size):
         """
         Create a thumbnail from the pixel array
-        
+
         Args:
             pixel_array (numpy.ndarray): Input image array
             size (tuple): Desired thumbnail size
-        
+
         Returns:
-            QPixmap: Thumbnail image
+            QImage: Thumbnail image, owning its pixel data
         """
-        # Normalize the pixel array
-        normalized = ((pixel_array - pixel_array.min()) / 
-                      (pixel_array.max() - pixel_array.min()) * 255).astype(np.uint8)
-        
-        # Create QImage
-        height, width = normalized.shape
-        bytes_per_line = width
-        q_img = QImage(normalized.data, width, height, bytes_per_line, QImage.Format_Grayscale8)
-        
-        # Convert to pixmap and scale
-        pixmap = QPixmap.fromImage(q_img)
-        return pixmap.scaled(size[0], size[1], Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        # Downsample first, then window the small image
+        thumbnail = ThumbnailEngine(max(size)).from_array(pixel_array)
+        return TilesDialog.thumbnail_image(thumbnail, size)
+
+    @staticmethod
+    def thumbnail_image(thumbnail, size):
+        """
+        Wrap an 8-bit thumbnail as a QImage of the requested size
+
+        Args:
+            thumbnail (numpy.ndarray): uint8 grayscale or RGB thumbnail
+            size (tuple): Desired thumbnail size
+
+        Returns:
+            QImage: Thumbnail image, owning its pixel data
+        """
+        height, width = thumbnail.shape[:2]
+        if thumbnail.ndim == 3:
+            thumbnail = np.ascontiguousarray(thumbnail[..., :3])
+            q_img = QImage(thumbnail.data, width, height, 3 * width, QImage.Format_RGB888)
+        else:
+            q_img = QImage(thumbnail.data, width, height, width, QImage.Format_Grayscale8)
+
+        # Scaling makes a copy, so the result does not depend on the numpy buffer
+        return q_img.scaled(size[0], size[1], Qt.KeepAspectRatio, Qt.SmoothTransformation)
 
     def select_image(self, index):
         """
@@ -163,57 +595,2715 @@ class ExploreDialog(QDialog):
         layout.addWidget(count_label)
         
         self.setLayout(layout)
-        
-class DicomFolderHandler:
-    def __init__(self):
-        self.dicom_files = []
-        self.current_datasets = []
-        self.faker = Faker()
 
-    def load_dicom_folder(self, folder_path):
+
+class QueryDialog(QDialog):
+    """
+    Search the metadata index across every indexed folder
+    """
+    RESULT_COLUMNS = [('patient_name', 'Patient'), ('study_date', 'Study Date'),
+                      ('modality', 'Modality'), ('institution_name', 'Institution'),
+                      ('series_description', 'Series'), ('slice_thickness', 'Slice Thickness'),
+                      ('path', 'Path')]
+
+    def __init__(self, dicom_handler, parent=None):
+        super().__init__(parent)
+        self.dicom_handler = dicom_handler
+        self.results = []
+        self.setWindowTitle('Query DICOM Index')
+        self.setGeometry(150, 150, 1100, 600)
+
+        layout = QVBoxLayout()
+
+        # Filter fields
+        form_layout = QGridLayout()
+        self.modality_input = QLineEdit()
+        self.modality_input.setPlaceholderText('e.g. CT')
+        self.institution_input = QLineEdit()
+        self.patient_input = QLineEdit()
+        self.series_input = QLineEdit()
+        self.max_thickness_input = QLineEdit()
+        self.max_thickness_input.setPlaceholderText('mm, e.g. 1.0')
+        self.folder_only_check = QCheckBox('Current folder only')
+        fields = [('Modality:', self.modality_input), ('Institution contains:', self.institution_input),
+                  ('Patient contains:', self.patient_input), ('Series contains:', self.series_input),
+                  ('Slice thickness <', self.max_thickness_input)]
+        for row, (label, widget) in enumerate(fields):
+            form_layout.addWidget(QLabel(label), row, 0)
+            form_layout.addWidget(widget, row, 1)
+        form_layout.addWidget(self.folder_only_check, len(fields), 1)
+        layout.addLayout(form_layout)
+
+        search_btn = QPushButton('Search')
+        search_btn.clicked.connect(self.run_query)
+        layout.addWidget(search_btn)
+
+        # Results table
+        self.results_table = QTableWidget()
+        self.results_table.setColumnCount(len(self.RESULT_COLUMNS))
+        self.results_table.setHorizontalHeaderLabels([title for _, title in self.RESULT_COLUMNS])
+        self.results_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.results_table.cellDoubleClicked.connect(lambda row, column: self.open_series(row))
+        layout.addWidget(self.results_table)
+
+        self.count_label = QLabel('')
+        layout.addWidget(self.count_label)
+
+        open_btn = QPushButton('Open Series')
+        open_btn.clicked.connect(lambda: self.open_series(self.results_table.currentRow()))
+        layout.addWidget(open_btn)
+
+        self.setLayout(layout)
+
+    def build_filters(self):
+        """
+        Turn the filter fields into index query arguments
+        """
+        filters = {}
+        if self.modality_input.text().strip():
+            filters['modality'] = self.modality_input.text().strip().upper()
+        if self.institution_input.text().strip():
+            filters['institution_name__like'] = f"%{self.institution_input.text().strip()}%"
+        if self.patient_input.text().strip():
+            filters['patient_name__like'] = f"%{self.patient_input.text().strip()}%"
+        if self.series_input.text().strip():
+            filters['series_description__like'] = f"%{self.series_input.text().strip()}%"
+        if self.max_thickness_input.text().strip():
+            filters['slice_thickness__lt'] = float(self.max_thickness_input.text())
+        return filters
+
+    def run_query(self):
+        try:
+            folder_path = self.dicom_handler.folder_path if self.folder_only_check.isChecked() else None
+            self.results = self.dicom_handler.query_index(folder_path, limit=10000, **self.build_filters())
+        except ValueError as e:
+            QMessageBox.warning(self, 'Query Error', f'Invalid query: {e}')
+            return
+
+        self.results_table.setRowCount(len(self.results))
+        for row, result in enumerate(self.results):
+            for column, (key, _) in enumerate(self.RESULT_COLUMNS):
+                value = result.get(key)
+                self.results_table.setItem(row, column, QTableWidgetItem('' if value is None else str(value)))
+        self.results_table.resizeColumnsToContents()
+        self.count_label.setText(f"{len(self.results)} matching files")
+
+    def open_series(self, row):
+        """
+        Load every indexed file of the selected row's series into the viewer
+        """
+        if not 0 <= row < len(self.results):
+            return
+        series_uid = self.results[row].get('series_instance_uid')
+        if series_uid:
+            paths = [r['path'] for r in self.dicom_handler.query_index(series_instance_uid=series_uid)]
+        else:
+            paths = [self.results[row]['path']]
+        if self.parent():
+            self.parent().open_dicom_files(paths)
+        self.close()
+
+# Longest value text shown in the tag table, the rest is elided
+TAG_VALUE_MAX_CHARS = 256
+
+
+def tag_rows(dataset, depth=0):
+    """
+    Build display rows for the elements of a dataset (one level, sequences collapsed)
+
+    Args:
+        dataset (pydicom.Dataset): Dataset or sequence item
+        depth (int): Nesting depth, used for indentation
+
+    Returns:
+        list: Rows as dicts with tag, name, vr, value, depth and the
+              sequence/item to expand (None for plain elements)
+    """
+    rows = []
+    swapped = {}
+    if depth == 0:
+        # Patient Name and Patient ID are shown swapped, as in get_dicom_tags
+        swapped = {'PatientName': dataset.get('PatientID'), 'PatientID': dataset.get('PatientName')}
+
+    for elem in dataset:
+        try:
+            name = datadict.keyword_for_tag(elem.tag) or elem.name
+        except Exception:
+            name = str(elem.tag)
+
+        children = None
+        try:
+            if elem.VR == 'SQ':
+                children = elem.value
+                value = f"Sequence (length {len(elem.value)})"
+            elif name in swapped:
+                value = str(swapped[name])
+            elif elem.VR in ('OB', 'OW', 'OF', 'OD', 'OL', 'OV', 'UN') or elem.tag == 0x7FE00010:
+                # Do not format binary values, private blobs can be megabytes
+                length = len(elem.value) if elem.value is not None else 0
+                value = f"<{length} bytes>"
+            else:
+                value = str(elem.value)
+                if len(value) > TAG_VALUE_MAX_CHARS:
+                    value = value[:TAG_VALUE_MAX_CHARS] + '...'
+        except Exception:
+            value = "Unable to decode"
+
+        rows.append({'tag': f"({elem.tag.group:04X},{elem.tag.element:04X})", 'name': name,
+                     'vr': str(elem.VR), 'value': value, 'depth': depth,
+                     'children': children, 'expanded': False})
+    return rows
+
+
+def sequence_item_rows(sequence, depth):
+    """
+    Build one row per item of a sequence, each expandable to its elements
+    """
+    return [{'tag': '', 'name': f"Item {number}", 'vr': '', 'value': f"{len(item)} elements",
+             'depth': depth, 'children': item, 'expanded': False}
+            for number, item in enumerate(sequence, start=1)]
+
+
+class TagSignals(QObject):
+    # generation, rows
+    ready = pyqtSignal(int, object)
+
+
+class TagRowsTask(QRunnable):
+    """
+    Format the top-level tags of a dataset on a worker thread
+    """
+    def __init__(self, dataset, generation, signals):
+        super().__init__()
+        self.dataset = dataset
+        self.generation = generation
+        self.signals = signals
+
+    def run(self):
+        try:
+            rows = tag_rows(self.dataset)
+        except Exception as e:
+            print(f"Could not read tags: {e}")
+            rows = []
+        self.signals.ready.emit(self.generation, rows)
+
+
+class DicomTagModel(QAbstractTableModel):
+    """
+    Table model of the tags of one dataset, sequences are expanded on demand
+    """
+    COLUMNS = ['Tag', 'Name', 'VR', 'Value']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._generation = 0
+        self.dataset = None
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.signals = TagSignals()
+        self.signals.ready.connect(self.on_rows_ready)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return row['tag']
+            if column == 1:
+                # Indent nested elements, with a marker on expandable rows
+                marker = ''
+                if row['children'] is not None:
+                    marker = '- ' if row['expanded'] else '+ '
+                return '    ' * row['depth'] + marker + row['name']
+            if column == 2:
+                return row['vr']
+            return row['value']
+        if role == Qt.ToolTipRole and column == 3:
+            return row['value']
+        return None
+
+    def set_dataset(self, dataset):
+        """
+        Show the tags of a dataset, formatting them in the background
+        """
+        self._generation += 1
+        self.dataset = dataset
+        self.thread_pool.clear()
+        if dataset is None:
+            self.on_rows_ready(self._generation, [])
+            return
+        self.thread_pool.start(TagRowsTask(dataset, self._generation, self.signals))
+
+    def on_rows_ready(self, generation, rows):
+        # Ignore tags of a dataset that is no longer shown
+        if generation != self._generation:
+            return
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def toggle_expanded(self, row_number):
+        """
+        Expand or collapse a sequence (or sequence item) row
+        """
+        row = self._rows[row_number]
+        if row['children'] is None:
+            return
+
+        if row['expanded']:
+            # Remove every nested row below this one
+            end = row_number + 1
+            while end < len(self._rows) and self._rows[end]['depth'] > row['depth']:
+                end += 1
+            if end > row_number + 1:
+                self.beginRemoveRows(QModelIndex(), row_number + 1, end - 1)
+                del self._rows[row_number + 1:end]
+                self.endRemoveRows()
+        else:
+            if isinstance(row['children'], pydicom.Dataset):
+                children = tag_rows(row['children'], row['depth'] + 1)
+            else:
+                children = sequence_item_rows(row['children'], row['depth'] + 1)
+            if children:
+                self.beginInsertRows(QModelIndex(), row_number + 1, row_number + len(children))
+                self._rows[row_number + 1:row_number + 1] = children
+                self.endInsertRows()
+
+        row['expanded'] = not row['expanded']
+        self.dataChanged.emit(self.index(row_number, 1), self.index(row_number, 1))
+
+
+class FrameCache:
+    """
+    Thread-safe LRU cache of decoded frames bounded by total size in bytes
+    """
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get a cached frame and mark it as most recently used
+
+        Args:
+            key (hashable): Cache key
+
+        Returns:
+            numpy.ndarray: Cached frame, or None if not cached
+        """
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._frames
+
+    def put(self, key, frame):
+        """
+        Store a frame, evicting least recently used frames to stay in budget
+
+        Args:
+            key (hashable): Cache key
+            frame (numpy.ndarray): Decoded frame
+        """
+        size = frame.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._frames:
+                self.current_bytes -= self._frames.pop(key).nbytes
+            self._evict(self.max_bytes - size)
+            self._frames[key] = frame
+            self.current_bytes += size
+
+    def resize(self, max_bytes):
+        """
+        Change the size limit, evicting least recently used frames if needed
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict(max_bytes)
+
+    def _evict(self, target_bytes):
+        # Caller holds the lock
+        while self._frames and self.current_bytes > target_bytes:
+            _, evicted = self._frames.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._frames)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.current_bytes = 0
+
+
+def release_pixel_cache(dataset):
+    """
+    Drop the decoded pixel array pydicom < 3 keeps on a dataset after pixel_array
+
+    With pydicom >= 3 frames are decoded through get_decoder, which leaves
+    the dataset alone, so its private cache is never touched.
+    """
+    if get_decoder is not None:
+        return
+    if getattr(dataset, '_pixel_array', None) is not None:
+        dataset._pixel_array = None
+        dataset._pixel_id = {}
+
+
+class MemoryBudget:
+    """
+    Memory ceiling shared by the loaded datasets and the decoded pixel caches
+
+    Datasets are accounted by their encoded size and stay loaded; whatever
+    the budget leaves over is split between decoded frames and display
+    buffers, which are evicted least recently viewed first.
+    """
+    def __init__(self, max_bytes=2 * 1024 * 1024 * 1024, frame_cache=None, buffer_cache=None,
+                 display_share=0.25):
+        self.max_bytes = max_bytes
+        self.frame_cache = frame_cache
+        self.buffer_cache = buffer_cache
+        self.display_share = display_share
+        # Dataset index -> accounted bytes
+        self.dataset_bytes = []
+
+    @staticmethod
+    def dataset_nbytes(dataset, file_path=None):
+        """
+        Estimate the memory held by a dataset from its encoded size
+
+        Args:
+            dataset (pydicom.Dataset): Loaded dataset
+            file_path (str): File the dataset was read from, if any
+
+        Returns:
+            int: Estimated size in bytes
+        """
+        if file_path and os.path.isfile(file_path):
+            return os.path.getsize(file_path)
+        pixel_data = dataset.get('PixelData')
+        return len(pixel_data) if pixel_data is not None else 0
+
+    def set_datasets(self, file_paths, datasets):
+        """
+        Account for a newly loaded set of datasets and rebalance the caches
+        """
+        self.dataset_bytes = [self.dataset_nbytes(dataset, path) for path, dataset in zip(file_paths, datasets)]
+        self.rebalance()
+
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.rebalance()
+
+    def rebalance(self):
+        """
+        Resize the caches to the part of the budget the datasets leave free
+        """
+        available = max(0, self.max_bytes - sum(self.dataset_bytes))
+        display_bytes = int(available * self.display_share)
+        if self.frame_cache is not None:
+            self.frame_cache.resize(available - display_bytes)
+        if self.buffer_cache is not None:
+            self.buffer_cache.resize(display_bytes)
+
+    @staticmethod
+    def decoded_nbytes(dataset):
+        """
+        Size of a dataset's pixels once decoded, all frames together
+        """
+        if 'PixelData' not in dataset:
+            return 0
+        return (int(dataset.Rows) * int(dataset.Columns) * int(getattr(dataset, 'SamplesPerPixel', 1) or 1) *
+                int(dataset.BitsAllocated) // 8 * int(getattr(dataset, 'NumberOfFrames', 1) or 1))
+
+    def free_bytes(self):
+        """
+        Part of the budget neither the datasets nor the caches use
+        """
+        return max(0, self.max_bytes - self.usage()['total_bytes'])
+
+    def usage(self):
+        """
+        Current memory accounting
+
+        Returns:
+            dict: Byte counts per category, frame cache hit rate and evictions
+        """
+        caches = [cache for cache in (self.frame_cache, self.buffer_cache) if cache is not None]
+        frame_bytes = self.frame_cache.current_bytes if self.frame_cache is not None else 0
+        display_bytes = self.buffer_cache.current_bytes if self.buffer_cache is not None else 0
+        lookups = self.frame_cache.hits + self.frame_cache.misses if self.frame_cache is not None else 0
+        dataset_bytes = sum(self.dataset_bytes)
+        return {
+            'max_bytes': self.max_bytes,
+            'dataset_bytes': dataset_bytes,
+            'frame_bytes': frame_bytes,
+            'display_bytes': display_bytes,
+            'total_bytes': dataset_bytes + frame_bytes + display_bytes,
+            'hit_rate': self.frame_cache.hits / lookups if lookups else 0.0,
+            'evictions': sum(cache.evictions for cache in caches),
+        }
+
+
+class FrameDecoder:
+    """
+    Decode individual frames of a (possibly multi-frame) DICOM dataset
+    """
+    # Attributes needed to decode one frame on its own
+    PIXEL_MODULE_KEYWORDS = ['SamplesPerPixel', 'PhotometricInterpretation',
+                             'PlanarConfiguration', 'Rows', 'Columns',
+                             'BitsAllocated', 'BitsStored', 'HighBit',
+                             'PixelRepresentation']
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.number_of_frames = int(getattr(dataset, 'NumberOfFrames', 1) or 1)
+        self._encapsulated_frames = None
+        self._lock = threading.Lock()
+
+    def decode(self, frame_index):
+        """
+        Decode a single frame
+
+        Args:
+            frame_index (int): Index of the frame within the dataset
+
+        Returns:
+            numpy.ndarray: Pixel data of the frame
+        """
+        transfer_syntax = self.dataset.file_meta.TransferSyntaxUID
+
+        # pydicom >= 3 decodes only the requested frame, without keeping a
+        # copy on the dataset
+        if get_decoder is not None:
+            frame, _ = get_decoder(transfer_syntax).as_array(self.dataset, index=frame_index)
+            return frame
+
+        if self.number_of_frames <= 1:
+            frame = self.dataset.pixel_array
+            # The frame cache owns decoded pixels, so they count against the
+            # memory budget and can be evicted
+            release_pixel_cache(self.dataset)
+            return frame
+
+        if transfer_syntax.is_compressed:
+            return self._decode_encapsulated_frame(frame_index)
+
+        frame = self._native_frame(frame_index)
+        if frame is not None:
+            return frame
+
+        # Fall back to decoding everything, keeping only the requested frame
+        with self._lock:
+            frame = self.dataset.pixel_array[frame_index].copy()
+            release_pixel_cache(self.dataset)
+        return frame
+
+    def _native_frame(self, frame_index):
+        """
+        Slice one frame out of uncompressed Pixel Data without decoding the rest
+        """
+        ds = self.dataset
+        if int(ds.SamplesPerPixel) != 1 or int(ds.BitsAllocated) not in (8, 16, 32):
+            return None
+
+        from pydicom.pixel_data_handlers.util import pixel_dtype
+        dtype = pixel_dtype(ds)
+        frame_pixels = int(ds.Rows) * int(ds.Columns)
+        frame = np.frombuffer(ds.PixelData, dtype=dtype, count=frame_pixels,
+                              offset=frame_index * frame_pixels * dtype.itemsize)
+        return frame.reshape(int(ds.Rows), int(ds.Columns))
+
+    def _decode_encapsulated_frame(self, frame_index):
+        """
+        Decode one compressed frame using the encapsulated frame offsets
+        """
+        from pydicom.encaps import generate_pixel_data_frame
+
+        with self._lock:
+            if self._encapsulated_frames is None:
+                # One pass over the fragments, the compressed bytes are small
+                self._encapsulated_frames = list(
+                    generate_pixel_data_frame(self.dataset.PixelData, self.number_of_frames))
+            frame_bytes = self._encapsulated_frames[frame_index]
+
+        return self.decode_frame_bytes(self.dataset, frame_bytes)
+
+    @classmethod
+    def decode_frame_bytes(cls, dataset, frame_bytes):
+        """
+        Decode the bytes of one frame using the pixel description of a dataset
+
+        Args:
+            dataset (pydicom.Dataset): Dataset describing the pixel data
+            frame_bytes (bytes): Native or compressed bytes of a single frame
+
+        Returns:
+            numpy.ndarray: Pixel data of the frame
+        """
+        rows, columns = int(dataset.Rows), int(dataset.Columns)
+        samples = int(getattr(dataset, 'SamplesPerPixel', 1) or 1)
+
+        if not dataset.file_meta.TransferSyntaxUID.is_compressed and int(dataset.BitsAllocated) in (8, 16, 32):
+            from pydicom.pixel_data_handlers.util import pixel_dtype
+            frame = np.frombuffer(frame_bytes, dtype=pixel_dtype(dataset), count=rows * columns * samples)
+            if samples == 1:
+                return frame.reshape(rows, columns)
+            if int(getattr(dataset, 'PlanarConfiguration', 0) or 0) == 1:
+                return frame.reshape(samples, rows, columns).transpose(1, 2, 0)
+            return frame.reshape(rows, columns, samples)
+
+        from pydicom.encaps import encapsulate
+
+        # Wrap the frame in a single-frame dataset so the pixel handlers decode only it
+        frame_ds = pydicom.Dataset()
+        frame_ds.file_meta = dataset.file_meta
+        if get_decoder is None:
+            # pydicom < 3 reads the encoding from the dataset itself
+            frame_ds.is_little_endian = True
+            frame_ds.is_implicit_VR = False
+        for keyword in cls.PIXEL_MODULE_KEYWORDS:
+            if keyword in dataset:
+                setattr(frame_ds, keyword, getattr(dataset, keyword))
+        frame_ds.NumberOfFrames = 1
+        if dataset.file_meta.TransferSyntaxUID.is_compressed:
+            frame_ds.PixelData = encapsulate([frame_bytes])
+            frame_ds['PixelData'].is_undefined_length = True
+        else:
+            frame_ds.PixelData = frame_bytes
+        return frame_ds.pixel_array
+
+
+class DisplayPipeline:
+    """
+    Map stored pixel values to 8-bit display values through the modality
+    and VOI transforms, using lookup tables over the stored value range
+    """
+    def __init__(self, buffer_cache_bytes=256 * 1024 * 1024, max_luts=8):
+        # Display buffers keyed by (image index, window)
+        self.buffer_cache = FrameCache(buffer_cache_bytes)
+        self.max_luts = max_luts
+        self._luts = OrderedDict()
+        self._default_windows = {}
+
+    def clear(self):
+        self.buffer_cache.clear()
+        self._luts.clear()
+        self._default_windows.clear()
+
+    def render(self, index, dataset_index, dataset, pixel_array, window=None, cache=True):
+        """
+        Convert a frame to an 8-bit display buffer
+
+        Args:
+            index (int): Index of the image, used as cache key
+            dataset_index (int): Index of the dataset holding the image
+            dataset (pydicom.Dataset): Dataset holding the image
+            pixel_array (numpy.ndarray): Stored pixel values of the frame
+            window (tuple): (center, width) override, or None for the dataset default
+            cache (bool): Keep the buffer for later requests
+
+        Returns:
+            numpy.ndarray: uint8 display buffer
+        """
+        key = (index, window)
+        buffer = self.buffer_cache.get(key)
+        if buffer is not None:
+            return buffer
+
+        # Colour images are shown as they are
+        if pixel_array.ndim == 3 and pixel_array.shape[-1] in (3, 4):
+            buffer = self._to_uint8(pixel_array)
+        elif pixel_array.dtype.kind in 'ui' and pixel_array.dtype.itemsize <= 2:
+            lut = self._get_lut(dataset_index, dataset, pixel_array, window)
+            # Signed data is gathered through its unsigned view, the LUT is
+            # laid out in the same order so no offset arithmetic is needed
+            unsigned = pixel_array.view(np.dtype(f'u{pixel_array.dtype.itemsize}'))
+            buffer = lut[unsigned]
+        else:
+            # Float or 32-bit data: apply the transforms directly
+            values = self._modality(dataset, pixel_array.astype(np.float64))
+            buffer = self._voi(dataset, values, self._effective_window(
+                dataset_index, dataset, pixel_array, window))
+
+        if cache:
+            self.buffer_cache.put(key, buffer)
+        return buffer
+
+    def effective_window(self, dataset_index, dataset, pixel_array, window=None):
+        """
+        Get the (center, width) used to display a frame
+
+        Returns:
+            tuple: (center, width), or None when a VOI LUT Sequence is used
+        """
+        return self._effective_window(dataset_index, dataset, pixel_array, window)
+
+    def _effective_window(self, dataset_index, dataset, pixel_array, window):
+        if window is not None:
+            return window
+        if 'WindowCenter' in dataset and 'WindowWidth' in dataset:
+            return (float(self._first(dataset.WindowCenter)),
+                    float(self._first(dataset.WindowWidth)))
+        if 'VOILUTSequence' in dataset:
+            return None
+
+        # No window in the header: derive one from the first frame seen,
+        # once per dataset instead of a min/max pass on every frame
+        if dataset_index not in self._default_windows:
+            values = self._modality(dataset, np.array([pixel_array.min(), pixel_array.max()],
+                                                      dtype=np.float64))
+            low, high = float(values.min()), float(values.max())
+            self._default_windows[dataset_index] = ((low + high) / 2, max(high - low, 1.0))
+        return self._default_windows[dataset_index]
+
+    def _get_lut(self, dataset_index, dataset, pixel_array, window):
+        effective = self._effective_window(dataset_index, dataset, pixel_array, window)
+        key = (dataset_index, pixel_array.dtype.str, effective)
+        lut = self._luts.get(key)
+        if lut is not None:
+            self._luts.move_to_end(key)
+            return lut
+
+        # Every possible stored value, in unsigned-view order
+        itemsize = pixel_array.dtype.itemsize
+        stored = np.arange(2 ** (8 * itemsize), dtype=np.dtype(f'u{itemsize}')).view(pixel_array.dtype)
+        values = self._modality(dataset, stored)
+        lut = self._voi(dataset, values, effective)
+
+        self._luts[key] = lut
+        while len(self._luts) > self.max_luts:
+            self._luts.popitem(last=False)
+        return lut
+
+    def _modality(self, dataset, values):
+        if 'ModalityLUTSequence' in dataset:
+            from pydicom.pixel_data_handlers.util import apply_modality_lut
+            return apply_modality_lut(values, dataset).astype(np.float64)
+        slope = float(getattr(dataset, 'RescaleSlope', 1) or 1)
+        intercept = float(getattr(dataset, 'RescaleIntercept', 0) or 0)
+        values = values.astype(np.float64)
+        if slope != 1 or intercept != 0:
+            values = values * slope + intercept
+        return values
+
+    def _voi(self, dataset, values, window):
+        if window is None:
+            # VOI LUT Sequence, scaled from its output bit depth to 8 bits
+            from pydicom.pixel_data_handlers.util import apply_voi_lut
+            item = dataset.VOILUTSequence[0]
+            output_bits = int(item.LUTDescriptor[2])
+            values = apply_voi_lut(values, dataset, prefer_lut=True).astype(np.float64)
+            display = values * (255.0 / (2 ** output_bits - 1))
+        else:
+            # Linear window as defined in PS3.3 C.11.2.1.2
+            center, width = window
+            width = max(width, 1.0)
+            display = ((values - (center - 0.5)) / (width - 1 if width > 1 else 1) + 0.5) * 255.0
+
+        display = np.clip(display, 0, 255).astype(np.uint8)
+        if getattr(dataset, 'PhotometricInterpretation', '') == 'MONOCHROME1':
+            display = 255 - display
+        return display
+
+    @staticmethod
+    def _first(value):
+        # Window attributes may hold several values, use the first one
+        if isinstance(value, (list, tuple, pydicom.multival.MultiValue)):
+            return value[0]
+        return value
+
+    @staticmethod
+    def _to_uint8(pixel_array):
+        if pixel_array.dtype == np.uint8:
+            return pixel_array
+        low, high = float(pixel_array.min()), float(pixel_array.max())
+        scale = 255.0 / (high - low) if high > low else 0.0
+        return ((pixel_array - low) * scale).astype(np.uint8)
+
+# Indexed columns: column name -> (DICOM keyword, SQL type)
+INDEX_COLUMNS = OrderedDict([
+    ('sop_instance_uid', ('SOPInstanceUID', 'TEXT')),
+    ('study_instance_uid', ('StudyInstanceUID', 'TEXT')),
+    ('series_instance_uid', ('SeriesInstanceUID', 'TEXT')),
+    ('patient_name', ('PatientName', 'TEXT')),
+    ('patient_id', ('PatientID', 'TEXT')),
+    ('study_date', ('StudyDate', 'TEXT')),
+    ('study_description', ('StudyDescription', 'TEXT')),
+    ('series_description', ('SeriesDescription', 'TEXT')),
+    ('modality', ('Modality', 'TEXT')),
+    ('institution_name', ('InstitutionName', 'TEXT')),
+    ('referring_physician_name', ('ReferringPhysicianName', 'TEXT')),
+    ('slice_thickness', ('SliceThickness', 'REAL')),
+    ('rows', ('Rows', 'INTEGER')),
+    ('columns', ('Columns', 'INTEGER')),
+    ('number_of_frames', ('NumberOfFrames', 'INTEGER')),
+    ('instance_number', ('InstanceNumber', 'INTEGER')),
+])
+
+INDEX_DB_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'dicom_viewer', 'metadata.sqlite')
+
+
+def _read_index_row(job):
+    """
+    Read the indexed header values of one file, in a worker process
+    """
+    path, mtime, size = job
+    keywords = [keyword for keyword, _ in INDEX_COLUMNS.values()]
+    try:
+        ds = pydicom.dcmread(path, stop_before_pixels=True, specific_tags=keywords)
+    except Exception:
+        return None
+
+    values = [path, mtime, size]
+    for keyword, sql_type in INDEX_COLUMNS.values():
+        value = ds.get(keyword)
+        if value is None or value == '':
+            values.append(None)
+            continue
+        try:
+            if sql_type == 'REAL':
+                value = float(value)
+            elif sql_type == 'INTEGER':
+                value = int(value)
+            else:
+                value = str(value)
+        except (TypeError, ValueError):
+            value = None
+        values.append(value)
+    return tuple(values)
+
+
+class DicomMetadataIndex:
+    """
+    Persistent SQLite index of DICOM header values for fast queries across folders
+    """
+    # Query operators accepted as column__op keyword arguments
+    OPERATORS = {'eq': '=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>=',
+                 'ne': '!=', 'like': 'LIKE'}
+
+    def __init__(self, db_path=INDEX_DB_PATH):
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self._create_schema()
+
+    def _create_schema(self):
+        columns = ', '.join(f"{name} {sql_type}" for name, (_, sql_type) in INDEX_COLUMNS.items())
+        with self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, {columns})")
+            for name in ('study_instance_uid', 'series_instance_uid', 'patient_name', 'modality',
+                         'institution_name', 'slice_thickness', 'study_date'):
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{name} ON files ({name})")
+
+    def scan(self, folder_path, workers=None, progress=None):
+        """
+        Index all DICOM files below a folder, re-reading only new or changed files
+
+        Args:
+            folder_path (str): Folder to scan recursively
+            workers (int): Number of header reading processes
+            progress (callable): Called with (done, total) while reading
+
+        Returns:
+            dict: Counts of added, updated, removed, unchanged and failed files
+        """
+        folder_path = os.path.abspath(folder_path)
+        known = {row['path']: (row['mtime'], row['size']) for row in self.connection.execute(
+            "SELECT path, mtime, size FROM files WHERE path >= ? AND path < ?",
+            self._prefix_range(folder_path))}
+
+        # Compare file stats with the index, only changed files are opened
+        jobs, seen = [], set()
+        for root, dirs, files in os.walk(folder_path):
+            for file in files:
+                if not file.lower().endswith('.dcm'):
+                    continue
+                full_path = os.path.join(root, file)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                seen.add(full_path)
+                if known.get(full_path) != (stat.st_mtime, stat.st_size):
+                    jobs.append((full_path, stat.st_mtime, stat.st_size))
+
+        rows, failed = [], 0
+        if jobs:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for done, row in enumerate(executor.map(_read_index_row, jobs, chunksize=64), 1):
+                    if row is None:
+                        failed += 1
+                    else:
+                        rows.append(row)
+                    if progress is not None and (done % 100 == 0 or done == len(jobs)):
+                        progress(done, len(jobs))
+
+        removed = [(path,) for path in known if path not in seen]
+        placeholders = ', '.join('?' * (3 + len(INDEX_COLUMNS)))
+        with self.connection:
+            self.connection.executemany(f"INSERT OR REPLACE INTO files VALUES ({placeholders})", rows)
+            self.connection.executemany("DELETE FROM files WHERE path = ?", removed)
+
+        updated = sum(1 for row in rows if row[0] in known)
+        return {'added': len(rows) - updated, 'updated': updated, 'removed': len(removed),
+                'unchanged': len(seen) - len(jobs), 'failed': failed}
+
+    def query(self, folder_path=None, limit=None, **filters):
+        """
+        Find indexed files matching all filters
+
+        Filters are column=value or column__op=value with op one of eq, lt,
+        le, gt, ge, ne and like, e.g. modality='CT', slice_thickness__lt=1.0,
+        institution_name__like='%General%'.
+
+        Args:
+            folder_path (str): Restrict results to files below this folder
+            limit (int): Maximum number of rows
+
+        Returns:
+            list: Matching rows as dicts
+        """
+        clauses, params = [], []
+        for key, value in filters.items():
+            column, _, op = key.partition('__')
+            op = op or 'eq'
+            if column not in INDEX_COLUMNS and column not in ('path', 'mtime', 'size'):
+                raise ValueError(f"Unknown index column: {column}")
+            if op not in self.OPERATORS:
+                raise ValueError(f"Unknown query operator: {op}")
+            clauses.append(f"{column} {self.OPERATORS[op]} ?")
+            params.append(value)
+        if folder_path:
+            clauses.append("path >= ? AND path < ?")
+            params.extend(self._prefix_range(os.path.abspath(folder_path)))
+
+        sql = "SELECT * FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY study_instance_uid, series_instance_uid, instance_number"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def values(self, column, folder_path=None):
+        """
+        Get the values of one column for every indexed file below a folder
+        """
+        if column not in INDEX_COLUMNS:
+            raise ValueError(f"Unknown index column: {column}")
+        sql, params = f"SELECT {column} FROM files", []
+        if folder_path:
+            sql += " WHERE path >= ? AND path < ?"
+            params.extend(self._prefix_range(os.path.abspath(folder_path)))
+        return [row[0] for row in self.connection.execute(sql, params) if row[0] is not None]
+
+    def is_indexed(self, folder_path):
+        row = self.connection.execute("SELECT 1 FROM files WHERE path >= ? AND path < ? LIMIT 1",
+                                      self._prefix_range(os.path.abspath(folder_path))).fetchone()
+        return row is not None
+
+    @staticmethod
+    def _prefix_range(folder_path):
+        # Paths below a folder as a primary key range, so the lookup uses the index
+        prefix = folder_path.rstrip(os.sep) + os.sep
+        return prefix, prefix + '\uffff'
+
+
+class IndexSignals(QObject):
+    # done, total
+    progress = pyqtSignal(int, int)
+    # scan() counts, or the exception it raised
+    finished = pyqtSignal(object)
+
+
+class IndexFolderTask(QRunnable):
+    """
+    Scan a folder into the metadata index on a worker thread
+
+    SQLite connections belong to the thread that opened them, so the task
+    opens its own connection to the index database.
+    """
+    def __init__(self, db_path, folder_path, signals):
+        super().__init__()
+        self.db_path = db_path
+        self.folder_path = folder_path
+        self.signals = signals
+
+    def run(self):
+        try:
+            metadata_index = DicomMetadataIndex(self.db_path)
+            try:
+                result = metadata_index.scan(self.folder_path, progress=self.signals.progress.emit)
+            finally:
+                metadata_index.connection.close()
+        except Exception as e:
+            result = e
+        self.signals.finished.emit(result)
+
+# Lossless transfer syntaxes the transcoder can write
+TRANSCODE_SYNTAXES = OrderedDict([
+    ('Explicit VR Little Endian', '1.2.840.10008.1.2.1'),
+    ('Implicit VR Little Endian', '1.2.840.10008.1.2'),
+    ('RLE Lossless', '1.2.840.10008.1.2.5'),
+    ('JPEG-LS Lossless', '1.2.840.10008.1.2.4.80'),
+    ('JPEG 2000 Lossless', '1.2.840.10008.1.2.4.90'),
+])
+
+
+def _transcode_dataset(job):
+    """
+    Transcode one dataset and verify the round trip, in a worker process
+    """
+    dataset, source_size, target_path, syntax, verify = job
+    from pydicom.uid import UID
+    syntax = UID(syntax)
+    result = {'path': target_path, 'syntax': syntax, 'source_bytes': source_size,
+              'target_bytes': 0, 'pixel_bytes': 0, 'encode_ms': 0.0, 'decode_ms': 0.0,
+              'bit_exact': None, 'error': None}
+    try:
+        has_pixels = 'PixelData' in dataset
+        original = dataset.pixel_array if has_pixels else None
+        if original is not None:
+            result['pixel_bytes'] = original.nbytes
+
+        start = time.perf_counter()
+        if dataset.file_meta.TransferSyntaxUID != syntax:
+            if not has_pixels or not syntax.is_compressed:
+                if has_pixels and dataset.file_meta.TransferSyntaxUID.is_compressed:
+                    dataset.decompress()
+                dataset.file_meta.TransferSyntaxUID = syntax
+            else:
+                dataset.compress(syntax, original)
+        result['encode_ms'] = (time.perf_counter() - start) * 1000
+
+        try:
+            # pydicom >= 3 takes the encoding from the arguments
+            dataset.save_as(target_path, implicit_vr=syntax.is_implicit_VR, little_endian=True)
+        except TypeError:
+            dataset.is_implicit_VR = syntax.is_implicit_VR
+            dataset.is_little_endian = True
+            dataset.save_as(target_path)
+        result['target_bytes'] = os.path.getsize(target_path)
+
+        if verify and original is not None:
+            start = time.perf_counter()
+            round_trip = pydicom.dcmread(target_path).pixel_array
+            result['decode_ms'] = (time.perf_counter() - start) * 1000
+            result['bit_exact'] = bool(round_trip.dtype == original.dtype
+                                       and np.array_equal(round_trip, original))
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def summarize_transcode(results):
+    """
+    Aggregate per-file transcode results into one line per codec
+
+    Args:
+        results (list): Results returned by DicomFolderHandler.transcode_files
+
+    Returns:
+        dict: Transfer syntax UID -> files, failures, mismatches, compression
+            ratio and encode/decode throughput in MB/s
+    """
+    summary = OrderedDict()
+    for result in results:
+        entry = summary.setdefault(str(result['syntax']), {
+            'files': 0, 'failed': 0, 'not_bit_exact': 0, 'source_bytes': 0, 'target_bytes': 0,
+            'pixel_bytes': 0, 'encode_ms': 0.0, 'decode_ms': 0.0})
+        entry['files'] += 1
+        if result['error']:
+            entry['failed'] += 1
+            continue
+        if result['bit_exact'] is False:
+            entry['not_bit_exact'] += 1
+        for key in ('source_bytes', 'target_bytes', 'pixel_bytes', 'encode_ms', 'decode_ms'):
+            entry[key] += result[key]
+
+    for entry in summary.values():
+        megabytes = entry['pixel_bytes'] / (1024 * 1024)
+        entry['compression_ratio'] = entry['pixel_bytes'] / entry['target_bytes'] if entry['target_bytes'] else 0.0
+        entry['encode_mb_s'] = megabytes / (entry['encode_ms'] / 1000) if entry['encode_ms'] else 0.0
+        entry['decode_mb_s'] = megabytes / (entry['decode_ms'] / 1000) if entry['decode_ms'] else 0.0
+    return summary
+
+
+class CodecSignals(QObject):
+    # compare_codecs() summary, or the exception it raised
+    finished = pyqtSignal(object)
+
+
+class CodecComparisonTask(QRunnable):
+    """
+    Run DicomFolderHandler.compare_codecs on a worker thread
+
+    The files are taken as (path, dataset) pairs when the task is created,
+    loading another folder meanwhile replaces the handler's lists.
+    """
+    def __init__(self, dicom_handler, files, signals):
+        super().__init__()
+        self.dicom_handler = dicom_handler
+        self.files = files
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.dicom_handler.compare_codecs(files=self.files)
+        except Exception as e:
+            result = e
+        self.signals.finished.emit(result)
+
+# Attributes every ingested file must have, and the ones that must be valid UIDs
+VALIDATION_REQUIRED = ['SOPClassUID', 'SOPInstanceUID', 'StudyInstanceUID', 'SeriesInstanceUID',
+                       'Modality', 'PatientID']
+VALIDATION_UIDS = ['SOPClassUID', 'SOPInstanceUID', 'StudyInstanceUID', 'SeriesInstanceUID']
+VALIDATION_PIXEL_KEYWORDS = ['Rows', 'Columns', 'BitsAllocated', 'SamplesPerPixel']
+
+
+def _pixel_data_layout(f, file_size, transfer_syntax):
+    """
+    Read the Pixel Data element header at the current position and walk
+    encapsulated items by their lengths, without reading pixel values
+
+    Returns:
+        dict: Element length or fragment layout, with an error when truncated
+    """
+    import struct
+    endian = '>' if transfer_syntax == '1.2.840.10008.1.2.2' else '<'
+    implicit = transfer_syntax == '1.2.840.10008.1.2'
+
+    header = f.read(8)
+    if len(header) < 8:
+        return {'error': 'Pixel Data element is missing'}
+    group, element = struct.unpack(endian + 'HH', header[:4])
+    if (group, element) != (0x7FE0, 0x0010):
+        # Float or Double Float Pixel Data are not checked
+        return {'warning': f'Pixel data element ({group:04X},{element:04X}) was not checked'}
+    if implicit:
+        length = struct.unpack(endian + 'L', header[4:8])[0]
+    else:
+        # OB/OW have two reserved bytes and a 4 byte length
+        length = struct.unpack(endian + 'L', f.read(4))[0]
+
+    if length != 0xFFFFFFFF:
+        end = f.tell() + length
+        layout = {'length': length, 'encapsulated': False}
+        if end > file_size:
+            layout['error'] = f'Pixel Data is truncated, {end - file_size} bytes missing'
+        return layout
+
+    # Encapsulated: a Basic Offset Table item then one item per fragment
+    fragments, offset_table_bytes = 0, None
+    while True:
+        item = f.read(8)
+        if len(item) < 8:
+            return {'encapsulated': True, 'fragments': fragments, 'offset_table_bytes': offset_table_bytes,
+                    'error': 'Encapsulated Pixel Data is truncated, no sequence delimiter'}
+        group, element, item_length = struct.unpack('<HHL', item)
+        if (group, element) == (0xFFFE, 0xE0DD):
+            break
+        if (group, element) != (0xFFFE, 0xE000):
+            return {'encapsulated': True, 'fragments': fragments, 'offset_table_bytes': offset_table_bytes,
+                    'error': f'Unexpected tag ({group:04X},{element:04X}) in encapsulated Pixel Data'}
+        if offset_table_bytes is None:
+            offset_table_bytes = item_length
+        else:
+            fragments += 1
+        f.seek(item_length, os.SEEK_CUR)
+        if f.tell() > file_size:
+            return {'encapsulated': True, 'fragments': fragments, 'offset_table_bytes': offset_table_bytes,
+                    'error': 'Encapsulated Pixel Data fragment runs past the end of the file'}
+    return {'encapsulated': True, 'fragments': fragments, 'offset_table_bytes': offset_table_bytes}
+
+
+def _validate_headers(paths):
+    """
+    Check a batch of files in one worker process
+    """
+    return [_validate_header(path) for path in paths]
+
+
+def _validate_header(path):
+    """
+    Check one file without reading its pixel values, in a worker process
+    """
+    record = {'path': path, 'errors': [], 'warnings': []}
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            ds = pydicom.dcmread(f, stop_before_pixels=True)
+            # The reader stops at the start of the Pixel Data element
+            pixel_offset = f.tell()
+
+            for keyword in ['SOPInstanceUID', 'StudyInstanceUID', 'SeriesInstanceUID', 'Modality',
+                            'Rows', 'Columns', 'NumberOfFrames', 'SliceThickness']:
+                value = ds.get(keyword)
+                if value is not None and (keyword.endswith('UID') or keyword == 'Modality'):
+                    value = str(value)
+                record[keyword] = value
+            for keyword in ['PixelSpacing', 'ImageOrientationPatient', 'ImagePositionPatient']:
+                value = ds.get(keyword)
+                record[keyword] = [float(v) for v in value] if value else None
+            record['NumberOfFrames'] = int(record['NumberOfFrames'] or 1)
+            for keyword in ['Rows', 'Columns']:
+                record[keyword] = int(record[keyword]) if record[keyword] is not None else None
+            record['SliceThickness'] = float(record['SliceThickness']) if record['SliceThickness'] else None
+
+            file_meta = getattr(ds, 'file_meta', None)
+            transfer_syntax = file_meta.get('TransferSyntaxUID') if file_meta is not None else None
+            if not transfer_syntax:
+                record['errors'].append('Missing TransferSyntaxUID in file meta information')
+                return record
+            record['TransferSyntaxUID'] = str(transfer_syntax)
+
+            for keyword in VALIDATION_REQUIRED:
+                if ds.get(keyword) in (None, ''):
+                    record['errors'].append(f'Missing required attribute {keyword}')
+            for keyword in VALIDATION_UIDS:
+                value = ds.get(keyword)
+                if value and not pydicom.uid.UID(str(value)).is_valid:
+                    record['errors'].append(f'{keyword} is not a valid UID: {value}')
+
+            if pixel_offset >= file_size:
+                return record
+            missing = [keyword for keyword in VALIDATION_PIXEL_KEYWORDS if keyword not in ds]
+            if missing:
+                record['errors'].append(f"Pixel Data without {', '.join(missing)}")
+                return record
+
+            layout = _pixel_data_layout(f, file_size, str(transfer_syntax))
+            if 'error' in layout:
+                record['errors'].append(layout['error'])
+            if 'warning' in layout:
+                record['warnings'].append(layout['warning'])
+            frames = record['NumberOfFrames']
+            if layout.get('encapsulated'):
+                if not pydicom.uid.UID(str(transfer_syntax)).is_compressed:
+                    record['errors'].append('Encapsulated Pixel Data in an uncompressed transfer syntax')
+                if layout['fragments'] == 0:
+                    record['errors'].append('Encapsulated Pixel Data has no fragments')
+                elif layout['fragments'] < frames and 'error' not in layout:
+                    record['errors'].append(f"{layout['fragments']} fragments for {frames} frames")
+                if layout['offset_table_bytes'] and layout['offset_table_bytes'] != 4 * frames:
+                    record['warnings'].append(
+                        f"Basic Offset Table has {layout['offset_table_bytes'] // 4} entries for {frames} frames")
+            elif 'length' in layout:
+                bits = int(ds.BitsAllocated) * int(ds.Rows) * int(ds.Columns) * int(ds.SamplesPerPixel) * frames
+                expected = (bits + 7) // 8
+                record['pixel_bytes'] = layout['length']
+                # Odd lengths are padded to an even number of bytes
+                if layout['length'] not in (expected, expected + (expected % 2)):
+                    record['errors'].append(
+                        f"Pixel Data is {layout['length']} bytes, header describes {expected} bytes")
+    except Exception as e:
+        record['errors'].append(f'Unreadable: {e}')
+    return record
+
+
+class DicomValidator:
+    """
+    Bulk header-only validation with cross-file checks
+
+    Files are checked in worker processes; UID uniqueness and series
+    consistency are checked here as results arrive, against the first file
+    seen for each UID or series.
+    """
+    def __init__(self):
+        self.sop_uids = {}
+        # Series UID -> reference record and slice positions along the normal
+        self.series = {}
+        self.counts = {'files': 0, 'valid': 0, 'invalid': 0, 'warnings': 0}
+
+    def validate(self, paths, workers=None, chunksize=64):
+        """
+        Validate files, yielding one record per file in input order
+
+        Args:
+            paths (list): Paths of the files
+            workers (int): Number of worker processes
+            chunksize (int): Files sent to a worker at a time
+
+        Yields:
+            dict: Header values, errors and warnings of one file
+        """
+        batches = (paths[i:i + chunksize] for i in range(0, len(paths), chunksize))
+        executor = ProcessPoolExecutor(max_workers=workers)
+        # Only two batches per worker are queued, so closing the generator
+        # waits for the batches in flight rather than the whole folder
+        pending = deque()
+        try:
+            for batch in batches:
+                pending.append(executor.submit(_validate_headers, batch))
+                if len(pending) >= 2 * (workers or os.cpu_count() or 1):
+                    break
+            while pending:
+                records = pending.popleft().result()
+                batch = next(batches, None)
+                if batch is not None:
+                    pending.append(executor.submit(_validate_headers, batch))
+                for record in records:
+                    self.check_consistency(record)
+                    self.counts['files'] += 1
+                    self.counts['invalid' if record['errors'] else 'valid'] += 1
+                    self.counts['warnings'] += bool(record['warnings'])
+                    yield record
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def check_consistency(self, record):
+        """
+        Add cross-file errors to a record: duplicate SOP Instance UIDs and
+        series whose geometry or study differs from their first file
+        """
+        sop_uid = record.get('SOPInstanceUID')
+        if sop_uid:
+            first = self.sop_uids.setdefault(sop_uid, record['path'])
+            if first != record['path']:
+                record['errors'].append(f'Duplicate SOPInstanceUID, also in {first}')
+
+        series_uid = record.get('SeriesInstanceUID')
+        if not series_uid:
+            return
+        entry = self.series.get(series_uid)
+        if entry is None:
+            self.series[series_uid] = {'reference': record, 'positions': [], 'files': 0}
+            entry = self.series[series_uid]
+        else:
+            reference = entry['reference']
+            if record.get('StudyInstanceUID') != reference.get('StudyInstanceUID'):
+                record['errors'].append(f"Series belongs to another study than {reference['path']}")
+            if (record.get('Rows'), record.get('Columns')) != (reference.get('Rows'), reference.get('Columns')):
+                record['errors'].append(
+                    f"Size {record.get('Rows')}x{record.get('Columns')} differs from "
+                    f"{reference.get('Rows')}x{reference.get('Columns')} in {reference['path']}")
+            if not self._close(record.get('PixelSpacing'), reference.get('PixelSpacing'), 1e-3):
+                record['errors'].append(
+                    f"PixelSpacing {record.get('PixelSpacing')} differs from "
+                    f"{reference.get('PixelSpacing')} in {reference['path']}")
+            if not self._close(record.get('ImageOrientationPatient'), reference.get('ImageOrientationPatient'), 1e-4):
+                record['warnings'].append(f"ImageOrientationPatient differs from {reference['path']}")
+            if not self._close(record.get('SliceThickness'), reference.get('SliceThickness'), 1e-3):
+                record['warnings'].append(f"SliceThickness differs from {reference['path']}")
+
+        entry['files'] += 1
+        orientation = entry['reference'].get('ImageOrientationPatient')
+        position = record.get('ImagePositionPatient')
+        if orientation and position:
+            normal = np.cross(orientation[:3], orientation[3:])
+            entry['positions'].append(float(np.dot(position, normal)))
+
+    @staticmethod
+    def _close(a, b, tolerance):
+        if a is None or b is None:
+            return a is None and b is None
+        return bool(np.allclose(a, b, atol=tolerance))
+
+    def series_issues(self):
+        """
+        Series-level problems only visible once every file was seen:
+        duplicate slice positions and uneven slice spacing
+
+        Returns:
+            list: One dict per problem
+        """
+        issues = []
+        for series_uid, entry in self.series.items():
+            positions = np.sort(np.array(entry['positions']))
+            if len(positions) < 3:
+                continue
+            gaps = np.diff(positions)
+            duplicates = int(np.sum(gaps < 1e-3))
+            if duplicates:
+                issues.append({'series': series_uid, 'issue': f'{duplicates} duplicate slice positions'})
+            gaps = gaps[gaps >= 1e-3]
+            if len(gaps) and gaps.max() - gaps.min() > max(0.01 * np.median(gaps), 1e-3):
+                issues.append({'series': series_uid,
+                               'issue': f'Uneven slice spacing from {gaps.min():.3f} to {gaps.max():.3f} mm'})
+        return issues
+
+
+# Attributes returned by the DICOMweb query (QIDO) endpoints per level
+QIDO_STUDY_ATTRIBUTES = ['StudyInstanceUID', 'PatientName', 'PatientID', 'StudyDate', 'StudyDescription']
+QIDO_SERIES_ATTRIBUTES = ['SeriesInstanceUID', 'Modality', 'SeriesDescription', 'InstitutionName']
+QIDO_INSTANCE_ATTRIBUTES = ['SOPInstanceUID', 'InstanceNumber', 'NumberOfFrames', 'Rows', 'Columns']
+
+
+def dicom_json_value(keyword, value):
+    """
+    Encode one attribute in the DICOM JSON model (PS3.18 F.2)
+    """
+    tag = datadict.tag_for_keyword(keyword)
+    vr = datadict.dictionary_VR(tag)
+    element = {'vr': vr}
+    if value not in (None, ''):
+        if vr == 'PN':
+            element['Value'] = [{'Alphabetic': str(value)}]
+        elif vr in ('IS', 'US', 'UL', 'SS', 'SL'):
+            element['Value'] = [int(value)]
+        elif vr in ('DS', 'FL', 'FD'):
+            element['Value'] = [float(value)]
+        else:
+            element['Value'] = [str(value)]
+    return f"{tag:08X}", element
+
+
+def dicom_json_first(item, keyword):
+    """
+    Get the first value of an attribute from a DICOM JSON object
+    """
+    element = item.get(f"{datadict.tag_for_keyword(keyword):08X}", {})
+    values = element.get('Value') or [None]
+    value = values[0]
+    if isinstance(value, dict):
+        value = value.get('Alphabetic')
+    return value
+
+
+class DicomWebCatalog:
+    """
+    Study/series/instance hierarchy served by DicomWebServer
+
+    Instances come either from the datasets loaded in a DicomFolderHandler
+    or from the files of the metadata index, which are read on demand.
+    """
+    def __init__(self, max_open_datasets=16):
+        # SOPInstanceUID -> attribute dict (index column names plus path/dataset)
+        self.instances = OrderedDict()
+        self.max_open_datasets = max_open_datasets
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_handler(cls, handler):
+        catalog = cls()
+        for file_path, dataset in zip(handler.dicom_files, handler.current_datasets):
+            attributes = {name: dataset.get(keyword) for name, (keyword, _) in INDEX_COLUMNS.items()}
+            attributes['path'] = file_path
+            attributes['dataset'] = dataset
+            catalog.add(attributes)
+        return catalog
+
+    @classmethod
+    def from_index(cls, metadata_index, folder_path=None):
+        catalog = cls()
+        for row in metadata_index.query(folder_path):
+            row['dataset'] = None
+            catalog.add(row)
+        return catalog
+
+    def add(self, attributes):
+        if attributes.get('sop_instance_uid'):
+            self.instances[str(attributes['sop_instance_uid'])] = attributes
+
+    def select(self, study_uid=None, series_uid=None, filters=None):
+        """
+        Instances matching the hierarchy and keyword=value filters (* and ? wildcards)
+        """
+        import fnmatch
+        columns = {keyword: name for name, (keyword, _) in INDEX_COLUMNS.items()}
+        matches = []
+        for attributes in self.instances.values():
+            if study_uid and str(attributes.get('study_instance_uid')) != study_uid:
+                continue
+            if series_uid and str(attributes.get('series_instance_uid')) != series_uid:
+                continue
+            matched = True
+            for keyword, pattern in (filters or {}).items():
+                if keyword not in columns:
+                    continue
+                value = attributes.get(columns[keyword])
+                if value is None or not fnmatch.fnmatchcase(str(value), pattern):
+                    matched = False
+                    break
+            if matched:
+                matches.append(attributes)
+        return matches
+
+    def dataset(self, sop_uid):
+        """
+        Full dataset of an instance, read from disk for indexed instances
+        """
+        attributes = self.instances.get(sop_uid)
+        if attributes is None:
+            return None
+        if attributes.get('dataset') is not None:
+            return attributes['dataset']
+        with self._lock:
+            dataset = self._open.get(sop_uid)
+            if dataset is not None:
+                self._open.move_to_end(sop_uid)
+                return dataset
+        dataset = pydicom.dcmread(attributes['path'])
+        with self._lock:
+            self._open[sop_uid] = dataset
+            while len(self._open) > self.max_open_datasets:
+                self._open.popitem(last=False)
+        return dataset
+
+    def instance_bytes(self, sop_uid):
+        """
+        Part 10 bytes of an instance, the file itself unless it is held in memory
+        """
+        attributes = self.instances[sop_uid]
+        if attributes.get('dataset') is None:
+            with open(attributes['path'], 'rb') as f:
+                return f.read()
+        # Loaded datasets may have been modified (e.g. anonymized), serialize them
+        buffer = io.BytesIO()
+        attributes['dataset'].save_as(buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def frame_bytes(dataset, frame_index):
+        """
+        Stored bytes of one frame, without decoding
+        """
+        if dataset.file_meta.TransferSyntaxUID.is_compressed:
+            return encapsulated_frame(dataset, frame_index)
+        frame_size = (int(dataset.Rows) * int(dataset.Columns) *
+                      int(getattr(dataset, 'SamplesPerPixel', 1) or 1) * int(dataset.BitsAllocated) // 8)
+        return bytes(dataset.PixelData[frame_index * frame_size:(frame_index + 1) * frame_size])
+
+
+class DicomWebRequestHandler(BaseHTTPRequestHandler):
+    """
+    Minimal DICOMweb endpoints: QIDO-RS searches, WADO-RS instances, metadata and frames
+    """
+    protocol_version = 'HTTP/1.1'
+    catalog = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        parts = [urllib.parse.unquote(part) for part in parsed.path.strip('/').split('/') if part]
+        filters = {key: values[0] for key, values in urllib.parse.parse_qs(parsed.query).items()}
+        try:
+            self.route(parts, filters)
+        except KeyError:
+            self.send_error(404, 'Not found')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            self.send_error(500, str(e))
+
+    def route(self, parts, filters):
+        if parts[:1] != ['studies']:
+            raise KeyError(self.path)
+        if len(parts) == 1:
+            return self.send_search(QIDO_STUDY_ATTRIBUTES, 'study_instance_uid', filters=filters)
+        study_uid = parts[1]
+        if len(parts) == 3 and parts[2] == 'series':
+            return self.send_search(QIDO_SERIES_ATTRIBUTES, 'series_instance_uid', study_uid, filters=filters)
+        if len(parts) >= 4 and parts[2] == 'series':
+            series_uid = parts[3]
+            if len(parts) == 5 and parts[4] == 'instances':
+                return self.send_search(QIDO_INSTANCE_ATTRIBUTES, 'sop_instance_uid', study_uid, series_uid,
+                                        filters)
+            if len(parts) == 5 and parts[4] == 'metadata':
+                return self.send_metadata(self.catalog.select(study_uid, series_uid))
+            if len(parts) >= 6 and parts[4] == 'instances':
+                sop_uid = parts[5]
+                if sop_uid not in self.catalog.instances:
+                    raise KeyError(sop_uid)
+                if len(parts) == 6:
+                    return self.send_instance(sop_uid)
+                if len(parts) == 7 and parts[6] == 'metadata':
+                    return self.send_metadata([self.catalog.instances[sop_uid]])
+                if len(parts) == 8 and parts[6] == 'frames':
+                    try:
+                        frame_numbers = [int(n) for n in parts[7].split(',')]
+                    except ValueError:
+                        return self.send_error(400, f'Invalid frame list: {parts[7]}')
+                    return self.send_frames(sop_uid, frame_numbers)
+        raise KeyError(self.path)
+
+    def send_body(self, body, content_type, status=200, extra_headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_search(self, attribute_keywords, unique_column, study_uid=None, series_uid=None, filters=None):
+        """
+        QIDO-RS: one JSON object per distinct study, series or instance
+        """
+        columns = {keyword: name for name, (keyword, _) in INDEX_COLUMNS.items()}
+        results = OrderedDict()
+        for attributes in self.catalog.select(study_uid, series_uid, filters):
+            key = attributes.get(unique_column)
+            if key in results:
+                results[key]['count'] += 1
+                continue
+            item = dict(dicom_json_value(keyword, attributes.get(columns[keyword]))
+                        for keyword in attribute_keywords)
+            results[key] = {'item': item, 'count': 1}
+        body = json.dumps([entry['item'] for entry in results.values()]).encode()
+        self.send_body(body, 'application/dicom+json')
+
+    def send_metadata(self, instances):
+        """
+        WADO-RS metadata: full headers, Pixel Data replaced by a frames URL
+
+        Other binary values such as LUT Data and private blobs are sent inline,
+        the client has no other endpoint to fetch them from.
+        """
+        items = []
+        for attributes in instances:
+            dataset = self.catalog.dataset(str(attributes['sop_instance_uid']))
+            base = (f"/studies/{attributes['study_instance_uid']}/series/{attributes['series_instance_uid']}"
+                    f"/instances/{attributes['sop_instance_uid']}")
+            header = pydicom.Dataset({tag: element for tag, element in dataset.items() if tag != 0x7FE00010})
+            item = header.to_json_dict()
+            if 'PixelData' in dataset:
+                item['7FE00010'] = {'vr': dataset['PixelData'].VR, 'BulkDataURI': base + '/frames'}
+            # The transfer syntax is needed to decode frames on the client
+            item['00020010'] = {'vr': 'UI', 'Value': [str(dataset.file_meta.TransferSyntaxUID)]}
+            items.append(item)
+        self.send_body(json.dumps(items).encode(), 'application/dicom+json')
+
+    def send_instance(self, sop_uid):
+        """
+        WADO-RS instance, honouring single byte ranges so clients can read headers first
+        """
+        body = self.catalog.instance_bytes(sop_uid)
+        byte_range = self.parse_byte_range(self.headers.get('Range'), len(body))
+        if byte_range is not None:
+            start, end = byte_range
+            if start > end:
+                self.send_body(b'', 'application/dicom', 416, {'Content-Range': f"bytes */{len(body)}"})
+                return
+            self.send_body(body[start:end + 1], 'application/dicom', 206,
+                           {'Content-Range': f"bytes {start}-{end}/{len(body)}", 'Accept-Ranges': 'bytes'})
+            return
+        self.send_body(body, 'application/dicom', extra_headers={'Accept-Ranges': 'bytes'})
+
+    @staticmethod
+    def parse_byte_range(header, size):
+        """
+        (first, last) byte of a single-range Range header, or None for no,
+        multiple or malformed ranges, which are answered with the whole body
+        """
+        if not header or not header.startswith('bytes=') or ',' in header:
+            return None
+        first, _, last = header[len('bytes='):].strip().partition('-')
+        try:
+            if first:
+                start = int(first)
+                return start, min(int(last), size - 1) if last else size - 1
+            # Suffix range: the last N bytes
+            return max(0, size - int(last)), size - 1
+        except ValueError:
+            return None
+
+    def send_frames(self, sop_uid, frame_numbers):
+        """
+        WADO-RS frames: a multipart/related stream, one part per frame, sent as
+        each frame is read so the client can start on the first one
+        """
+        dataset = self.catalog.dataset(sop_uid)
+        # Checked before the status line, an error cannot be sent mid-stream
+        num_frames = int(dataset.get('NumberOfFrames', 1) or 1)
+        missing = [number for number in frame_numbers if not 1 <= number <= num_frames]
+        if missing:
+            return self.send_error(404, f"Frames {','.join(map(str, missing))} not in instance "
+                                        f"with {num_frames} frames")
+        transfer_syntax = str(dataset.file_meta.TransferSyntaxUID)
+        boundary = f"frames-{random.getrandbits(64):016x}"
+        self.send_response(200)
+        self.send_header('Content-Type',
+                         f'multipart/related; type="application/octet-stream"; boundary={boundary}')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for number in frame_numbers:
+            frame = self.catalog.frame_bytes(dataset, number - 1)
+            header = (f"--{boundary}\r\nContent-Type: application/octet-stream; transfer-syntax={transfer_syntax}"
+                      f"\r\nContent-Length: {len(frame)}\r\n\r\n").encode()
+            self.write_chunk(header + frame + b"\r\n")
+        self.write_chunk(f"--{boundary}--\r\n".encode())
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+
+class DicomWebServer:
+    """
+    Local DICOMweb-style server running on a background thread
+    """
+    def __init__(self, catalog, host='127.0.0.1', port=8042):
+        handler_class = type('BoundDicomWebRequestHandler', (DicomWebRequestHandler,), {'catalog': catalog})
+        self.httpd = ThreadingHTTPServer((host, port), handler_class)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='dicomweb-server', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class DicomWebClient:
+    """
+    DICOMweb client keeping a pool of persistent HTTP connections
+    """
+    def __init__(self, base_url, pool_size=4, timeout=30):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.base_url = base_url.rstrip('/')
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.prefix = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _get_connection(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release_connection(self, connection):
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def get(self, path, params=None, headers=None):
+        """
+        GET a path below the base URL, reusing pooled connections
+
+        Returns:
+            tuple: (http.client.HTTPResponse, body bytes)
+        """
+        url = self.prefix + path
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+        for attempt in range(2):
+            connection = self._get_connection()
+            try:
+                connection.request('GET', url, headers=headers or {})
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                # A pooled connection may have been closed by the server
+                connection.close()
+                if attempt:
+                    raise
+                continue
+            if response.will_close:
+                connection.close()
+            else:
+                self._release_connection(connection)
+            if response.status >= 400:
+                raise IOError(f"GET {url} failed with HTTP {response.status}")
+            return response, body
+
+    def get_json(self, path, params=None):
+        _, body = self.get(path, params, {'Accept': 'application/dicom+json'})
+        return json.loads(body)
+
+    def search_studies(self, **filters):
+        return self.get_json('/studies', filters)
+
+    def search_series(self, study_uid, **filters):
+        return self.get_json(f'/studies/{study_uid}/series', filters)
+
+    def search_instances(self, study_uid, series_uid, **filters):
+        return self.get_json(f'/studies/{study_uid}/series/{series_uid}/instances', filters)
+
+    def retrieve_series_metadata(self, study_uid, series_uid):
+        """
+        Headers of every instance of a series as datasets without Pixel Data
+        """
+        datasets = []
+        for item in self.get_json(f'/studies/{study_uid}/series/{series_uid}/metadata'):
+            transfer_syntax = dicom_json_first(item, 'TransferSyntaxUID')
+            item = {tag: element for tag, element in item.items()
+                    if not tag.startswith('0002') and tag != '7FE00010'}
+            dataset = pydicom.Dataset.from_json(item)
+            dataset.file_meta = pydicom.dataset.FileMetaDataset()
+            dataset.file_meta.TransferSyntaxUID = transfer_syntax
+            datasets.append(dataset)
+        return datasets
+
+    def retrieve_instance(self, study_uid, series_uid, sop_uid, byte_range=None):
+        headers = {'Accept': 'application/dicom'}
+        if byte_range is not None:
+            headers['Range'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        _, body = self.get(f'/studies/{study_uid}/series/{series_uid}/instances/{sop_uid}', headers=headers)
+        return body
+
+    def retrieve_frames(self, study_uid, series_uid, sop_uid, frame_numbers):
+        """
+        Retrieve raw frames (1-based numbers) in their stored transfer syntax
+
+        Returns:
+            list: Frame bytes in the requested order
+        """
+        response, body = self.get(
+            f"/studies/{study_uid}/series/{series_uid}/instances/{sop_uid}/frames/"
+            f"{','.join(str(n) for n in frame_numbers)}",
+            headers={'Accept': 'multipart/related; type="application/octet-stream"'})
+        return self.parse_multipart(body, response.getheader('Content-Type', ''))
+
+    @staticmethod
+    def parse_multipart(body, content_type):
+        """
+        Split a multipart/related body into its part payloads
+        """
+        boundary = None
+        for parameter in content_type.split(';'):
+            key, _, value = parameter.strip().partition('=')
+            if key.lower() == 'boundary':
+                boundary = value.strip('"')
+        if boundary is None:
+            return [body]
+
+        delimiter = b'--' + boundary.encode()
+        parts, position = [], body.find(delimiter)
+        while position != -1:
+            position += len(delimiter)
+            if body[position:position + 2] == b'--':
+                break
+            header_end = body.find(b'\r\n\r\n', position)
+            headers = body[position:header_end].decode('latin-1').split('\r\n')
+            length = None
+            for header in headers:
+                key, _, value = header.partition(':')
+                if key.strip().lower() == 'content-length':
+                    length = int(value)
+            start = header_end + 4
+            if length is None:
+                end = body.find(b'\r\n' + delimiter, start)
+                parts.append(body[start:end])
+                position = end + 2
+            else:
+                parts.append(body[start:start + length])
+                position = body.find(delimiter, start + length)
+        return parts
+
+
+class RemoteFrameDecoder:
+    """
+    Fetch and decode single frames from a DICOMweb server on demand
+    """
+    def __init__(self, client, study_uid, series_uid, dataset):
+        self.client = client
+        self.study_uid = study_uid
+        self.series_uid = series_uid
+        self.dataset = dataset
+        self.number_of_frames = int(getattr(dataset, 'NumberOfFrames', 1) or 1)
+
+    def decode(self, frame_index):
+        frame_bytes = self.client.retrieve_frames(self.study_uid, self.series_uid,
+                                                  str(self.dataset.SOPInstanceUID), [frame_index + 1])[0]
+        return FrameDecoder.decode_frame_bytes(self.dataset, frame_bytes)
+
+class DicomVolume:
+    """
+    Contiguous 3D volume of one series with its patient-space geometry
+    """
+    def __init__(self, data, origin, row_direction, column_direction, normal, spacing, series_uid):
+        self._data = data
+        # Position of the first voxel of the first slice (mm)
+        self.origin = origin
+        # Direction cosines of rows, columns and the slice stacking direction
+        self.row_direction = row_direction
+        self.column_direction = column_direction
+        self.normal = normal
+        # (slice spacing, row spacing, column spacing) in mm
+        self.spacing = spacing
+        self.series_uid = series_uid
+
+    @property
+    def array(self):
+        """
+        Read-only (slices, rows, columns) view of the volume, no data is copied
+        """
+        view = self._data.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def shape(self):
+        return self._data.shape
+
+    def affine(self):
+        """
+        4x4 matrix mapping (column, row, slice) voxel indices to patient coordinates
+        """
+        slice_spacing, row_spacing, column_spacing = self.spacing
+        matrix = np.eye(4)
+        matrix[:3, 0] = np.asarray(self.row_direction) * column_spacing
+        matrix[:3, 1] = np.asarray(self.column_direction) * row_spacing
+        matrix[:3, 2] = np.asarray(self.normal) * slice_spacing
+        matrix[:3, 3] = self.origin
+        return matrix
+
+class MultiFrameIndex:
+    """
+    Per-frame geometry and dimension values of an enhanced multi-frame
+    dataset, read from the functional groups once when the file is opened
+
+    Frames are ordered by the Dimension Index Values when the dataset
+    defines dimensions, otherwise by stack, slice position and time. A
+    (stack, slice, time) grid gives constant time lookups. Files with
+    frames sharing a grid cell, e.g. diffusion b-values as an extra
+    dimension, are not navigable by dimension.
+    """
+    def __init__(self, dataset):
+        n = int(getattr(dataset, 'NumberOfFrames', 1) or 1)
+        self.number_of_frames = n
+
+        shared_groups = dataset.get('SharedFunctionalGroupsSequence')
+        shared = shared_groups[0] if shared_groups else None
+        per_frame = dataset.get('PerFrameFunctionalGroupsSequence') or []
+
+        self.positions = np.full((n, 3), np.nan)
+        self.orientations = np.full((n, 6), np.nan)
+        self.temporal_positions = np.zeros(n)
+        self.in_stack_positions = np.zeros(n, dtype=np.int64)
+        stack_ids = [''] * n
+        dimension_values = [()] * n
+
+        shared_position = self._item_value(shared, 'PlanePositionSequence', 'ImagePositionPatient')
+        shared_orientation = self._item_value(shared, 'PlaneOrientationSequence', 'ImageOrientationPatient')
+
+        # A single pass over the sequence, it is the expensive part
+        for i in range(n):
+            item = per_frame[i] if i < len(per_frame) else None
+            position = self._item_value(item, 'PlanePositionSequence', 'ImagePositionPatient') or shared_position
+            orientation = (self._item_value(item, 'PlaneOrientationSequence', 'ImageOrientationPatient')
+                           or shared_orientation)
+            if position is not None and len(position) == 3:
+                self.positions[i] = [float(v) for v in position]
+            if orientation is not None and len(orientation) == 6:
+                self.orientations[i] = [float(v) for v in orientation]
+
+            content = self._item(item, 'FrameContentSequence')
+            if content is not None:
+                stack_ids[i] = str(content.get('StackID', '') or '')
+                in_stack = content.get('InStackPositionNumber')
+                if in_stack is not None:
+                    self.in_stack_positions[i] = int(in_stack)
+                values = content.get('DimensionIndexValues')
+                if values is not None:
+                    dimension_values[i] = tuple(int(v) for v in (values if isinstance(
+                        values, (list, tuple, pydicom.multival.MultiValue)) else [values]))
+                temporal = content.get('TemporalPositionIndex')
+                if temporal is not None:
+                    self.temporal_positions[i] = float(temporal)
+                    continue
+            trigger = self._item_value(item, 'CardiacSynchronizationSequence', 'NominalCardiacTriggerDelayTime')
+            if trigger is not None:
+                self.temporal_positions[i] = float(trigger)
+
+        self.stack_ids = np.array(stack_ids)
+        width = max((len(values) for values in dimension_values), default=0)
+        self.dimension_index_values = np.zeros((n, width), dtype=np.int64)
+        for i, values in enumerate(dimension_values):
+            self.dimension_index_values[i, :len(values)] = values
+
+        # Position along the slice normal, or the in-stack position without geometry
+        normals = np.cross(self.orientations[:, :3], self.orientations[:, 3:])
+        self.slice_locations = np.einsum('ij,ij->i', self.positions, normals)
+        missing = ~np.isfinite(self.slice_locations)
+        self.slice_locations[missing] = self.in_stack_positions[missing]
+
+        # Dense ranks of each frame along the stack, slice and time axes
+        _, stack_rank = np.unique(self.stack_ids, return_inverse=True)
+        _, slice_rank = np.unique(np.round(self.slice_locations, 3), return_inverse=True)
+        _, time_rank = np.unique(self.temporal_positions, return_inverse=True)
+        self.coordinates = np.stack([stack_rank, slice_rank, time_rank], axis=1)
+        self.shape = tuple(int(self.coordinates[:, axis].max()) + 1 for axis in range(3))
+
+        if width and 'DimensionIndexSequence' in dataset:
+            # The first dimension varies slowest
+            self.order = np.lexsort(self.dimension_index_values.T[::-1])
+        else:
+            self.order = np.lexsort((time_rank, slice_rank, stack_rank))
+        # Frame index -> position in the display order
+        self.rank = np.empty(n, dtype=np.int64)
+        self.rank[self.order] = np.arange(n)
+
+        self.grid = np.full(self.shape, -1, dtype=np.int64)
+        self.grid[stack_rank, slice_rank, time_rank] = np.arange(n)
+        # Frames that differ only in another dimension overwrite each other
+        # in the grid and could never be reached
+        cells = np.ravel_multi_index((stack_rank, slice_rank, time_rank), self.shape)
+        self.navigable = len(np.unique(cells)) == n
+
+    @staticmethod
+    def _item(item, sequence_keyword):
+        if item is None:
+            return None
+        sequence = item.get(sequence_keyword)
+        return sequence[0] if sequence else None
+
+    @classmethod
+    def _item_value(cls, item, sequence_keyword, keyword):
+        nested = cls._item(item, sequence_keyword)
+        return nested.get(keyword) if nested is not None else None
+
+    @property
+    def stack_count(self):
+        return self.shape[0]
+
+    @property
+    def slice_count(self):
+        return self.shape[1]
+
+    @property
+    def time_count(self):
+        return self.shape[2]
+
+    def frame_at(self, stack, slice_number, time):
+        """
+        Frame index at (stack, slice, time) ranks, or None if there is no such frame
+        """
+        if not self.navigable or not all(
+                0 <= value < size for value, size in zip((stack, slice_number, time), self.shape)):
+            return None
+        frame = int(self.grid[stack, slice_number, time])
+        return frame if frame >= 0 else None
+
+    def coordinates_of(self, frame_index):
+        """
+        (stack, slice, time) ranks of a frame
+        """
+        return tuple(int(v) for v in self.coordinates[frame_index])
+
+
+class DicomFolderHandler:
+    def __init__(self, memory_budget_bytes=2 * 1024 * 1024 * 1024, prefetch_workers=2):
+        self.dicom_files = []
+        self.current_datasets = []
+        # Maps each image index to a (dataset index, frame index) pair
+        self.frame_map = []
+        self.faker = Faker()
+
+        # Frame decoding, caching and prefetching
+        self.frame_cache = FrameCache(memory_budget_bytes)
+        self._decoders = {}
+        self._pending_frames = {}
+        self._pending_lock = threading.Lock()
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=prefetch_workers,
+                                                     thread_name_prefix='dicom-prefetch')
+        self._generation = 0
+
+        # Modality/VOI transforms and cached 8-bit display buffers
+        self.display_pipeline = DisplayPipeline()
+
+        # One ceiling for datasets, decoded frames and display buffers
+        self.memory_budget = MemoryBudget(memory_budget_bytes, self.frame_cache,
+                                          self.display_pipeline.buffer_cache)
+        self.memory_budget.rebalance()
+
+        # Persistent header index, opened on first use. Once the loaded
+        # datasets are edited in memory the index no longer describes them
+        self.folder_path = None
+        self._metadata_index = None
+        self._datasets_modified = False
+
+        # Series UID -> ordered image indices, and the last assembled volume
+        self.series = OrderedDict()
+        self.volume = None
+
+        # Functional group index of an enhanced multi-frame file
+        self.multi_frame_index = None
+
+        # DICOMweb server sharing the loaded files, and the remote series
+        # (client, study UID, series UID) whose frames are fetched on demand
+        self.dicomweb_server = None
+        self.remote_source = None
+
+    def _reset(self):
+        """
+        Forget the currently loaded files, cached frames and pending prefetches
+        """
+        self._generation += 1
+        with self._pending_lock:
+            for future in self._pending_frames.values():
+                future.cancel()
+            self._pending_frames = {}
+        # Drop decoded pixels explicitly, other objects (tag view, server)
+        # may still hold on to the old datasets
+        for dataset in self.current_datasets:
+            release_pixel_cache(dataset)
+        self.dicom_files = []
+        self.current_datasets = []
+        self.frame_map = []
+        self.folder_path = None
+        self._datasets_modified = False
+        self.series = OrderedDict()
+        self.volume = None
+        self.multi_frame_index = None
+        self.remote_source = None
+        self._decoders = {}
+        self.frame_cache.clear()
+        self.display_pipeline.clear()
+        self.memory_budget.set_datasets([], [])
+
+    def image_count(self):
+        """
+        Number of viewable images (frames) currently loaded
+        """
+        return len(self.frame_map)
+
+    def get_dataset(self, index):
+        """
+        Get the dataset that holds a specific image
+
+        Args:
+            index (int): Index of the image
+
+        Returns:
+            pydicom.Dataset: Dataset containing the image, or None
+        """
+        if 0 <= index < len(self.frame_map):
+            return self.current_datasets[self.frame_map[index][0]]
+        return None
+
+    def load_dicom_file(self, file_path, dataset=None):
+        """
+        Load a single DICOM file, exposing every frame as an image
+
+        Args:
+            file_path (str): Path to the DICOM file
+            dataset (pydicom.Dataset): Already read dataset, if any
+
+        Returns:
+            pydicom.Dataset: Loaded dataset
+        """
+        if dataset is None:
+            dataset = pydicom.dcmread(file_path)
+        self._reset()
+        self.dicom_files = [file_path]
+        self.current_datasets = [dataset]
+        num_frames = int(getattr(dataset, 'NumberOfFrames', 1) or 1)
+        if num_frames > 1 and 'PerFrameFunctionalGroupsSequence' in dataset:
+            # Enhanced multi-frame: show frames in dimension order
+            self.multi_frame_index = MultiFrameIndex(dataset)
+            self.frame_map = [(0, int(frame)) for frame in self.multi_frame_index.order]
+        else:
+            self.frame_map = [(0, frame) for frame in range(num_frames)]
+        self.series = OrderedDict([(str(dataset.get('SeriesInstanceUID', '')), [0])])
+        self.memory_budget.set_datasets(self.dicom_files, self.current_datasets)
+        return dataset
+
+    def load_dicom_folder(self, folder_path):
+        """
+        Load all DICOM files from a given folder
+        
+        Args:
+            folder_path (str): Path to the folder containing DICOM files
+        
+        Returns:
+            list: List of loaded DICOM file paths
+        """
+        self.load_dicom_files(self.find_dicom_files(folder_path))
+        self.folder_path = os.path.abspath(folder_path)
+        return self.dicom_files
+
+    @staticmethod
+    def find_dicom_files(folder_path):
+        """
+        Recursively find all .dcm files below a folder
+        """
+        file_paths = []
+        for root, dirs, files in os.walk(folder_path):
+            for file in files:
+                if file.lower().endswith('.dcm'):
+                    file_paths.append(os.path.join(root, file))
+        return file_paths
+
+    def load_dicom_files(self, file_paths):
+        """
+        Load a list of DICOM files, e.g. the result of an index query
+
+        Args:
+            file_paths (list): Paths of the DICOM files
+
+        Returns:
+            list: List of loaded DICOM file paths
+        """
+        self._reset()
+
+        for full_path in file_paths:
+            try:
+                ds = pydicom.dcmread(full_path)
+                self.dicom_files.append(full_path)
+                self.current_datasets.append(ds)
+            except Exception as e:
+                print(f"Could not read {full_path}: {e}")
+
+        self.sort_by_position()
+        self.memory_budget.set_datasets(self.dicom_files, self.current_datasets)
+        return self.dicom_files
+
+    def image_at(self, stack, slice_number, time):
+        """
+        Image index of a frame by its (stack, slice, time) ranks
+
+        Args:
+            stack (int): Stack rank
+            slice_number (int): Slice rank within the stack
+            time (int): Temporal position rank
+
+        Returns:
+            int: Image index, or None without an enhanced multi-frame index
+        """
+        if self.multi_frame_index is None:
+            return None
+        frame = self.multi_frame_index.frame_at(stack, slice_number, time)
+        return int(self.multi_frame_index.rank[frame]) if frame is not None else None
+
+    def image_coordinates(self, index):
+        """
+        (stack, slice, time) ranks of an image, or None without an enhanced
+        multi-frame index or when its frames do not fit the grid
+        """
+        if self.multi_frame_index is None or not self.multi_frame_index.navigable \
+                or not 0 <= index < len(self.frame_map):
+            return None
+        return self.multi_frame_index.coordinates_of(self.frame_map[index][1])
+
+    def next_cine_index(self, index):
+        """
+        Next image for cine playback
+
+        Time-resolved enhanced multi-frame files loop over time at the
+        current stack and slice, anything else plays in display order.
+
+        Returns:
+            int: Next image index, or None at the end of playback
+        """
+        coordinates = self.image_coordinates(index)
+        if coordinates is not None and self.multi_frame_index.time_count > 1:
+            stack, slice_number, time = coordinates
+            for step in range(1, self.multi_frame_index.time_count + 1):
+                image = self.image_at(stack, slice_number, (time + step) % self.multi_frame_index.time_count)
+                if image is not None:
+                    return image
+        return index + 1 if index + 1 < self.image_count() else None
+
+    def set_memory_budget(self, max_bytes):
+        """
+        Change the memory ceiling, evicting cached pixels if it shrinks
+
+        Args:
+            max_bytes (int): New budget in bytes
+        """
+        self.memory_budget.set_max_bytes(max_bytes)
+
+    def memory_usage(self):
+        """
+        Memory accounting of the loaded files, see MemoryBudget.usage
+        """
+        return self.memory_budget.usage()
+
+    @staticmethod
+    def slice_geometry(dataset):
+        """
+        Get the slice normal and the position projected onto it
+
+        Args:
+            dataset (pydicom.Dataset): Dataset of one slice
+
+        Returns:
+            tuple: (normal, position along normal), or (None, None) without geometry
+        """
+        orientation = dataset.get('ImageOrientationPatient')
+        position = dataset.get('ImagePositionPatient')
+        if orientation is None or position is None or len(orientation) != 6:
+            return None, None
+        row_direction = np.array(orientation[:3], dtype=np.float64)
+        column_direction = np.array(orientation[3:], dtype=np.float64)
+        normal = np.cross(row_direction, column_direction)
+        return normal, float(np.dot(np.array(position, dtype=np.float64), normal))
+
+    def sort_by_position(self):
+        """
+        Group loaded files by series and order each series anatomically
+
+        Slices are sorted by ImagePositionPatient projected onto the slice
+        normal, falling back to InstanceNumber when there is no geometry.
+        Every frame of multi-frame files becomes an image of its own.
+        """
+        series = OrderedDict()
+        for i, dataset in enumerate(self.current_datasets):
+            series.setdefault(str(dataset.get('SeriesInstanceUID', '')), []).append(i)
+
+        def sort_key(i):
+            dataset = self.current_datasets[i]
+            _, position = self.slice_geometry(dataset)
+            instance = dataset.get('InstanceNumber')
+            instance = int(instance) if instance not in (None, '') else 0
+            # Slices without geometry go last, ordered by instance number
+            return (position is None, position if position is not None else 0.0, instance)
+
+        order = []
+        self.series = OrderedDict()
+        for series_uid, indices in series.items():
+            indices = sorted(indices, key=sort_key)
+            self.series[series_uid] = list(range(len(order), len(order) + len(indices)))
+            order.extend(indices)
+
+        self.dicom_files = [self.dicom_files[i] for i in order]
+        self.current_datasets = [self.current_datasets[i] for i in order]
+        self.frame_map = []
+        for dataset_index, dataset in enumerate(self.current_datasets):
+            num_frames = int(getattr(dataset, 'NumberOfFrames', 1) or 1)
+            self.frame_map.extend((dataset_index, frame) for frame in range(num_frames))
+
+    def build_volume(self, series_uid=None, workers=None):
+        """
+        Assemble one series into a contiguous int16 volume
+
+        The volume is preallocated once and slices are decoded in parallel
+        straight into it. Rescale slope/intercept are applied, so CT volumes
+        hold Hounsfield units.
+
+        Args:
+            series_uid (str): Series to assemble, defaults to the first series
+            workers (int): Number of decoding threads
+
+        Returns:
+            DicomVolume: Volume with geometry, exposing a zero-copy array view
+        """
+        if not self.series:
+            raise ValueError("No DICOM series loaded")
+        if series_uid is None:
+            series_uid = next(iter(self.series))
+        indices = self.series[series_uid]
+
+        first = self.current_datasets[indices[0]]
+        rows, columns = int(first.Rows), int(first.Columns)
+        for i in indices:
+            dataset = self.current_datasets[i]
+            if int(dataset.Rows) != rows or int(dataset.Columns) != columns:
+                raise ValueError(f"Series {series_uid} mixes image sizes, it cannot form a volume")
+
+        volume = np.empty((len(indices), rows, columns), dtype=np.int16)
+
+        def fill_slice(slice_index):
+            dataset_index = indices[slice_index]
+            dataset = self.current_datasets[dataset_index]
+            pixels = self._get_decoder(dataset_index).decode(0)
+            slope = float(getattr(dataset, 'RescaleSlope', 1) or 1)
+            intercept = float(getattr(dataset, 'RescaleIntercept', 0) or 0)
+            if slope != 1 or intercept != 0:
+                pixels = pixels * slope + intercept
+            if pixels.dtype.kind == 'f':
+                # Round rather than truncate toward zero on the int16 cast
+                pixels = np.rint(pixels)
+            elif pixels.dtype not in (np.int16, np.int8, np.uint8):
+                # uint16 cannot hold the lower bound, NumPy 2 raises on clipping it
+                pixels = pixels.astype(np.int64)
+            if pixels.dtype not in (np.int16, np.int8, np.uint8):
+                pixels = np.clip(pixels, -32768, 32767)
+            # Writes into the preallocated volume, no per-slice stacking
+            volume[slice_index] = pixels
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(fill_slice, range(len(indices))))
+
+        # Geometry from the first slice and the spacing between slice positions
+        normal, _ = self.slice_geometry(first)
+        orientation = first.get('ImageOrientationPatient') or [1, 0, 0, 0, 1, 0]
+        if normal is None:
+            normal = np.array([0.0, 0.0, 1.0])
+        positions = [self.slice_geometry(self.current_datasets[i])[1] for i in indices]
+        if len(positions) > 1 and None not in positions:
+            slice_spacing = float(np.median(np.diff(positions))) or 1.0
+        else:
+            slice_spacing = float(getattr(first, 'SliceThickness', 1) or 1)
+        pixel_spacing = first.get('PixelSpacing') or [1, 1]
+        origin = np.array(first.get('ImagePositionPatient') or [0, 0, 0], dtype=np.float64)
+
+        self.volume = DicomVolume(volume, origin,
+                                  np.array(orientation[:3], dtype=np.float64),
+                                  np.array(orientation[3:], dtype=np.float64),
+                                  normal,
+                                  (abs(slice_spacing), float(pixel_spacing[0]), float(pixel_spacing[1])),
+                                  series_uid)
+        return self.volume
+
+    def transcode_files(self, output_dir, transfer_syntax, workers=None, verify=True, progress=None,
+                        files=None):
+        """
+        Write every loaded dataset in another transfer syntax using a process pool
+
+        Args:
+            output_dir (str): Directory receiving the transcoded files
+            transfer_syntax (str): Target transfer syntax UID (see TRANSCODE_SYNTAXES)
+            workers (int): Number of encoding processes
+            verify (bool): Re-read each file and check the pixels are bit-exact
+            progress (callable): Called with (done, total), returning False cancels
+            files (list): (path, dataset) pairs to transcode, defaults to all loaded files
+
+        Returns:
+            list: One result dict per file with sizes, timings and verification
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        if files is None:
+            files = list(zip(self.dicom_files, self.current_datasets))
+        jobs, job_bytes = [], []
+        for file_path, dataset in files:
+            source_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            target_path = os.path.join(output_dir, os.path.basename(file_path))
+            jobs.append((dataset, source_size, target_path, transfer_syntax, verify))
+            # Original and round trip pixels are decoded side by side
+            job_bytes.append(2 * MemoryBudget.decoded_nbytes(dataset))
+
+        results = []
+        workers = workers or os.cpu_count() or 1
+        # Decoded pixels in flight share what the memory budget leaves free
+        budget_bytes = self.memory_budget.free_bytes()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Keep a bounded number of pickled datasets in flight
+            pending, next_job, in_flight_bytes = {}, 0, 0
+            while next_job < len(jobs) or pending:
+                while (next_job < len(jobs) and len(pending) < workers * 2 and
+                       (not pending or in_flight_bytes + job_bytes[next_job] <= budget_bytes)):
+                    pending[executor.submit(_transcode_dataset, jobs[next_job])] = job_bytes[next_job]
+                    in_flight_bytes += job_bytes[next_job]
+                    next_job += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight_bytes -= pending.pop(future)
+                    results.append(future.result())
+                if progress is not None and progress(len(results), len(jobs)) is False:
+                    for future in pending:
+                        future.cancel()
+                    break
+        return results
+
+    def compare_codecs(self, syntaxes=None, sample_size=20, workers=None, files=None):
+        """
+        Transcode a sample of the loaded files with each codec and summarize
+
+        Args:
+            syntaxes (list): Transfer syntax UIDs, defaults to all TRANSCODE_SYNTAXES
+            sample_size (int): Number of loaded files to try
+            workers (int): Number of encoding processes
+            files (list): (path, dataset) pairs to sample from, defaults to the
+                loaded files. Pass a copy when another folder may be loaded meanwhile
+
+        Returns:
+            dict: summarize_transcode() output covering every codec
+        """
+        syntaxes = syntaxes or list(TRANSCODE_SYNTAXES.values())
+        if files is None:
+            files = list(zip(self.dicom_files, self.current_datasets))
+        sample = files[:sample_size]
+        results = []
+        for syntax in syntaxes:
+            with tempfile.TemporaryDirectory() as output_dir:
+                results.extend(self.transcode_files(output_dir, syntax, workers, files=sample))
+        return summarize_transcode(results)
+
+    def validate_folder(self, folder_path, report_path, workers=None, progress=None):
+        """
+        Validate every DICOM file below a folder without decoding pixels
+
+        Writes a JSON Lines report: one line per file with its errors and
+        warnings, written as results arrive, then a summary line.
+
+        Args:
+            folder_path (str): Folder to validate recursively
+            report_path (str): Path of the JSON Lines report
+            workers (int): Number of worker processes
+            progress (callable): Called with (done, total), returning False cancels
+
+        Returns:
+            dict: Summary with file counts, series issues and throughput
+        """
+        paths = self.find_dicom_files(folder_path)
+        validator = DicomValidator()
+        start = time.perf_counter()
+        cancelled = False
+        with open(report_path, 'w') as report:
+            for done, record in enumerate(validator.validate(paths, workers), 1):
+                report.write(json.dumps(dict(record, type='file'), default=str) + '\n')
+                if progress is not None and (done % 100 == 0 or done == len(paths)):
+                    if progress(done, len(paths)) is False:
+                        cancelled = True
+                        break
+
+            elapsed = time.perf_counter() - start
+            summary = dict(validator.counts, type='summary', folder=os.path.abspath(folder_path),
+                           cancelled=cancelled, series=len(validator.series),
+                           series_issues=validator.series_issues(), seconds=round(elapsed, 3),
+                           files_per_minute=round(validator.counts['files'] / elapsed * 60) if elapsed else 0)
+            report.write(json.dumps(summary) + '\n')
+        return summary
+
+    @property
+    def metadata_index(self):
+        """
+        Persistent SQLite index of header values, shared across folders
+        """
+        if self._metadata_index is None:
+            self._metadata_index = DicomMetadataIndex()
+        return self._metadata_index
+
+    def index_folder(self, folder_path, workers=None, progress=None):
+        """
+        Add a folder to the metadata index, re-reading only changed files
+
+        Args:
+            folder_path (str): Folder to scan recursively
+            workers (int): Number of header reading processes
+            progress (callable): Called with (done, total) while reading
+
+        Returns:
+            dict: Counts of added, updated, removed, unchanged and failed files
+        """
+        return self.metadata_index.scan(folder_path, workers, progress)
+
+    def query_index(self, folder_path=None, limit=None, **filters):
         """
-        Load all DICOM files from a given folder
-        
+        Query the metadata index, see DicomMetadataIndex.query for the filter syntax
+        """
+        return self.metadata_index.query(folder_path, limit, **filters)
+
+    def serve_dicomweb(self, host='127.0.0.1', port=8042, use_index=False):
+        """
+        Serve the loaded files (or the metadata index) over DICOMweb
+
         Args:
-            folder_path (str): Path to the folder containing DICOM files
-        
+            host (str): Interface to listen on
+            port (int): Port to listen on, 0 picks a free port
+            use_index (bool): Serve every indexed file of the current folder
+
         Returns:
-            list: List of loaded DICOM file paths
+            DicomWebServer: Running server, see its url attribute
         """
-        self.dicom_files = []
-        self.current_datasets = []
-        
-        # Recursively find all .dcm files
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                if file.lower().endswith('.dcm'):
-                    full_path = os.path.join(root, file)
-                    try:
-                        ds = pydicom.dcmread(full_path)
-                        self.dicom_files.append(full_path)
-                        self.current_datasets.append(ds)
-                    except Exception as e:
-                        print(f"Could not read {full_path}: {e}")
-        
+        self.stop_dicomweb()
+        if use_index:
+            catalog = DicomWebCatalog.from_index(self.metadata_index, self.folder_path)
+        else:
+            catalog = DicomWebCatalog.from_handler(self)
+        self.dicomweb_server = DicomWebServer(catalog, host, port)
+        return self.dicomweb_server
+
+    def stop_dicomweb(self):
+        if self.dicomweb_server is not None:
+            self.dicomweb_server.stop()
+            self.dicomweb_server = None
+
+    def load_remote_series(self, client, study_uid, series_uid):
+        """
+        Load a series from a DICOMweb server
+
+        Only the headers are downloaded here, frames are retrieved one at a
+        time when they are displayed or prefetched.
+
+        Args:
+            client (DicomWebClient): Client connected to the server
+            study_uid (str): Study Instance UID
+            series_uid (str): Series Instance UID
+
+        Returns:
+            list: Pseudo paths (URLs) of the loaded instances
+        """
+        self._reset()
+        for dataset in client.retrieve_series_metadata(study_uid, series_uid):
+            self.dicom_files.append(f"{client.base_url}/studies/{study_uid}/series/{series_uid}"
+                                    f"/instances/{dataset.SOPInstanceUID}")
+            self.current_datasets.append(dataset)
+        self.sort_by_position()
+        self.remote_source = (client, study_uid, series_uid)
+        self.memory_budget.set_datasets(self.dicom_files, self.current_datasets)
         return self.dicom_files
 
     def get_image_at_index(self, index):
         """
-        Get pixel array for a specific DICOM file
-        
+        Get pixel array for a specific image, decoding only that frame
+
         Args:
-            index (int): Index of the DICOM file
-        
+            index (int): Index of the image
+
         Returns:
             numpy.ndarray: Pixel data
         """
-        if 0 <= index < len(self.current_datasets):
-            return self.current_datasets[index].pixel_array
-        return None
+        if not 0 <= index < len(self.frame_map):
+            return None
+
+        key = self.frame_map[index]
+        frame = self.frame_cache.get(key)
+        if frame is not None:
+            return frame
+
+        # Wait for a prefetch that is already decoding this frame
+        with self._pending_lock:
+            future = self._pending_frames.get(key)
+        if future is not None:
+            try:
+                return future.result()
+            except CancelledError:
+                pass
+
+        return self._decode_and_cache(key, self._generation)
+
+    def decode_image(self, index):
+        """
+        Decode an image for bulk readers such as the thumbnail workers
+
+        The frame goes through the frame cache like a viewed image, so it
+        counts against the memory budget and is evicted with the rest.
+
+        Args:
+            index (int): Index of the image
+
+        Returns:
+            numpy.ndarray: Pixel data
+        """
+        key = self.frame_map[index]
+        frame = self.frame_cache.get(key)
+        if frame is not None:
+            return frame
+        return self._decode_and_cache(key, self._generation)
+
+    def get_display_image(self, index, window=None, cache=True):
+        """
+        Get an image as an 8-bit display buffer with modality and VOI transforms applied
+
+        Args:
+            index (int): Index of the image
+            window (tuple): (center, width) override, or None for the dataset default
+            cache (bool): Keep the buffer for later requests
+
+        Returns:
+            numpy.ndarray: uint8 display buffer
+        """
+        pixel_array = self.get_image_at_index(index)
+        if pixel_array is None:
+            return None
+        dataset_index = self.frame_map[index][0]
+        return self.display_pipeline.render(index, dataset_index, self.current_datasets[dataset_index],
+                                            pixel_array, window, cache)
+
+    def get_window(self, index, window=None):
+        """
+        Get the (center, width) window used to display an image
+
+        Args:
+            index (int): Index of the image
+            window (tuple): (center, width) override, or None for the dataset default
+
+        Returns:
+            tuple: (center, width), or None if the image uses a VOI LUT Sequence
+        """
+        pixel_array = self.get_image_at_index(index)
+        if pixel_array is None:
+            return None
+        dataset_index = self.frame_map[index][0]
+        return self.display_pipeline.effective_window(
+            dataset_index, self.current_datasets[dataset_index], pixel_array, window)
+
+    def _get_decoder(self, dataset_index):
+        decoder = self._decoders.get(dataset_index)
+        if decoder is None:
+            dataset = self.current_datasets[dataset_index]
+            if self.remote_source is not None:
+                client, study_uid, series_uid = self.remote_source
+                decoder = RemoteFrameDecoder(client, study_uid, series_uid, dataset)
+            else:
+                decoder = FrameDecoder(dataset)
+            decoder = self._decoders.setdefault(dataset_index, decoder)
+        return decoder
+
+    def _decode_and_cache(self, key, generation):
+        dataset_index, frame_index = key
+        frame = self._get_decoder(dataset_index).decode(frame_index)
+        # Do not cache frames of a folder that has been replaced meanwhile
+        if generation == self._generation:
+            self.frame_cache.put(key, frame)
+        return frame
+
+    def _prefetch_frame(self, key, generation):
+        try:
+            return self._decode_and_cache(key, generation)
+        finally:
+            with self._pending_lock:
+                self._pending_frames.pop(key, None)
+
+    def prefetch_frames(self, index, count=8):
+        """
+        Decode the images cine playback shows after index in the background
+        so it never waits
+
+        Follows next_cine_index, so time-resolved multi-frame files prefetch
+        the next time points of the current slice rather than the next
+        images in display order.
+
+        Args:
+            index (int): Index of the image being shown
+            count (int): Number of images to stay ahead
+        """
+        generation = self._generation
+        for _ in range(min(count, len(self.frame_map))):
+            index = self.next_cine_index(index)
+            if index is None:
+                break
+            key = self.frame_map[index]
+            if key in self.frame_cache:
+                continue
+            with self._pending_lock:
+                if key in self._pending_frames:
+                    continue
+                self._pending_frames[key] = self._prefetch_executor.submit(
+                    self._prefetch_frame, key, generation)
 
     def get_dicom_tags(self, index):
-        if 0 <= index < len(self.current_datasets):
-            dataset = self.current_datasets[index]
+        dataset = self.get_dataset(index)
+        if dataset is not None:
             tags_dict = {}
             
             for elem in dataset:
@@ -269,9 +3359,8 @@ class DicomFolderHandler:
         Returns:
             dict: Anonymized tags
         """
-        if 0 <= index < len(self.current_datasets):
-            dataset = self.current_datasets[index]
-            
+        dataset = self.get_dataset(index)
+        if dataset is not None:
             # Key tags to anonymize with human-readable equivalents
             anonymization_map = {
                 'PatientName': f"{prefix}_{self.faker.last_name()}",
@@ -282,6 +3371,7 @@ class DicomFolderHandler:
             }
             
             # Apply anonymization
+            self._datasets_modified = True
             anonymized_tags = {}
             for tag_name, new_value in anonymization_map.items():
                 try:
@@ -323,17 +3413,21 @@ class DicomFolderHandler:
         
         if not tag_keyword:
             return []
-        
+
+        # An indexed folder is answered by the index instead of the datasets,
+        # unless they were anonymized after loading
+        if self.folder_path and not self._datasets_modified and self._metadata_index is not None \
+                and self._metadata_index.is_indexed(self.folder_path):
+            column = next(name for name, (keyword, _) in INDEX_COLUMNS.items() if keyword == tag_keyword)
+            return [str(value) for value in self._metadata_index.values(column, self.folder_path)]
+
         # Collect values
         values = []
         for dataset in self.current_datasets:
             try:
-                # Find the tag
-                for elem in dataset:
-                    if datadict.keyword_for_tag(elem.tag) == tag_keyword:
-                        value = str(elem.value)
-                        values.append(value)
-                        break
+                value = dataset.get(tag_keyword)
+                if value is not None:
+                    values.append(str(value))
             except:
                 pass
         
@@ -362,6 +3456,7 @@ class DicomFolderHandler:
     
         # Collect anonymized tags for all files
         all_anonymized_tags = []
+        self._datasets_modified = True
     
         # Anonymize each dataset
         for dataset in self.current_datasets:
@@ -393,7 +3488,8 @@ class DicomFolderHandler:
         Returns:
             dict: Dictionary of metadata values
         """
-        if 0 > index or index >= len(self.current_datasets):
+        dataset = self.get_dataset(index)
+        if dataset is None:
             return {}
         
         # Mapping of explore types to DICOM tag keywords
@@ -407,9 +3503,6 @@ class DicomFolderHandler:
         # Get the corresponding tag keywords
         tag_keywords = explore_map.get(explore_type, [])
         
-        # Get the specific dataset
-        dataset = self.current_datasets[index]
-        
         # Collect values
         values = {}
         try:
@@ -441,6 +3534,24 @@ class DicomFolderViewer(QMainWindow):
         
         # New attribute for multi-frame handling
         self.multi_frame_dataset = None
+
+        # Title of the displayed image and the dataset shown in the tags table
+        self.image_title = ''
+        self.tags_dataset = None
+
+        # Window (center, width) override, None uses the DICOM header
+        self.window = None
+        self.window_drag_start = None
+
+        # Codec comparisons and folder indexing take a while, they run off
+        # the GUI thread. Not on the global pool, Qt uses it for image
+        # conversions the GUI thread waits for while holding the GIL
+        self.task_pool = QThreadPool(self)
+        self.codec_signals = CodecSignals()
+        self.codec_signals.finished.connect(self.on_codecs_compared)
+        self.index_signals = IndexSignals()
+        self.index_signals.progress.connect(self.on_index_progress)
+        self.index_signals.finished.connect(self.on_folder_indexed)
         
         self.initUI()
 
@@ -510,6 +3621,76 @@ class DicomFolderViewer(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, 'Download Error', f'An error occurred: {e}')
 
+    def transcode_dicom_files(self):
+        """
+        Save all loaded files in a chosen lossless transfer syntax
+        """
+        if not self.dicom_handler.dicom_files:
+            QMessageBox.warning(self, 'No Files', 'No DICOM files loaded.')
+            return
+
+        syntax_name, ok = QInputDialog.getItem(self, 'Transcode', 'Target transfer syntax:',
+                                               list(TRANSCODE_SYNTAXES), 0, False)
+        if not ok:
+            return
+        output_dir = QFileDialog.getExistingDirectory(self, 'Select Output Directory')
+        if not output_dir:
+            return
+
+        progress = QProgressDialog("Transcoding DICOM files...", "Cancel", 0,
+                                   len(self.dicom_handler.dicom_files), self)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.show()
+
+        def update_progress(done, total):
+            progress.setValue(done)
+            return not progress.wasCanceled()
+
+        try:
+            results = self.dicom_handler.transcode_files(
+                output_dir, TRANSCODE_SYNTAXES[syntax_name], progress=update_progress)
+        except Exception as e:
+            progress.close()
+            QMessageBox.critical(self, 'Transcode Error', f'An error occurred: {e}')
+            return
+        progress.close()
+
+        errors = [f"{os.path.basename(r['path'])}: {r['error']}" for r in results if r['error']]
+        summary = self.format_codec_summary(summarize_transcode(results))
+        if errors:
+            summary += "\n\nErrors:\n" + "\n".join(errors[:20])
+        QMessageBox.information(self, 'Transcode Complete', summary)
+
+    def compare_dicom_codecs(self):
+        """
+        Transcode a sample of the loaded files with every codec and report the trade-offs
+        """
+        if not self.dicom_handler.dicom_files:
+            QMessageBox.warning(self, 'No Files', 'No DICOM files loaded.')
+            return
+        self.compare_btn.setEnabled(False)
+        self.compare_btn.setText('Comparing Codecs...')
+        files = list(zip(self.dicom_handler.dicom_files, self.dicom_handler.current_datasets))
+        self.task_pool.start(CodecComparisonTask(self.dicom_handler, files, self.codec_signals))
+
+    def on_codecs_compared(self, result):
+        self.compare_btn.setEnabled(True)
+        self.compare_btn.setText('Compare Codecs')
+        if isinstance(result, Exception):
+            QMessageBox.critical(self, 'Codec Comparison Error', f'An error occurred: {result}')
+            return
+        QMessageBox.information(self, 'Codec Comparison', self.format_codec_summary(result))
+
+    def format_codec_summary(self, summary):
+        names = {uid: name for name, uid in TRANSCODE_SYNTAXES.items()}
+        lines = []
+        for syntax, entry in summary.items():
+            lines.append(
+                f"{names.get(syntax, syntax)}: {entry['files'] - entry['failed']}/{entry['files']} files, "
+                f"ratio {entry['compression_ratio']:.2f}, encode {entry['encode_mb_s']:.1f} MB/s, "
+                f"decode {entry['decode_mb_s']:.1f} MB/s, not bit-exact {entry['not_bit_exact']}")
+        return "\n".join(lines)
+
     def initUI(self):
         self.setWindowTitle('DICOM Folder Viewer')
         self.setGeometry(100, 100, 1400, 900)
@@ -523,6 +3704,16 @@ class DicomFolderViewer(QMainWindow):
         download_btn = QPushButton('Download Modified Files')
         download_btn.clicked.connect(self.download_dicom_files)
         control_panel.addWidget(download_btn)
+
+        # Transfer syntax conversion
+        transcode_layout = QHBoxLayout()
+        transcode_btn = QPushButton('Transcode Files')
+        transcode_btn.clicked.connect(self.transcode_dicom_files)
+        self.compare_btn = QPushButton('Compare Codecs')
+        self.compare_btn.clicked.connect(self.compare_dicom_codecs)
+        transcode_layout.addWidget(transcode_btn)
+        transcode_layout.addWidget(self.compare_btn)
+        control_panel.addLayout(transcode_layout)
     
         # Folder Open Button
         folder_btn = QPushButton('Open DICOM Folder')
@@ -546,7 +3737,7 @@ class DicomFolderViewer(QMainWindow):
         # Image Slider
         slider_layout = QHBoxLayout()
         self.image_slider = QSlider(Qt.Horizontal)
-        self.image_slider.valueChanged.connect(self.update_image)
+        self.image_slider.valueChanged.connect(self.request_image_update)
         self.slider_label = QLabel('Image: 0/0')
         slider_layout.addWidget(self.image_slider)
         slider_layout.addWidget(self.slider_label)
@@ -583,19 +3774,50 @@ class DicomFolderViewer(QMainWindow):
 
         # Image display layout
         image_layout = QVBoxLayout()
-        self.figure = Figure(figsize=(10, 10), dpi=100)
-        self.image_canvas = FigureCanvas(self.figure)
-        
-        # Connect mouse wheel event for zooming
-        self.image_canvas.mpl_connect('scroll_event', self.on_scroll)
-        
-        image_layout.addWidget(self.image_canvas)
+        self.image_title_label = QLabel()
+        self.image_title_label.setAlignment(Qt.AlignCenter)
+        image_layout.addWidget(self.image_title_label)
+
+        # Wheel zooms, left drag pans, double click fits the image
+        self.image_view = DicomImageView()
+
+        # Right mouse drag adjusts window/level
+        self.image_view.window_press.connect(self.on_window_press)
+        self.image_view.window_drag.connect(self.on_window_drag)
+        self.image_view.window_release.connect(self.on_window_release)
+
+        image_layout.addWidget(self.image_view)
         self.image_tab.setLayout(image_layout)
+        # The view and slider have the focus while browsing and would use
+        # the arrow keys themselves
+        self.image_view.installEventFilter(self)
+        self.image_slider.installEventFilter(self)
         # Tags display layout
         tags_layout = QVBoxLayout()
-        self.tags_table = QTableWidget()
-        self.tags_table.setColumnCount(2)
-        self.tags_table.setHorizontalHeaderLabels(['Tag', 'Value'])
+        self.tags_filter_input = QLineEdit()
+        self.tags_filter_input.setPlaceholderText('Filter tags')
+        tags_layout.addWidget(self.tags_filter_input)
+
+        # Tags are formatted in the background, the proxy filters as the user types
+        self.tags_model = DicomTagModel(self)
+        self.tags_proxy = QSortFilterProxyModel(self)
+        self.tags_proxy.setSourceModel(self.tags_model)
+        self.tags_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.tags_proxy.setFilterKeyColumn(-1)
+        self.tags_filter_input.textChanged.connect(self.tags_proxy.setFilterFixedString)
+
+        self.tags_table = QTableView()
+        self.tags_table.setModel(self.tags_proxy)
+        self.tags_table.setSelectionBehavior(QTableView.SelectRows)
+        self.tags_table.setWordWrap(False)
+        self.tags_table.verticalHeader().setVisible(False)
+        # Fixed row heights and interactive columns avoid measuring every row
+        self.tags_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.tags_table.horizontalHeader().setStretchLastSection(True)
+        self.tags_table.setColumnWidth(0, 110)
+        self.tags_table.setColumnWidth(1, 240)
+        self.tags_table.setColumnWidth(2, 40)
+        self.tags_table.doubleClicked.connect(self.toggle_tag_sequence)
         tags_layout.addWidget(self.tags_table)
         self.tags_tab.setLayout(tags_layout)
 
@@ -627,11 +3849,82 @@ class DicomFolderViewer(QMainWindow):
         tiles_btn.clicked.connect(self.show_dicom_tiles)
         control_panel.addWidget(tiles_btn)
 
+        # Metadata index controls
+        index_layout = QHBoxLayout()
+        index_btn = QPushButton('Index Folder')
+        index_btn.clicked.connect(self.index_dicom_folder)
+        query_btn = QPushButton('Query Index')
+        query_btn.clicked.connect(self.show_query_dialog)
+        index_layout.addWidget(index_btn)
+        index_layout.addWidget(query_btn)
+        control_panel.addLayout(index_layout)
+
+        validate_btn = QPushButton('Validate Folder')
+        validate_btn.clicked.connect(self.validate_dicom_folder)
+        control_panel.addWidget(validate_btn)
+
+        # DICOMweb server and client controls
+        dicomweb_layout = QHBoxLayout()
+        self.server_btn = QPushButton('Start Server')
+        self.server_btn.clicked.connect(self.toggle_dicomweb_server)
+        remote_btn = QPushButton('Open from Server')
+        remote_btn.clicked.connect(self.open_remote_series)
+        dicomweb_layout.addWidget(self.server_btn)
+        dicomweb_layout.addWidget(remote_btn)
+        control_panel.addLayout(dicomweb_layout)
+
+        # Window/level controls, adjusted with a right mouse drag on the image
+        window_layout = QHBoxLayout()
+        self.window_label = QLabel('W/L: default')
+        reset_window_btn = QPushButton('Reset Window')
+        reset_window_btn.clicked.connect(self.reset_window)
+        window_layout.addWidget(self.window_label)
+        window_layout.addWidget(reset_window_btn)
+        control_panel.addLayout(window_layout)
+
+
+        # Single-shot timer that coalesces slider moves into one redraw
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.timeout.connect(self.update_image)
 
         # Timer for Cine Mode
         self.cine_timer = QTimer(self)
         self.cine_timer.timeout.connect(self.next_image_cine)
         self.is_cine_mode = False
+
+        # Memory usage of the loaded files in the status bar
+        self.memory_label = QLabel()
+        memory_btn = QPushButton('Memory Budget')
+        memory_btn.clicked.connect(self.set_memory_budget)
+        self.statusBar().addPermanentWidget(self.memory_label)
+        self.statusBar().addPermanentWidget(memory_btn)
+        self.memory_timer = QTimer(self)
+        self.memory_timer.timeout.connect(self.update_memory_status)
+        self.memory_timer.start(1000)
+        self.update_memory_status()
+    def update_memory_status(self):
+        """
+        Show memory usage, frame cache hit rate and evictions in the status bar
+        """
+        usage = self.dicom_handler.memory_usage()
+        mb = 1024 * 1024
+        self.memory_label.setText(
+            f"Memory: {usage['total_bytes'] / mb:.0f} / {usage['max_bytes'] / mb:.0f} MB "
+            f"(files {usage['dataset_bytes'] / mb:.0f}, frames {usage['frame_bytes'] / mb:.0f}, "
+            f"display {usage['display_bytes'] / mb:.0f})  |  "
+            f"Hit rate: {usage['hit_rate']:.0%}  |  Evictions: {usage['evictions']}")
+
+    def set_memory_budget(self):
+        """
+        Ask for a new memory budget in megabytes
+        """
+        current = self.dicom_handler.memory_usage()['max_bytes'] // (1024 * 1024)
+        value, ok = QInputDialog.getInt(self, 'Memory Budget', 'Budget (MB):', current, 64, 1024 * 1024, 256)
+        if ok:
+            self.dicom_handler.set_memory_budget(value * 1024 * 1024)
+            self.update_memory_status()
+
     def show_dicom_tiles(self):
         """
         Open a dialog to display tiles of loaded DICOM images
@@ -644,6 +3937,146 @@ class DicomFolderViewer(QMainWindow):
         tiles_dialog = TilesDialog(self.dicom_handler, self)
         tiles_dialog.exec_()
 
+    def index_dicom_folder(self):
+        """
+        Add a folder to the persistent metadata index
+        """
+        folder_path = QFileDialog.getExistingDirectory(self, 'Select Folder to Index')
+        if not folder_path:
+            return
+
+        # The folder walk and header reads run on a worker, the dialog only
+        # shows progress
+        self.index_progress = QProgressDialog("Indexing DICOM headers...", None, 0, 0, self)
+        self.index_progress.setWindowModality(Qt.WindowModal)
+        self.index_progress.show()
+
+        self.task_pool.start(
+            IndexFolderTask(self.dicom_handler.metadata_index.db_path, folder_path, self.index_signals))
+
+    def on_index_progress(self, done, total):
+        self.index_progress.setMaximum(total)
+        self.index_progress.setValue(done)
+
+    def on_folder_indexed(self, counts):
+        self.index_progress.close()
+        if isinstance(counts, Exception):
+            QMessageBox.critical(self, 'Index Error', f'An error occurred: {counts}')
+            return
+        QMessageBox.information(
+            self, 'Index Complete',
+            f"Added {counts['added']}, updated {counts['updated']}, removed {counts['removed']}, "
+            f"unchanged {counts['unchanged']}, unreadable {counts['failed']} files.")
+
+    def validate_dicom_folder(self):
+        """
+        Check every file of a folder before ingest and save a JSON Lines report
+        """
+        folder_path = QFileDialog.getExistingDirectory(self, 'Select Folder to Validate')
+        if not folder_path:
+            return
+        report_path, _ = QFileDialog.getSaveFileName(self, 'Save Validation Report',
+                                                     'validation_report.jsonl', 'JSON Lines (*.jsonl)')
+        if not report_path:
+            return
+
+        progress = QProgressDialog("Validating DICOM files...", "Cancel", 0, 0, self)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.show()
+
+        def update_progress(done, total):
+            progress.setMaximum(total)
+            progress.setValue(done)
+            return not progress.wasCanceled()
+
+        try:
+            summary = self.dicom_handler.validate_folder(folder_path, report_path, progress=update_progress)
+        except Exception as e:
+            progress.close()
+            QMessageBox.critical(self, 'Validation Error', f'An error occurred: {e}')
+            return
+        progress.close()
+
+        message = (f"{summary['files']} files in {summary['series']} series: {summary['valid']} valid, "
+                   f"{summary['invalid']} with errors, {summary['warnings']} with warnings "
+                   f"({summary['files_per_minute']} files/min).")
+        if summary['series_issues']:
+            message += "\n\n" + "\n".join(f"{issue['series']}: {issue['issue']}"
+                                             for issue in summary['series_issues'][:20])
+        QMessageBox.information(self, 'Validation Complete', f"{message}\n\nReport saved to {report_path}")
+
+    def show_query_dialog(self):
+        """
+        Open a dialog to search the metadata index
+        """
+        dialog = QueryDialog(self.dicom_handler, self)
+        dialog.exec_()
+
+    def toggle_dicomweb_server(self):
+        """
+        Start or stop serving the loaded files over DICOMweb
+        """
+        if self.dicom_handler.dicomweb_server is not None:
+            self.dicom_handler.stop_dicomweb()
+            self.server_btn.setText('Start Server')
+            return
+
+        if not self.dicom_handler.dicom_files:
+            QMessageBox.warning(self, 'No Files', 'Please load a DICOM folder first.')
+            return
+        if self.dicom_handler.remote_source is not None:
+            QMessageBox.warning(self, 'Remote Series', 'Files opened from a server cannot be served again.')
+            return
+
+        try:
+            server = self.dicom_handler.serve_dicomweb()
+        except OSError as e:
+            QMessageBox.critical(self, 'Server Error', f'Could not start the server: {e}')
+            return
+        self.server_btn.setText('Stop Server')
+        QMessageBox.information(self, 'Server Started', f'Serving DICOMweb at {server.url}')
+
+    def open_remote_series(self):
+        """
+        Pick a study and series on a DICOMweb server and view it
+        """
+        url, ok = QInputDialog.getText(self, 'Open from Server', 'DICOMweb URL:', text='http://127.0.0.1:8042')
+        if not ok or not url:
+            return
+
+        try:
+            client = DicomWebClient(url)
+            studies = client.search_studies()
+            if not studies:
+                QMessageBox.information(self, 'No Studies', 'The server has no studies.')
+                return
+            labels = [f"{dicom_json_first(study, 'PatientName') or 'Unknown'} - "
+                      f"{dicom_json_first(study, 'StudyDate') or ''} "
+                      f"{dicom_json_first(study, 'StudyDescription') or ''}" for study in studies]
+            label, ok = QInputDialog.getItem(self, 'Select Study', 'Study:', labels, 0, False)
+            if not ok:
+                return
+            study_uid = dicom_json_first(studies[labels.index(label)], 'StudyInstanceUID')
+
+            series = client.search_series(study_uid)
+            labels = [f"{dicom_json_first(item, 'Modality') or ''} "
+                      f"{dicom_json_first(item, 'SeriesDescription') or ''} "
+                      f"({dicom_json_first(item, 'SeriesInstanceUID')})" for item in series]
+            label, ok = QInputDialog.getItem(self, 'Select Series', 'Series:', labels, 0, False)
+            if not ok:
+                return
+            series_uid = dicom_json_first(series[labels.index(label)], 'SeriesInstanceUID')
+
+            self.dicom_handler.load_remote_series(client, study_uid, series_uid)
+        except Exception as e:
+            QMessageBox.critical(self, 'Server Error', f'An error occurred: {e}')
+            return
+
+        if not self.dicom_handler.dicom_files:
+            QMessageBox.warning(self, 'Empty Series', 'The selected series has no instances.')
+            return
+        self.show_loaded_files()
+
     def load_multi_frame_dicom(self):
         """
         Load a multi-frame DICOM file and display it as a video-like sequence
@@ -660,8 +4093,9 @@ class DicomFolderViewer(QMainWindow):
                     
                     # Clear previous state
                     self.multi_frame_dataset = dataset
-                    self.dicom_handler.dicom_files = [file_path] * num_frames
-                    self.dicom_handler.current_datasets = [dataset] * num_frames
+                    self.image_view.clear()
+                    self.window = None
+                    self.dicom_handler.load_dicom_file(file_path, dataset)
                     
                     # Setup slider for frames
                     self.current_index = 0
@@ -677,6 +4111,7 @@ class DicomFolderViewer(QMainWindow):
                     # Automatically start cine mode for multi-frame
                     self.cine_btn.setText('Pause Cine')
                     self.is_cine_mode = True
+                    self.dicom_handler.prefetch_frames(0)
                     self.cine_timer.start(100)  # Faster timer for smoother video-like display
                 else:
                     QMessageBox.warning(self, 'Not Multi-Frame', 'Selected DICOM file is not a multi-frame image.')
@@ -691,7 +4126,11 @@ class DicomFolderViewer(QMainWindow):
             self.cine_timer.stop()
             self.cine_btn.setText('Start Cine')
             self.is_cine_mode = False
+            # Tags were not updated during playback
+            if self.dicom_handler.get_dataset(self.current_index) is not self.tags_dataset:
+                self.display_tags()
         else:
+            self.dicom_handler.prefetch_frames(self.image_slider.value())
             self.cine_timer.start(500)  # Adjust interval (ms) for desired speed
             self.cine_btn.setText('Pause Cine')
             self.is_cine_mode = True
@@ -700,15 +4139,51 @@ class DicomFolderViewer(QMainWindow):
         """
         Advance to the next image in cine mode, wrapping around if needed.
         """
-        if self.dicom_handler.dicom_files:
-            current_value = self.image_slider.value()
-            
-            next_value = current_value + 1
-        if next_value < len(self.dicom_handler.dicom_files):
+        if not self.dicom_handler.image_count():
+            return
+
+        next_value = self.dicom_handler.next_cine_index(self.image_slider.value())
+        if next_value is not None:
             self.image_slider.setValue(next_value)  # This triggers update_image
+            # Keep the decoder ahead of playback
+            self.dicom_handler.prefetch_frames(next_value)
         else:
             # Stop cine mode if needed, e.g., by disabling a timer or indicating completion
-            self.toggle_cine_mode
+            self.toggle_cine_mode()
+
+    def navigate_key(self, key):
+        """
+        Step through enhanced multi-frame files by dimension: Up/Down for
+        slices, Left/Right for time, Page Up/Down for stacks
+
+        Returns:
+            bool: True if the key moved to another image; at the end of a
+            dimension the key is left to the focused widget
+        """
+        coordinates = self.dicom_handler.image_coordinates(self.image_slider.value())
+        steps = {Qt.Key_PageUp: (-1, 0, 0), Qt.Key_PageDown: (1, 0, 0),
+                 Qt.Key_Up: (0, 1, 0), Qt.Key_Down: (0, -1, 0),
+                 Qt.Key_Right: (0, 0, 1), Qt.Key_Left: (0, 0, -1)}
+        if coordinates is None or key not in steps:
+            return False
+
+        target = [value + step for value, step in zip(coordinates, steps[key])]
+        image = self.dicom_handler.image_at(*target)
+        if image is None:
+            return False
+        self.image_slider.setValue(image)
+        return True
+
+    def keyPressEvent(self, event):
+        if not self.navigate_key(event.key()):
+            super().keyPressEvent(event)
+
+    def eventFilter(self, watched, event):
+        # Dimension navigation takes the keys before the focused view or slider
+        if (event.type() == QEvent.KeyPress and watched in (self.image_view, self.image_slider)
+                and self.navigate_key(event.key())):
+            return True
+        return super().eventFilter(watched, event)
 
 
     def open_single_dicom_file(self):
@@ -721,8 +4196,10 @@ class DicomFolderViewer(QMainWindow):
             try:
                 dataset = pydicom.dcmread(file_path)
                 
-                # Reset multi-frame dataset
+                # Reset multi-frame dataset and the zoomed image
                 self.multi_frame_dataset = None
+                self.image_view.clear()
+                self.window = None
                 
                 # Check if it's a multi-frame image
                 if hasattr(dataset, 'NumberOfFrames') and int(dataset.NumberOfFrames) > 1:
@@ -730,8 +4207,7 @@ class DicomFolderViewer(QMainWindow):
                     
                     # Setup for multi-frame
                     self.multi_frame_dataset = dataset
-                    self.dicom_handler.dicom_files = [file_path] * num_frames
-                    self.dicom_handler.current_datasets = [dataset] * num_frames
+                    self.dicom_handler.load_dicom_file(file_path, dataset)
                     
                     # Setup slider for frames
                     self.current_index = 0
@@ -743,11 +4219,11 @@ class DicomFolderViewer(QMainWindow):
                     # Automatically start cine mode for multi-frame
                     self.cine_btn.setText('Pause Cine')
                     self.is_cine_mode = True
+                    self.dicom_handler.prefetch_frames(0)
                     self.cine_timer.start(100)  # Faster timer for smoother video-like display
                 else:
                     # Setup for single-frame
-                    self.dicom_handler.dicom_files = [file_path]
-                    self.dicom_handler.current_datasets = [dataset]
+                    self.dicom_handler.load_dicom_file(file_path, dataset)
                     self.current_index = 0
                     
                     # Update slider
@@ -767,47 +4243,47 @@ class DicomFolderViewer(QMainWindow):
 
             except Exception as e:
                 QMessageBox.critical(self, 'Error', f"Could not open DICOM file: {e}")
-    def on_scroll(self, event):
+    def on_window_press(self, x, y):
         """
-        Handle mouse scroll events for zooming
+        Start interactive window/level adjustment on right mouse drag
         """
-        # Check if we have an active plot
-        if not event.inaxes:
+        if not self.dicom_handler.image_count():
             return
-        
-        # Current axes
-        ax = event.inaxes
-        
-        # Get the current xlim and ylim
-        cur_xlim = ax.get_xlim()
-        cur_ylim = ax.get_ylim()
-        
-        # Scaling factor
-        xdata = event.xdata  # get event x location
-        ydata = event.ydata  # get event y location
-        
-        if event.button == 'up':
-            # Zoom in
-            scale_factor = 0.9
-        elif event.button == 'down':
-            # Zoom out
-            scale_factor = 1.1
-        else:
-            # Ignore other scroll events
+        window = self.dicom_handler.get_window(self.current_index, self.window)
+        if window is None:
             return
+        self.window_drag_start = (x, y, window)
 
-        # Calculate new limits
-        new_width = (cur_xlim[1] - cur_xlim[0]) * scale_factor
-        new_height = (cur_ylim[1] - cur_ylim[0]) * scale_factor
-        
-        relx = (cur_xlim[1] - xdata)/(cur_xlim[1] - cur_xlim[0])
-        rely = (cur_ylim[1] - ydata)/(cur_ylim[1] - cur_ylim[0])
+    def on_window_drag(self, x, y):
+        """
+        Adjust window width (horizontal) and level (vertical) while dragging
+        """
+        if self.window_drag_start is None:
+            return
+        start_x, start_y, (center, width) = self.window_drag_start
 
-        ax.set_xlim([xdata - new_width * (1-relx), xdata + new_width * (relx)])
-        ax.set_ylim([ydata - new_height * (1-rely), ydata + new_height * (rely)])
-        
-        # Redraw the canvas
-        self.image_canvas.draw_idle()
+        # Move proportionally to the starting width so CT and 8-bit data feel alike,
+        # dragging up lowers the level (view y grows downwards)
+        step = max(width, 1.0) / 200.0
+        new_width = max(1.0, width + (x - start_x) * step)
+        new_center = center + (y - start_y) * step
+        self.window = (round(new_center, 1), round(new_width, 1))
+
+        # Only the LUT gather runs again, the decoded frame stays cached
+        pixel_array = self.dicom_handler.get_display_image(self.current_index, self.window, cache=False)
+        if pixel_array is not None:
+            self.render_image(pixel_array, self.image_title)
+        self.window_label.setText(f'W: {self.window[1]:g}  L: {self.window[0]:g}')
+
+    def on_window_release(self):
+        self.window_drag_start = None
+
+    def reset_window(self):
+        """
+        Go back to the window stored in the DICOM header
+        """
+        self.window = None
+        self.update_image()
 
     def explore_dicom_data(self):
         """
@@ -900,95 +4376,109 @@ class DicomFolderViewer(QMainWindow):
             if not dicom_files:
                 QMessageBox.warning(self, 'No DICOM Files', 'No DICOM files found in the selected folder.')
                 return
+            self.show_loaded_files()
+
+    def open_dicom_files(self, file_paths):
+        """
+        Load and display a list of DICOM files, e.g. a series found in the index
+        """
+        dicom_files = self.dicom_handler.load_dicom_files(file_paths)
+        if not dicom_files:
+            QMessageBox.warning(self, 'No DICOM Files', 'None of the selected files could be read.')
+            return
+        self.show_loaded_files()
+
+    def show_loaded_files(self):
+        """
+        Reset the display state for newly loaded files and show the first image
+        """
+        image_count = self.dicom_handler.image_count()
 
-            # Setup slider
-            self.image_slider.setMinimum(0)
-            self.image_slider.setMaximum(len(dicom_files) - 1)
-            self.image_slider.setValue(0)
-            self.current_index = 0
+        # A folder replaces any multi-frame file that was open
+        self.multi_frame_dataset = None
+        self.image_view.clear()
+        self.window = None
+
+        # Setup slider
+        self.image_slider.setMinimum(0)
+        self.image_slider.setMaximum(image_count - 1)
+        self.image_slider.setValue(0)
+        self.current_index = 0
 
-            # Update slider label
-            self.slider_label.setText(f'Image: 1/{len(dicom_files)}')
+        # Update slider label
+        self.slider_label.setText(f'Image: 1/{image_count}')
 
-            # Display the first image
-            self.update_image()
-            self.display_tags()
+        # Display the first image
+        self.update_image()
+        self.display_tags()
+
+    def request_image_update(self):
+        """
+        Schedule a redraw for the slider position, coalescing rapid slider moves
+        """
+        # Restarting the single-shot timer drops intermediate indices, only
+        # the latest slider value is rendered once the event loop is idle
+        self.render_timer.start(0)
 
     def update_image(self):
         # Get current slider value
         self.current_index = self.image_slider.value()
 
+        # Extract the image as a windowed 8-bit buffer, cached by the handler
+        pixel_array = self.dicom_handler.get_display_image(self.current_index, self.window)
+        if pixel_array is None:
+            return
+        if self.window is None:
+            self.window_label.setText('W/L: default')
+
         # Check if multi-frame dataset is loaded
         if self.multi_frame_dataset and 'NumberOfFrames' in self.multi_frame_dataset:
             num_frames = int(self.multi_frame_dataset.NumberOfFrames)
-            self.slider_label.setText(f'Frame: {self.current_index + 1}/{num_frames}')
-            
-            # Extract specific frame
-            pixel_array = self.multi_frame_dataset.pixel_array[self.current_index]
-            
-            # Clear previous plot
-            self.figure.clear()
-            
-            # Create new axes
-            ax = self.figure.add_subplot(111)
-            
-            # Display the frame
-            img = ax.imshow(pixel_array, cmap='gray')
-            ax.set_title(f'Frame {self.current_index + 1}')
-            ax.axis('off')
-            
-            # Tight layout to remove extra white space
-            self.figure.tight_layout()
-            
-            # Redraw the canvas
-            self.image_canvas.draw()
-            
-            # Update tags
-            self.display_tags()
-        
+            label = f'Frame: {self.current_index + 1}/{num_frames}'
+            coordinates = self.dicom_handler.image_coordinates(self.current_index)
+            if coordinates is not None:
+                stack, slice_number, time = coordinates
+                shape = self.dicom_handler.multi_frame_index.shape
+                label += (f'  Stack {stack + 1}/{shape[0]}, Slice {slice_number + 1}/{shape[1]}, '
+                          f'Time {time + 1}/{shape[2]}')
+            self.slider_label.setText(label)
+            self.render_image(pixel_array, f'Frame {self.current_index + 1}')
+
         # Handle single-frame or folder DICOM files
         else:
-            # Get pixel array
-            pixel_array = self.dicom_handler.get_image_at_index(self.current_index)
-
-            if pixel_array is not None:
-                # Clear previous plot
-                self.figure.clear()
-
-                # Create new axes
-                ax = self.figure.add_subplot(111)
-
-                # Display the image
-                img = ax.imshow(pixel_array, cmap='gray')
-                ax.set_title(f'Image {self.current_index + 1}')
-                ax.axis('off')
+            total_images = self.dicom_handler.image_count()
+            self.slider_label.setText(f'Image: {self.current_index + 1}/{total_images}')
+            self.render_image(pixel_array, f'Image {self.current_index + 1}')
 
-                # Update slider label
-                total_images = len(self.dicom_handler.dicom_files)
-                self.slider_label.setText(f'Image: {self.current_index + 1}/{total_images}')
+        # Frames of one multi-frame file share their tags, and cine playback
+        # leaves the tag view alone until it is paused
+        if not self.is_cine_mode and self.dicom_handler.get_dataset(self.current_index) is not self.tags_dataset:
+            self.display_tags()
 
-                # Tight layout to remove extra white space
-                self.figure.tight_layout()
+    def render_image(self, pixel_array, title):
+        """
+        Show an image in the view, wrapping the display buffer without copying
 
-                # Redraw the canvas
-                self.image_canvas.draw()
+        Args:
+            pixel_array (numpy.ndarray): Windowed uint8 image to display
+            title (str): Title shown above the image
+        """
+        # Same geometry keeps zoom and pan, a new size fits the image
+        self.image_view.set_image(pixel_array)
+        if title != self.image_title:
+            self.image_title = title
+            self.image_title_label.setText(title)
 
-                # Update tags
-                self.display_tags()
     def display_tags(self):
-        # Get tags for current image
-        tags = self.dicom_handler.get_dicom_tags(self.current_index)
-        
-        # Clear previous tags
-        self.tags_table.setRowCount(0)
-        self.tags_table.setRowCount(len(tags))
-        
-        # Populate tags table
-        for row, (tag, value) in enumerate(tags.items()):
-            self.tags_table.setItem(row, 0, QTableWidgetItem(str(tag)))
-            self.tags_table.setItem(row, 1, QTableWidgetItem(str(value)))
-        
-        self.tags_table.resizeColumnsToContents()
+        # Tags of the current image are formatted on a worker thread
+        self.tags_dataset = self.dicom_handler.get_dataset(self.current_index)
+        self.tags_model.set_dataset(self.tags_dataset)
+
+    def toggle_tag_sequence(self, proxy_index):
+        """
+        Expand or collapse the sequence that was double-clicked in the tag view
+        """
+        self.tags_model.toggle_expanded(self.tags_proxy.mapToSource(proxy_index).row())
 
     def search_dicom_tag(self):
         tag = self.tag_search_input.text()
@@ -1,42 +1,1173 @@
+import os
 import sys
+import csv
+import glob
+import json
+import time
+import argparse
+import multiprocessing
+import hashlib
+import functools
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import cv2
 import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                            QPushButton, QLabel, QFileDialog, QComboBox, QSpinBox, 
                            QDoubleSpinBox, QGraphicsView, QGraphicsScene, QRubberBand,
-                           QGroupBox, QMessageBox, QShortcut, QStatusBar, QSlider,QStylePainter)
-from PyQt5.QtCore import Qt, QRect, QPoint
-from PyQt5.QtGui import QImage, QPainter, QPixmap, QKeySequence, QIcon
-import matplotlib.pyplot as plt
+                           QGroupBox, QMessageBox, QShortcut, QStatusBar, QSlider,QStylePainter,
+                           QCheckBox, QDockWidget, QLineEdit, QListWidget, QListWidgetItem)
+from PyQt5.QtCore import Qt, QRect, QRectF, QPoint, QSize, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter, QPixmap, QKeySequence, QIcon, QPen
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
+# Processing stages: module-level functions taking an image and keyword
+# parameters and returning a new image. They never modify their input,
+# since results are shared through the cache.
+
+INTERPOLATION_METHODS = {
+    'Nearest Neighbor': cv2.INTER_NEAREST,
+    'Linear': cv2.INTER_LINEAR,
+    'Bilinear': cv2.INTER_LINEAR,
+    'Cubic': cv2.INTER_CUBIC
+}
+
+
+def zoom_stage(image, factor=1.0, interpolation='Linear'):
+    if factor == 1.0:
+        return image
+    new_size = (int(image.shape[1] * factor), int(image.shape[0] * factor))
+    return cv2.resize(image, new_size, interpolation=INTERPOLATION_METHODS[interpolation])
+
+
+def noise_stage(image, kind='None', seed=0, sigma=25, amount=0.05):
+    if kind == 'None':
+        return image
+    # Seeded so the same parameters always give the same (cacheable) result;
+    # all channels are drawn at once in float32 and added with saturation
+    rng = np.random.default_rng(seed)
+    if kind == 'Gaussian':
+        noise = rng.standard_normal(image.shape, dtype=np.float32) * sigma
+        return cv2.add(image, noise, dtype=cv2.CV_8U)
+    if kind == 'Salt & Pepper':
+        draw = rng.random(image.shape, dtype=np.float32)
+        noisy = image.copy()
+        noisy[draw < amount / 2] = 0
+        noisy[draw > 1 - amount / 2] = 255
+        return noisy
+    if kind == 'Speckle':
+        # Multiplicative: each pixel varies by sigma/255 of its own value
+        noise = rng.standard_normal(image.shape, dtype=np.float32) * (sigma / 255)
+        return cv2.add(image, image * noise, dtype=cv2.CV_8U)
+    return image
+
+
+def denoise_stage(image, method='None', kernel_size=5, h=3.0):
+    if method == 'None':
+        return image
+    if method == 'Non-local Means':
+        if image.ndim == 3:
+            return cv2.fastNlMeansDenoisingColored(image, None, h, h)
+        return cv2.fastNlMeansDenoising(image, None, h)
+    # OpenCV filters all channels in one call
+    if method == 'Median Filter':
+        return cv2.medianBlur(image, kernel_size)
+    if method == 'Gaussian Filter':
+        return cv2.GaussianBlur(image, (kernel_size, kernel_size), 0)
+    return image
+
+
+def filter_stage(image, kind='None', kernel_size=5):
+    if kind == 'None':
+        return image
+    if kind == 'Lowpass':
+        kernel = np.ones((kernel_size, kernel_size), np.float32) / (kernel_size * kernel_size)
+    else:
+        kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]], np.float32)
+    return cv2.filter2D(image, -1, kernel)
+
+
+def contrast_method_stage(image, method='None', clip_limit=2.0, tile_grid=8, low_percentile=2.0,
+                          high_percentile=98.0):
+    if method == 'None':
+        return image
+
+    # Colour images are enhanced on the L channel of LAB
+    if image.ndim == 3:
+        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+        l, a, b = cv2.split(lab)
+    else:
+        l = image
+
+    if method == 'Histogram Equalization':
+        l = cv2.equalizeHist(l)
+    elif method == 'CLAHE':
+        clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tile_grid, tile_grid))
+        l = clahe.apply(l)
+    elif method == 'Custom Stretching':
+        low, high = np.percentile(l, (low_percentile, high_percentile))
+        scale = 255.0 / (high - low) if high > low else 1.0
+        l = cv2.addWeighted(l, scale, l, 0, -low * scale)
+
+    if image.ndim == 3:
+        return cv2.cvtColor(cv2.merge((l, a, b)), cv2.COLOR_LAB2BGR)
+    return l
+
+
+def brightness_contrast_stage(image, alpha=1.0, beta=0):
+    # Saturates to 0..255, where convertScaleAbs would mirror negative values
+    return cv2.addWeighted(image, alpha, image, 0, beta)
+
+
+# Stage name -> function, in the order the controls apply them
+STAGES = OrderedDict([
+    ('zoom', zoom_stage),
+    ('noise', noise_stage),
+    ('denoise', denoise_stage),
+    ('filter', filter_stage),
+    ('contrast_method', contrast_method_stage),
+    ('brightness_contrast', brightness_contrast_stage),
+])
+
+
+# Images with at least this many pixels are processed tile by tile
+TILED_MIN_PIXELS = 16 * 1024 * 1024
+TILE_SIZE = 1024
+# Intermediate and output images larger than this are memory-mapped to a temporary file
+MEMMAP_MIN_BYTES = 256 * 1024 * 1024
+
+
+def stage_halo(name, params):
+    """
+    How many pixels around each output pixel a stage reads
+
+    Returns:
+        int: Halo width for tiled processing, or None if the stage needs the
+             whole image (resizing, global histogram and percentile methods)
+    """
+    if name == 'zoom':
+        return 0 if params.get('factor', 1.0) == 1.0 else None
+    if name == 'denoise':
+        method = params.get('method', 'None')
+        if method == 'None':
+            return 0
+        if method == 'Non-local Means':
+            # Default 21x21 search window of 7x7 patches
+            return 21 // 2 + 7 // 2
+        return params.get('kernel_size', 5) // 2
+    if name == 'filter':
+        kind = params.get('kind', 'None')
+        if kind == 'None':
+            return 0
+        return params.get('kernel_size', 5) // 2 if kind == 'Lowpass' else 1
+    if name == 'contrast_method':
+        return 0 if params.get('method', 'None') == 'None' else None
+    return 0
+
+
+def stage_is_identity(name, params):
+    """
+    Whether a stage leaves its input unchanged with these parameters
+    """
+    if name == 'zoom':
+        return params.get('factor', 1.0) == 1.0
+    if name == 'brightness_contrast':
+        return params.get('alpha', 1.0) == 1.0 and params.get('beta', 0) == 0
+    key = {'noise': 'kind', 'denoise': 'method', 'filter': 'kind', 'contrast_method': 'method'}[name]
+    return params.get(key, 'None') == 'None'
+
+
+def image_key(image):
+    """
+    Content hash of an image, the cache key of a pipeline input
+    """
+    image = np.ascontiguousarray(image)
+    digest = hashlib.blake2b(image.data, digest_size=16)
+    digest.update(f"{image.shape}{image.dtype.str}".encode())
+    return digest.hexdigest()
+
+
+def stage_key(input_key, name, params):
+    """
+    Cache key of a stage output: its input key plus the stage and its parameters
+    """
+    text = json.dumps([input_key, name, params], sort_keys=True)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of stage outputs bounded by total size in bytes
+    """
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._results.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        if image.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._results:
+                self.current_bytes -= self._results.pop(key).nbytes
+            while self._results and self.current_bytes + image.nbytes > self.max_bytes:
+                _, evicted = self._results.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+            self._results[key] = image
+            self.current_bytes += image.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.current_bytes = 0
+
+
+class ProcessingPipeline:
+    """
+    Chain of named stages with parameters
+
+    Every intermediate result is cached under a key derived from its input
+    key and the stage parameters, so re-running with only the last stage
+    changed recomputes only that stage. Pipelines chain: the key of one
+    pipeline's output is the input key of the next one.
+    """
+    VERSION = 1
+
+    def __init__(self, stages=None):
+        # List of (stage name, params dict)
+        self.stages = []
+        for name, params in stages or []:
+            self.add_stage(name, **params)
+
+    def add_stage(self, name, **params):
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage: {name}")
+        self.stages.append((name, params))
+        return self
+
+    def run(self, image, input_key=None, cache=None, cancelled=None):
+        """
+        Run all stages on an image
+
+        Args:
+            image (numpy.ndarray): Input image
+            input_key (str): Key of the input, hashed from the pixels if None
+            cache (ResultCache): Cache of intermediate results, or None
+            cancelled (callable): Checked between stages, returning True stops the run
+
+        Returns:
+            tuple: (output image, output key, number of stages computed),
+                   the image and key are None when cancelled
+        """
+        key = input_key or image_key(image)
+        computed = 0
+        for name, params in self.stages:
+            if cancelled is not None and cancelled():
+                return None, None, computed
+            key = stage_key(key, name, params)
+            result = cache.get(key) if cache is not None else None
+            if result is None:
+                result = STAGES[name](image, **params)
+                # Stages that do nothing hand back their input, nothing to store
+                if result is not image:
+                    computed += 1
+                    if cache is not None:
+                        cache.put(key, result)
+            image = result
+        return image, key, computed
+
+    def run_tiled(self, image, input_key=None, cache=None, cancelled=None, tile_size=TILE_SIZE,
+                  workers=None):
+        """
+        Run all stages tile by tile, for images too large to copy freely
+
+        Only the final result is cached. See run_tiled (module level) for
+        how stages are grouped.
+
+        Returns:
+            tuple: (output image, output key, number of stages computed),
+                   the image and key are None when cancelled
+        """
+        key = input_key or image_key(image)
+        for name, params in self.stages:
+            key = stage_key(key, name, params)
+        result = cache.get(key) if cache is not None else None
+        if result is not None:
+            return result, key, 0
+        result = run_tiled(self.stages, image, tile_size, workers, cancelled)
+        if result is None:
+            return None, None, 0
+        if cache is not None and result is not image:
+            cache.put(key, result)
+        return result, key, len(self.stages)
+
+    def to_dict(self):
+        return {'version': self.VERSION,
+                'stages': [{'stage': name, 'params': params} for name, params in self.stages]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([(stage['stage'], stage.get('params', {})) for stage in data.get('stages', [])])
+
+
+def allocate_image(shape, dtype):
+    """
+    Empty image, memory-mapped to an anonymous temporary file when large
+    """
+    if int(np.prod(shape)) * np.dtype(dtype).itemsize < MEMMAP_MIN_BYTES:
+        return np.empty(shape, dtype)
+    # The file is unlinked on creation and lives as long as the mapping
+    return np.memmap(tempfile.TemporaryFile(), dtype=dtype, mode='w+', shape=shape)
+
+
+def tile_segments(stages):
+    """
+    Group consecutive tileable stages so each tile passes through them in one go
+
+    Returns:
+        list: (halo or None, stages) per segment, None for a whole-image stage
+    """
+    segments = []
+    for name, params in stages:
+        halo = stage_halo(name, params)
+        # Noise runs on its own so neighbouring tiles never see different
+        # noise in their overlap
+        alone = halo is None or (name == 'noise' and params.get('kind', 'None') != 'None')
+        if alone or not segments or segments[-1][0] is None or segments[-1][2]:
+            segments.append([halo, [(name, params)], alone])
+        else:
+            segments[-1][0] += halo
+            segments[-1][1].append((name, params))
+    return [(halo, segment) for halo, segment, _ in segments]
+
+
+def run_tile_segment(stages, halo, image, tile_size, workers, cancelled):
+    """
+    Stream overlapping tiles of an image through stages into a new image
+
+    Each tile is read with a halo wide enough for every stage, so the result
+    matches processing the whole image. At most two tiles per worker are in
+    flight.
+
+    Returns:
+        numpy.ndarray: Result, or None when cancelled
+    """
+    height, width = image.shape[:2]
+    tiles = [(y, x) for y in range(0, height, tile_size) for x in range(0, width, tile_size)]
+
+    def process(index):
+        y, x = tiles[index]
+        y1, x1 = min(y + tile_size, height), min(x + tile_size, width)
+        top, left = max(0, y - halo), max(0, x - halo)
+        region = image[top:min(height, y1 + halo), left:min(width, x1 + halo)]
+        for name, params in stages:
+            if name == 'noise':
+                # A different, reproducible noise pattern for every tile
+                params = dict(params, seed=params.get('seed', 0) * len(tiles) + index)
+            region = STAGES[name](region, **params)
+        return region[y - top:y1 - top, x - left:x1 - left]
+
+    # The first tile decides the output type and channels
+    first = process(0)
+    result = allocate_image((height, width) + first.shape[2:], first.dtype)
+    result[:first.shape[0], :first.shape[1]] = first
+
+    def write(index, tile):
+        y, x = tiles[index]
+        result[y:y + tile.shape[0], x:x + tile.shape[1]] = tile
+
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for index in range(1, len(tiles)):
+            if cancelled is not None and cancelled():
+                for _, future in in_flight:
+                    future.cancel()
+                return None
+            if len(in_flight) >= 2 * workers:
+                done, future = in_flight.popleft()
+                write(done, future.result())
+            in_flight.append((index, executor.submit(process, index)))
+        while in_flight:
+            done, future = in_flight.popleft()
+            write(done, future.result())
+    return result
+
+
+def run_tiled(stages, image, tile_size=TILE_SIZE, workers=None, cancelled=None):
+    """
+    Run stages on an image in tiles across a thread pool
+
+    Tileable stages are streamed tile by tile; the others (resizing, global
+    contrast methods) fall back to processing the whole image at once.
+
+    Args:
+        stages (list): (stage name, params) pairs
+        image (numpy.ndarray): Input image, may be memory-mapped
+        tile_size (int): Tile width and height, without halo
+        workers (int): Worker threads, one per CPU if None
+        cancelled (callable): Checked between tiles, returning True stops the run
+
+    Returns:
+        numpy.ndarray: Result, or None when cancelled
+    """
+    stages = [(name, params) for name, params in stages if not stage_is_identity(name, params)]
+    for halo, segment in tile_segments(stages):
+        if cancelled is not None and cancelled():
+            return None
+        if halo is None:
+            name, params = segment[0]
+            image = STAGES[name](np.asarray(image), **params)
+        else:
+            image = run_tile_segment(segment, halo, image, tile_size, workers, cancelled)
+            if image is None:
+                return None
+    return image
+
+
+def proxy_image(image, input_key, max_size=512, cache=None):
+    """
+    Downscaled copy of an image for fast previews, cached like a stage output
+
+    Returns:
+        tuple: (proxy image, proxy key), the input itself if it is small enough
+    """
+    scale = max_size / max(image.shape[:2])
+    if scale >= 1.0:
+        return image, input_key
+    key = stage_key(input_key, 'proxy', {'max_size': max_size})
+    proxy = cache.get(key) if cache is not None else None
+    if proxy is None:
+        proxy = cv2.resize(image, (max(1, int(image.shape[1] * scale)), max(1, int(image.shape[0] * scale))),
+                           interpolation=cv2.INTER_AREA)
+        if cache is not None:
+            cache.put(key, proxy)
+    return proxy, key
+
+
+class MetricsTask(QRunnable):
+    """
+    Compute quality_metrics of an output against the input on a worker thread
+    """
+    def __init__(self, reference, image, key, signals):
+        super().__init__()
+        self.reference = reference
+        self.image = image
+        self.key = key
+        self.signals = signals
+
+    def run(self):
+        result = {'key': self.key, 'metrics': None, 'error': None}
+        try:
+            result['metrics'] = quality_metrics(self.reference, self.image, max_size=METRICS_MAX_SIZE)
+        except Exception as e:
+            result['error'] = str(e)
+        self.signals.finished.emit(result)
+
+
+class SweepTask(QRunnable):
+    """
+    Evaluate sweep points across a process pool, emitting each result as it
+    arrives and a final result with 'done' set
+    """
+    def __init__(self, source, points, signals, workers=None):
+        super().__init__()
+        self.source = source
+        # (key, stages) per point
+        self.points = points
+        self.signals = signals
+        self.workers = workers
+
+    def run(self):
+        try:
+            # Spawned, since forking a process running Qt threads is unsafe
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=init_sweep_worker, initargs=(self.source,)) as executor:
+                futures = {executor.submit(evaluate_sweep_point, stages): key for key, stages in self.points}
+                for future in as_completed(futures):
+                    try:
+                        self.signals.finished.emit({'key': futures[future], 'metrics': future.result(), 'error': None})
+                    except Exception as e:
+                        self.signals.finished.emit({'key': futures[future], 'metrics': None, 'error': str(e)})
+        finally:
+            self.signals.finished.emit({'done': True})
+
+
+class ProcessingSignals(QObject):
+    # Result dict of a finished ProcessingTask
+    finished = pyqtSignal(object)
+
+
+class ProcessingTask(QRunnable):
+    """
+    Run a pipeline on a worker thread, giving up between stages once the
+    job is stale. Always emits a result, with 'cancelled' set if it gave up.
+    """
+    def __init__(self, pipeline, image, input_key, cache, generation, is_stale, signals, **info):
+        super().__init__()
+        self.pipeline = pipeline
+        self.image = image
+        self.input_key = input_key
+        self.cache = cache
+        self.generation = generation
+        self.is_stale = is_stale
+        self.signals = signals
+        self.info = info
+
+    def run(self):
+        result = dict(self.info, generation=self.generation, pipeline=self.pipeline, image=None,
+                      key=None, computed=0, error=None, cancelled=True)
+        try:
+            if not self.is_stale(self.generation):
+                run = self.pipeline.run
+                if self.image.shape[0] * self.image.shape[1] >= TILED_MIN_PIXELS:
+                    run = self.pipeline.run_tiled
+                image, key, computed = run(
+                    self.image, self.input_key, self.cache, lambda: self.is_stale(self.generation))
+                if image is not None:
+                    result.update(image=image, key=key, computed=computed, cancelled=False)
+        except Exception as e:
+            result['error'] = str(e)
+        self.signals.finished.emit(result)
+
+
+def save_recipe(path, pipelines):
+    """
+    Save a chain of pipelines (one per output) as a JSON recipe
+    """
+    with open(path, 'w') as f:
+        json.dump({'version': ProcessingPipeline.VERSION,
+                   'outputs': [pipeline.to_dict() for pipeline in pipelines]}, f, indent=2)
+
+
+def load_recipe(path):
+    """
+    Load a chain of pipelines saved with save_recipe
+    """
+    with open(path) as f:
+        data = json.load(f)
+    return [ProcessingPipeline.from_dict(output) for output in data.get('outputs', [])]
+
+
+def run_recipe(image, pipelines, cache=None):
+    """
+    Replay a chain of pipelines, each one processing the previous output
+
+    Images of TILED_MIN_PIXELS or more are processed tile by tile. Outputs
+    are yielded one at a time so callers can write each before the next.
+
+    Yields:
+        tuple: (image, key) for every output
+    """
+    key = image_key(image)
+    for pipeline in pipelines:
+        if image.shape[0] * image.shape[1] >= TILED_MIN_PIXELS:
+            image, key, _ = pipeline.run_tiled(image, key, cache)
+        else:
+            image, key, _ = pipeline.run(image, key, cache)
+        yield image, key
+
+
+def snr_cnr(signal_mean, background_mean, noise_std):
+    """
+    SNR and CNR from region statistics, 0 when the noise region is flat
+    """
+    if noise_std == 0:
+        return 0.0, 0.0
+    return float(signal_mean / noise_std), float(abs(signal_mean - background_mean) / noise_std)
+
+
+def roi_snr_cnr(image, signal_roi, background_roi, noise_roi):
+    """
+    SNR and CNR from three ROIs given as (x, y, width, height) in image pixels
+
+    Args:
+        image (numpy.ndarray): Grayscale or BGR image
+        signal_roi (tuple): Region of the signal mean
+        background_roi (tuple): Region of the background mean, for the CNR
+        noise_roi (tuple): Region of the noise standard deviation
+
+    Returns:
+        tuple: (snr, cnr), 0 when the noise region is flat
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    signal, background, noise = [image[y:y + h, x:x + w] for x, y, w, h in (signal_roi, background_roi, noise_roi)]
+    return snr_cnr(np.mean(signal), np.mean(background), np.std(noise))
+
+
+class RegionStats:
+    """
+    Constant-time statistics of rectangular regions of an 8-bit image
+
+    Built once per image. Means and standard deviations come from integral
+    images of the gray values and their squares. Histograms (and
+    percentiles) come from an integral histogram over BLOCK x BLOCK blocks,
+    plus the pixels along the region border that do not fill a whole block.
+    Histograms have one row per plane: the image channels, then gray for
+    colour images. Regions are (x, y, width, height) in image pixels.
+    """
+    # Block side in pixels: the integral histogram takes
+    # planes * 256 * 4 bytes per block, and a region's partial border
+    # blocks are counted pixel by pixel
+    BLOCK = 64
+
+    def __init__(self, image):
+        self.image = image
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        self.gray = gray
+        self.height, self.width = gray.shape
+        self.sums, self.squares = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        self.plane_count = image.shape[2] + 1 if image.ndim == 3 else 1
+
+        # Histogram of every whole block, one band of blocks at a time, with
+        # all planes packed into one bincount
+        block, planes = self.BLOCK, self.plane_count
+        rows, columns = self.height // block, self.width // block
+        hist = np.zeros((rows, columns, planes, 256), np.int32)
+        offsets = (np.arange(columns)[:, None] * planes + np.arange(planes)) * 256
+        for row in range(rows):
+            band = self.planes(row * block, (row + 1) * block, 0, columns * block)
+            band = band.reshape(block, columns, block, planes).transpose(1, 3, 0, 2)
+            band = band.reshape(columns, planes, block * block)
+            hist[row] = np.bincount((offsets[:, :, None] + band).ravel(),
+                                    minlength=columns * planes * 256).reshape(columns, planes, 256)
+        self.block_hist = np.zeros((rows + 1, columns + 1, planes, 256), np.int32)
+        self.block_hist[1:, 1:] = hist.cumsum(axis=0).cumsum(axis=1)
+
+    def planes(self, y0, y1, x0, x1):
+        """
+        Pixels of a rectangle as (height, width, planes)
+        """
+        if self.image.ndim == 2:
+            return self.gray[y0:y1, x0:x1, None]
+        return np.dstack((self.image[y0:y1, x0:x1], self.gray[y0:y1, x0:x1]))
+
+    def count(self, y0, y1, x0, x1):
+        """
+        Histograms of a rectangle, all planes in one bincount
+        """
+        values = self.planes(y0, y1, x0, x1) + np.arange(self.plane_count) * 256
+        return np.bincount(values.ravel(), minlength=self.plane_count * 256).reshape(self.plane_count, 256)
+
+    def clip(self, roi):
+        """
+        Region corners (x0, y0, x1, y1) clipped to the image
+        """
+        x, y, w, h = roi
+        x0, y0 = max(0, int(x)), max(0, int(y))
+        x1, y1 = min(self.width, int(x + w)), min(self.height, int(y + h))
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError(f"ROI {tuple(roi)} is outside the image")
+        return x0, y0, x1, y1
+
+    def mean_std(self, roi):
+        x0, y0, x1, y1 = self.clip(roi)
+        count = (x1 - x0) * (y1 - y0)
+        total = self.sums[y1, x1] - self.sums[y0, x1] - self.sums[y1, x0] + self.sums[y0, x0]
+        squares = self.squares[y1, x1] - self.squares[y0, x1] - self.squares[y1, x0] + self.squares[y0, x0]
+        mean = total / count
+        return float(mean), float(np.sqrt(max(0.0, squares / count - mean * mean)))
+
+    def histogram(self, roi=None):
+        """
+        Histograms of a region, the whole image if roi is None
+
+        Returns:
+            numpy.ndarray: (planes, 256) counts
+        """
+        x0, y0, x1, y1 = self.clip(roi) if roi is not None else (0, 0, self.width, self.height)
+        block = self.BLOCK
+        # Whole blocks inside the region
+        bx0, by0 = -(-x0 // block), -(-y0 // block)
+        bx1 = min(x1 // block, self.block_hist.shape[1] - 1)
+        by1 = min(y1 // block, self.block_hist.shape[0] - 1)
+        if bx1 <= bx0 or by1 <= by0:
+            return self.count(y0, y1, x0, x1)
+        blocks = self.block_hist
+        hist = (blocks[by1, bx1] - blocks[by0, bx1] - blocks[by1, bx0] + blocks[by0, bx0]).astype(np.int64)
+        ix0, iy0, ix1, iy1 = bx0 * block, by0 * block, bx1 * block, by1 * block
+        for strip in ((y0, iy0, x0, x1), (iy1, y1, x0, x1), (iy0, iy1, x0, ix0), (iy0, iy1, ix1, x1)):
+            if strip[1] > strip[0] and strip[3] > strip[2]:
+                hist += self.count(*strip)
+        return hist
+
+    def percentiles(self, roi, q):
+        # Of the gray plane
+        cumulative = np.cumsum(self.histogram(roi)[-1])
+        return [int(np.searchsorted(cumulative, max(1, p / 100 * cumulative[-1]))) for p in q]
+
+    def stats(self, roi):
+        mean, std = self.mean_std(roi)
+        p5, median, p95 = self.percentiles(roi, (5, 50, 95))
+        return {'mean': mean, 'std': std, 'p5': p5, 'median': median, 'p95': p95}
+
+    def snr_cnr(self, signal_roi, background_roi, noise_roi):
+        return snr_cnr(self.mean_std(signal_roi)[0], self.mean_std(background_roi)[0],
+                       self.mean_std(noise_roi)[1])
+
+
+def histogram_entropy(hist):
+    """
+    Shannon entropy in bits of a histogram of counts
+    """
+    probabilities = hist[hist > 0] / hist.sum()
+    return float(-(probabilities * np.log2(probabilities)).sum())
+
+
+def histogram_stats(image):
+    """
+    Summary statistics of the gray level histogram of an 8-bit image
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    hist = np.bincount(image.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(hist.size)
+    total = hist.sum()
+    mean = (hist * levels).sum() / total
+    cumulative = np.cumsum(hist) / total
+    return {
+        'mean': float(mean),
+        'std': float(np.sqrt((hist * (levels - mean) ** 2).sum() / total)),
+        'min': int(levels[hist > 0][0]),
+        'max': int(levels[hist > 0][-1]),
+        'median': int(np.searchsorted(cumulative, 0.5)),
+        'p1': int(np.searchsorted(cumulative, 0.01)),
+        'p99': int(np.searchsorted(cumulative, 0.99)),
+        'entropy': histogram_entropy(hist),
+    }
+
+
+# Gaussian window of SSIM and the scale weights of MS-SSIM (Wang et al.)
+SSIM_SIGMA = 1.5
+SSIM_WINDOW = 11
+MS_SSIM_WEIGHTS = [0.0448, 0.2856, 0.3001, 0.2363, 0.1333]
+# Longest side the metrics dock compares at; the maps take about 15 float32
+# copies of the image, too much for full-resolution scans
+METRICS_MAX_SIZE = 1024
+
+
+def ssim_components(a, b):
+    """
+    SSIM luminance and contrast-structure maps of two float32 gray images
+
+    Every local mean and (co)variance is one separable Gaussian filter pass.
+
+    Returns:
+        tuple: (luminance map, contrast-structure map)
+    """
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    window = cv2.getGaussianKernel(SSIM_WINDOW, SSIM_SIGMA, cv2.CV_32F)
+
+    def blur(x):
+        return cv2.sepFilter2D(x, -1, window, window, borderType=cv2.BORDER_REFLECT)
+
+    mu_a, mu_b = blur(a), blur(b)
+    mu_aa, mu_bb, mu_ab = mu_a * mu_a, mu_b * mu_b, mu_a * mu_b
+    var_a = blur(a * a) - mu_aa
+    var_b = blur(b * b) - mu_bb
+    covariance = blur(a * b) - mu_ab
+    luminance = (2 * mu_ab + c1) / (mu_aa + mu_bb + c1)
+    contrast_structure = (2 * covariance + c2) / (var_a + var_b + c2)
+    return luminance, contrast_structure
+
+
+def estimate_noise(gray):
+    """
+    Blind noise standard deviation: median absolute value of the diagonal
+    (HH) band of a one-level Haar wavelet transform, divided by 0.6745
+    """
+    height, width = gray.shape[0] & ~1, gray.shape[1] & ~1
+    gray = gray[:height, :width]
+    hh = (gray[0::2, 0::2] - gray[0::2, 1::2] - gray[1::2, 0::2] + gray[1::2, 1::2]) / 2
+    return float(np.median(np.abs(hh)) / 0.6745) if hh.size else 0.0
+
+
+def quality_metrics(reference, image, maps=True, max_size=None):
+    """
+    Full-reference and blind quality metrics of an image against a reference
+
+    Both are converted to float32 gray once and every score is derived from
+    those two arrays. An image of a different size (zoomed) is resized to
+    the reference for the comparison, and both are downscaled first when
+    the reference is larger than max_size.
+
+    Returns:
+        dict: psnr (dB), ssim, ms_ssim, noise and reference_noise (sigma
+              estimates), plus colour-mapped 'ssim_map' and 'error_map' if
+              maps is True
+    """
+    scale = max_size / max(reference.shape[:2]) if max_size else 1.0
+    if scale < 1.0:
+        reference = cv2.resize(reference, (max(1, int(reference.shape[1] * scale)),
+                                           max(1, int(reference.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+    if image.shape[:2] != reference.shape[:2]:
+        image = cv2.resize(image, (reference.shape[1], reference.shape[0]), interpolation=cv2.INTER_AREA)
+    a = (cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY) if reference.ndim == 3 else reference).astype(np.float32)
+    b = (cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image).astype(np.float32)
+
+    error = cv2.absdiff(a, b)
+    mse = float(np.mean(error * error))
+    psnr = float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+    # SSIM at full scale; MS-SSIM uses contrast-structure at every scale
+    # and luminance at the coarsest, halving with a 2x2 box filter
+    luminance, contrast_structure = ssim_components(a, b)
+    ssim_map = luminance * contrast_structure
+    ssim = float(ssim_map.mean())
+    scores, weights = [], []
+    scale_a, scale_b = a, b
+    for weight in MS_SSIM_WEIGHTS:
+        if min(scale_a.shape) < SSIM_WINDOW:
+            break
+        if scores:
+            luminance, contrast_structure = ssim_components(scale_a, scale_b)
+        scores.append(max(float(contrast_structure.mean()), 0.0))
+        weights.append(weight)
+        last_luminance = float(luminance.mean())
+        scale_a = cv2.resize(scale_a, (scale_a.shape[1] // 2, scale_a.shape[0] // 2), interpolation=cv2.INTER_AREA)
+        scale_b = cv2.resize(scale_b, (scale_b.shape[1] // 2, scale_b.shape[0] // 2), interpolation=cv2.INTER_AREA)
+    if scores:
+        scores[-1] *= max(last_luminance, 0.0)
+        weights = np.array(weights) / sum(weights)
+        ms_ssim = float(np.prod(np.power(scores, weights)))
+    else:
+        ms_ssim = ssim
+
+    metrics = {
+        'psnr': psnr,
+        'ssim': ssim,
+        'ms_ssim': ms_ssim,
+        'noise': estimate_noise(b),
+        'reference_noise': estimate_noise(a),
+    }
+    if maps:
+        peak = max(float(error.max()), 1.0)
+        metrics['ssim_map'] = cv2.applyColorMap(np.clip(ssim_map * 255, 0, 255).astype(np.uint8), cv2.COLORMAP_JET)
+        metrics['error_map'] = cv2.applyColorMap((error * (255 / peak)).astype(np.uint8), cv2.COLORMAP_JET)
+    return metrics
+
+
+# Sweep scores, higher is better. Full-reference scores compare with the
+# clean input, so they are meaningful when the recipe adds noise first.
+SWEEP_SCORES = OrderedDict([
+    ('MS-SSIM to input', lambda metrics: metrics['ms_ssim']),
+    ('SSIM to input', lambda metrics: metrics['ssim']),
+    ('PSNR to input', lambda metrics: metrics['psnr']),
+    ('Lowest noise', lambda metrics: -metrics['noise']),
+    ('Entropy', lambda metrics: metrics['entropy']),
+])
+SWEEP_THUMBNAIL_SIZE = 128
+
+
+def sweep_grid(kernel_sizes, nlm_strengths, clahe_clips, clahe_tiles):
+    """
+    Denoise and contrast settings to evaluate: every denoise method and
+    parameter crossed with no enhancement, histogram equalization and
+    every CLAHE clip limit and tile grid
+
+    Returns:
+        list: (denoise params, contrast params) pairs
+    """
+    denoise = [{'method': 'None'}]
+    denoise += [{'method': method, 'kernel_size': size | 1}
+                for method in ('Median Filter', 'Gaussian Filter') for size in kernel_sizes]
+    denoise += [{'method': 'Non-local Means', 'h': h} for h in nlm_strengths]
+    contrast = [{'method': 'None'}, {'method': 'Histogram Equalization'}]
+    contrast += [{'method': 'CLAHE', 'clip_limit': clip, 'tile_grid': tiles}
+                 for clip in clahe_clips for tiles in clahe_tiles]
+    return [(d, c) for d in denoise for c in contrast]
+
+
+def sweep_label(denoise, contrast):
+    parts = []
+    if denoise['method'] == 'Non-local Means':
+        parts.append(f"NLM h={denoise['h']:g}")
+    elif denoise['method'] != 'None':
+        parts.append(f"{denoise['method'].split()[0]} {denoise['kernel_size']}")
+    if contrast['method'] == 'CLAHE':
+        parts.append(f"CLAHE {contrast['clip_limit']:g}/{contrast['tile_grid']}")
+    elif contrast['method'] != 'None':
+        parts.append('Equalized')
+    return ' + '.join(parts) or 'Unprocessed'
+
+
+# Proxy image of the sweep, set once per worker process
+_sweep_source = None
+
+
+def init_sweep_worker(source):
+    global _sweep_source
+    _sweep_source = source
+
+
+def evaluate_sweep_point(stages):
+    """
+    Run one sweep pipeline on the worker's proxy and score it against the proxy
+
+    Returns:
+        dict: Metrics without maps, the histogram entropy and a thumbnail
+    """
+    image, _, _ = ProcessingPipeline(stages).run(_sweep_source)
+    metrics = quality_metrics(_sweep_source, image, maps=False)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    metrics['entropy'] = histogram_entropy(np.bincount(gray.ravel(), minlength=256))
+    scale = SWEEP_THUMBNAIL_SIZE / max(image.shape[:2])
+    metrics['thumbnail'] = cv2.resize(image, (max(1, int(image.shape[1] * scale)), max(1, int(image.shape[0] * scale))),
+                                      interpolation=cv2.INTER_AREA) if scale < 1 else image
+    return metrics
+
+
+BATCH_FIELDS = ['file', 'output', 'path', 'width', 'height', 'snr', 'cnr', 'mean', 'std', 'min', 'max',
+                'median', 'p1', 'p99', 'entropy', 'seconds', 'error']
+
+
+def process_batch_file(path, pipelines, output_stem, rois=None):
+    """
+    Replay a recipe on one image file and write every output, without Qt
+
+    Runs in a worker process, which reads and writes its own files so only
+    file names and metrics cross the process boundary.
+
+    Args:
+        path (str): Input image file
+        pipelines (list): ProcessingPipeline per output
+        output_stem (str): Output path without extension, '_output<n>.png' is appended
+        rois (tuple): (signal, background, noise) ROIs for SNR/CNR, or None
+
+    Returns:
+        list: CSV row dict per output
+    """
+    start = time.perf_counter()
+    image = cv2.imread(path)
+    if image is None:
+        return [{'file': path, 'error': 'Could not read image'}]
+    rows = []
+    for number, (image, _) in enumerate(run_recipe(image, pipelines), start=1):
+        output_path = f"{output_stem}_output{number}.png"
+        cv2.imwrite(output_path, image)
+        row = {'file': path, 'output': number, 'path': output_path,
+               'width': image.shape[1], 'height': image.shape[0]}
+        if rois is not None:
+            row['snr'], row['cnr'] = roi_snr_cnr(image, *rois)
+        row.update(histogram_stats(image))
+        rows.append(row)
+    for row in rows:
+        row['seconds'] = round(time.perf_counter() - start, 4)
+    return rows
+
+
+def run_batch(pipelines, patterns, output_dir, csv_path=None, workers=None, rois=None):
+    """
+    Process every image matching the patterns with a saved recipe
+
+    Files are spread over a process pool with at most two files per worker
+    in flight, which bounds memory to a few decoded images per worker.
+
+    Args:
+        pipelines (list): ProcessingPipeline per output, from load_recipe
+        patterns (list): Input glob patterns, '**' matches subfolders
+        output_dir (str): Folder for processed images and the CSV
+        csv_path (str): Metrics CSV, output_dir/metrics.csv if None
+        workers (int): Worker processes, one per CPU if None
+        rois (tuple): (signal, background, noise) ROIs for SNR/CNR, or None
+
+    Returns:
+        int: Number of files that failed
+
+    Raises:
+        FileNotFoundError: When no file matches the patterns
+    """
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern, recursive=True)
+                    if os.path.isfile(path)})
+    if not paths:
+        raise FileNotFoundError(f"No input images match {' '.join(patterns)}")
+    os.makedirs(output_dir, exist_ok=True)
+    csv_path = csv_path or os.path.join(output_dir, 'metrics.csv')
+
+    # Same-named inputs from different folders get numbered outputs
+    stems, seen = [], {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        seen[stem] = seen.get(stem, 0) + 1
+        stems.append(os.path.join(output_dir, stem if seen[stem] == 1 else f"{stem}_{seen[stem]}"))
+
+    workers = workers or os.cpu_count() or 1
+    failed = 0
+    start = time.perf_counter()
+    with open(csv_path, 'w', newline='') as f, ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.DictWriter(f, fieldnames=BATCH_FIELDS)
+        writer.writeheader()
+
+        def collect(path, future):
+            try:
+                rows = future.result()
+            except Exception as e:
+                rows = [{'file': path, 'error': str(e)}]
+            writer.writerows(rows)
+            return any(row.get('error') for row in rows)
+
+        in_flight = deque()
+        for path, stem in zip(paths, stems):
+            if len(in_flight) >= 2 * workers:
+                failed += collect(*in_flight.popleft())
+            in_flight.append((path, executor.submit(process_batch_file, path, pipelines, stem, rois)))
+        while in_flight:
+            failed += collect(*in_flight.popleft())
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {len(paths)} images ({failed} failed) in {elapsed:.1f}s, "
+          f"{len(paths) / elapsed:.2f} images/s")
+    print(f"Metrics written to {csv_path}")
+    return failed
+
+
+def parse_roi(text):
+    """
+    argparse type for an ROI given as x,y,width,height
+    """
+    try:
+        x, y, w, h = (int(value) for value in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected x,y,width,height, got {text!r}")
+    return x, y, w, h
+
+
+def numpy_to_qimage(image):
+    """
+    Wrap a BGR or grayscale uint8 image in a QImage without copying
+
+    Returns:
+        tuple: (QImage, array it reads from), keep the array alive while the
+               QImage is in use
+    """
+    image = np.ascontiguousarray(image)
+    height, width = image.shape[:2]
+    if image.ndim == 2:
+        return QImage(image.data, width, height, image.strides[0], QImage.Format_Grayscale8), image
+    if hasattr(QImage, 'Format_BGR888'):
+        # Qt >= 5.14 reads OpenCV's channel order directly
+        return QImage(image.data, width, height, image.strides[0], QImage.Format_BGR888), image
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return QImage(rgb.data, width, height, rgb.strides[0], QImage.Format_RGB888), rgb
+
+
 class ROISelector(QGraphicsView):
+    # An ROI was added, or the ROIs were cleared
+    roisChanged = pyqtSignal()
+    # ROI being drawn, in image pixels, while the rubber band moves
+    roiDragged = pyqtSignal(object)
+    
     def __init__(self, title, parent=None):
         super().__init__(parent)
         self.setWindowTitle(title)
         self.roi_start = None
-        self.roi_end = None
         self.rubberBand = None
+        # (x, y, width, height) in image pixels, the scene is in image pixels
         self.rois = []
+        
+        # One persistent scene and pixmap item, updated in place
+        self.setScene(QGraphicsScene(self))
+        self.pixmap_item = self.scene().addPixmap(QPixmap())
+        self.pixmap_item.setTransformationMode(Qt.SmoothTransformation)
+        # Level of detail pyramid of the shown image, each level half the previous
+        self.levels = []
+        self.level = None
+        self.full_scale = 1.0
+        
         # Add zoom support
         self.setDragMode(QGraphicsView.ScrollHandDrag)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
-        self.setRenderHint(QPainter.Antialiasing)
+        # Only the exposed regions are repainted when panning
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setOptimizationFlag(QGraphicsView.DontAdjustForAntialiasing)
         self.setRenderHint(QPainter.SmoothPixmapTransform)
         
+    def set_image(self, image, shape=None):
+        """
+        Show an image, stretched to shape (height, width) if given so a
+        downscaled preview keeps the scene in full-size image pixels
+        
+        The zoom and scroll position are kept unless the scene size changes.
+        """
+        height, width = shape if shape is not None else image.shape[:2]
+        self.full_scale = width / image.shape[1]
+        self.levels = [image]
+        self.level = None
+        resized = self.sceneRect() != QRectF(0, 0, width, height)
+        self.setSceneRect(0, 0, width, height)
+        if resized:
+            self.fitInView(self.sceneRect(), Qt.KeepAspectRatio)
+        self.update_level()
+        
+    def clear_image(self):
+        self.levels = []
+        self.level = None
+        self.pixmap_item.setPixmap(QPixmap())
+        
+    def update_level(self):
+        """
+        Show the coarsest pyramid level that still has a pixel per screen pixel
+        """
+        if not self.levels:
+            return
+        # Screen pixels per pixel of the full-resolution level
+        ratio = self.transform().m11() * self.full_scale
+        level = max(0, int(np.floor(np.log2(1 / ratio)))) if ratio > 0 else 0
+        while len(self.levels) <= level and min(self.levels[-1].shape[:2]) > 1:
+            self.levels.append(cv2.pyrDown(self.levels[-1]))
+        level = min(level, len(self.levels) - 1)
+        if level == self.level:
+            return
+        self.level = level
+        image = self.levels[level]
+        q_image, _ = numpy_to_qimage(image)
+        self.pixmap_item.setPixmap(QPixmap.fromImage(q_image))
+        self.pixmap_item.setScale(self.sceneRect().width() / image.shape[1])
+        
     def wheelEvent(self, event):
         if event.modifiers() == Qt.ControlModifier:
             # Zoom in/out with mouse wheel
             factor = 1.1 if event.angleDelta().y() > 0 else 0.9
             self.scale(factor, factor)
+            self.update_level()
         else:
             super().wheelEvent(event)
             
+    def image_roi(self, start, end):
+        """
+        ROI between two viewport points in image pixels, clipped to the image
+        
+        Returns:
+            tuple: (x, y, width, height), or None if it is empty
+        """
+        if not self.levels:
+            return None
+        rect = self.mapToScene(QRect(start, end).normalized()).boundingRect()
+        rect = rect.intersected(self.sceneRect()).toAlignedRect()
+        if rect.width() <= 0 or rect.height() <= 0:
+            return None
+        return rect.x(), rect.y(), rect.width(), rect.height()
+            
     def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton and len(self.rois) < 3:
-            # Convert mouse coordinates to view coordinates
+        if event.button() == Qt.LeftButton:
             self.roi_start = event.pos()
             if not self.rubberBand:
                 self.rubberBand = QRubberBand(QRubberBand.Rectangle, self)
@@ -45,23 +1176,85 @@ class ROISelector(QGraphicsView):
         elif event.button() == Qt.RightButton:
             self.rois = []  # Clear ROIs on right click
             self.viewport().update()
+            self.roisChanged.emit()
             
     def mouseMoveEvent(self, event):
-        if self.rubberBand:
+        if self.rubberBand and self.roi_start:
             # Update rubber band geometry
             self.rubberBand.setGeometry(QRect(self.roi_start, event.pos()).normalized())
+            roi = self.image_roi(self.roi_start, event.pos())
+            if roi is not None:
+                self.roiDragged.emit(roi)
             
     def mouseReleaseEvent(self, event):
         if self.rubberBand and self.roi_start:
-            self.roi_end = event.pos()
-            # Create ROI in view coordinates
-            roi = QRect(self.roi_start, self.roi_end).normalized()
-            # Only add if ROI has non-zero size
-            if roi.width() > 0 and roi.height() > 0:
-                self.rois.append(roi)
+            roi = self.image_roi(self.roi_start, event.pos())
             self.rubberBand.hide()
             self.rubberBand = None
+            self.roi_start = None
+            # Only add if ROI has non-zero size
+            if roi is not None:
+                self.rois.append(roi)
+                self.roisChanged.emit()
             self.viewport().update()
+            
+    def drawForeground(self, painter, rect):
+        super().drawForeground(painter, rect)
+        if not self.rois:
+            return
+        # Outlines and numbers in viewport pixels, whatever the zoom
+        painter.save()
+        painter.resetTransform()
+        painter.setPen(QPen(Qt.yellow, 1))
+        for number, (x, y, w, h) in enumerate(self.rois, 1):
+            outline = self.mapFromScene(QRectF(x, y, w, h)).boundingRect()
+            painter.drawRect(outline)
+            painter.drawText(outline.topLeft() + QPoint(3, 12), str(number))
+        painter.restore()
+
+class HistogramPanel(QWidget):
+    """
+    Histogram plot whose curves are updated in place
+    """
+    # Curve colours for BGR images (with gray last) and grayscale images
+    COLORS = {4: [('Blue', 'b'), ('Green', 'g'), ('Red', 'r'), ('Gray', 'k')],
+              1: [('Gray', 'k')]}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.figure = Figure(figsize=(4, 3), tight_layout=True)
+        self.canvas = FigureCanvas(self.figure)
+        self.axes = self.figure.add_subplot(111)
+        self.axes.set_xlabel('Pixel Value')
+        self.axes.set_ylabel('Count')
+        self.axes.set_xlim(0, 255)
+        self.axes.grid(True)
+        self.lines = [self.axes.plot(np.arange(256), np.zeros(256), color=color, label=label)[0]
+                      for label, color in self.COLORS[4]]
+        self.plane_count = None
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.canvas)
+
+    def set_histogram(self, hist, title):
+        """
+        Show (planes, 256) counts
+        """
+        planes = hist.shape[0]
+        if planes != self.plane_count:
+            # Only the legend and colours change between colour and grayscale
+            self.plane_count = planes
+            for line, (label, color) in zip(self.lines, self.COLORS[planes]):
+                line.set_color(color)
+                line.set_label(label)
+            self.axes.legend(handles=self.lines[:planes], loc='upper right')
+        for index, line in enumerate(self.lines):
+            line.set_visible(index < planes)
+            if index < planes:
+                line.set_ydata(hist[index])
+        self.axes.set_ylim(0, max(1, hist.max()) * 1.05)
+        self.axes.set_title(title)
+        self.canvas.draw_idle()
+
 
 class ImageViewer(QMainWindow):
     def __init__(self):
@@ -78,7 +1271,7 @@ class ImageViewer(QMainWindow):
         layout = QVBoxLayout(main_widget)
         
         # Create image viewers with labels
-        viewers_layout = QHBoxLayout()
+        self.viewers_layout = QHBoxLayout()
         
         # Input viewer group
         input_group = QGroupBox("Input Image")
@@ -87,25 +1280,9 @@ class ImageViewer(QMainWindow):
         input_layout.addWidget(self.input_view)
         input_group.setLayout(input_layout)
         
-        # Output1 viewer group
-        output1_group = QGroupBox("Output 1")
-        output1_layout = QVBoxLayout()
-        self.output1_view = ROISelector("Output 1 View")
-        output1_layout.addWidget(self.output1_view)
-        output1_group.setLayout(output1_layout)
-        
-        # Output2 viewer group
-        output2_group = QGroupBox("Output 2")
-        output2_layout = QVBoxLayout()
-        self.output2_view = ROISelector("Output 2 View")
-        output2_layout.addWidget(self.output2_view)
-        output2_group.setLayout(output2_layout)
-        
-        viewers_layout.addWidget(input_group)
-        viewers_layout.addWidget(output1_group)
-        viewers_layout.addWidget(output2_group)
+        self.viewers_layout.addWidget(input_group)
         
-        layout.addLayout(viewers_layout)
+        layout.addLayout(self.viewers_layout)
         
         # Controls in tabs
         controls_layout = QHBoxLayout()
@@ -119,8 +1296,20 @@ class ImageViewer(QMainWindow):
         self.save_btn = QPushButton('Save Current Image (Ctrl+S)')
         self.save_btn.setToolTip('Save the currently selected image')
         self.save_btn.clicked.connect(self.save_image)
+        self.save_recipe_btn = QPushButton('Save Recipe')
+        self.save_recipe_btn.setToolTip('Save the processing applied to each output')
+        self.save_recipe_btn.clicked.connect(self.save_recipe_file)
+        self.load_recipe_btn = QPushButton('Load Recipe')
+        self.load_recipe_btn.setToolTip('Replay a saved recipe on the input image')
+        self.load_recipe_btn.clicked.connect(self.load_recipe_file)
+        self.add_output_btn = QPushButton('Add Output')
+        self.add_output_btn.setToolTip('Add an output processed from the previous one')
+        self.add_output_btn.clicked.connect(self.add_output)
         file_controls.addWidget(self.load_btn)
         file_controls.addWidget(self.save_btn)
+        file_controls.addWidget(self.save_recipe_btn)
+        file_controls.addWidget(self.load_recipe_btn)
+        file_controls.addWidget(self.add_output_btn)
         file_group.setLayout(file_controls)
         
         # Zoom controls group
@@ -188,12 +1377,27 @@ class ImageViewer(QMainWindow):
         self.filter_type.addItems(['None', 'Lowpass', 'Highpass'])
         self.filter_type.setToolTip('Apply frequency domain filters')
         
+        self.kernel_size = QSpinBox()
+        self.kernel_size.setRange(3, 15)
+        self.kernel_size.setSingleStep(2)
+        self.kernel_size.setValue(5)
+        self.kernel_size.setToolTip('Kernel size of the median, Gaussian and lowpass filters')
+        
+        self.nlm_strength = QDoubleSpinBox()
+        self.nlm_strength.setRange(1.0, 30.0)
+        self.nlm_strength.setValue(3.0)
+        self.nlm_strength.setToolTip('Filter strength (h) of Non-local Means')
+        
         filter_controls.addWidget(QLabel('Add Noise:'))
         filter_controls.addWidget(self.noise_type)
         filter_controls.addWidget(QLabel('Denoise:'))
         filter_controls.addWidget(self.denoise_type)
         filter_controls.addWidget(QLabel('Filters:'))
         filter_controls.addWidget(self.filter_type)
+        filter_controls.addWidget(QLabel('Kernel Size:'))
+        filter_controls.addWidget(self.kernel_size)
+        filter_controls.addWidget(QLabel('NLM Strength:'))
+        filter_controls.addWidget(self.nlm_strength)
         filters_group.setLayout(filter_controls)
         
         # Contrast enhancement group
@@ -203,8 +1407,23 @@ class ImageViewer(QMainWindow):
         self.contrast_method.addItems(['None', 'Histogram Equalization', 'CLAHE', 'Custom Stretching'])
         self.contrast_method.setToolTip('Apply contrast enhancement')
         
+        self.clahe_clip = QDoubleSpinBox()
+        self.clahe_clip.setRange(0.5, 10.0)
+        self.clahe_clip.setSingleStep(0.5)
+        self.clahe_clip.setValue(2.0)
+        self.clahe_clip.setToolTip('CLAHE clip limit')
+        
+        self.clahe_tiles = QSpinBox()
+        self.clahe_tiles.setRange(2, 32)
+        self.clahe_tiles.setValue(8)
+        self.clahe_tiles.setToolTip('CLAHE tile grid size')
+        
         contrast_controls.addWidget(QLabel('Enhancement Method:'))
         contrast_controls.addWidget(self.contrast_method)
+        contrast_controls.addWidget(QLabel('CLAHE Clip Limit:'))
+        contrast_controls.addWidget(self.clahe_clip)
+        contrast_controls.addWidget(QLabel('CLAHE Tiles:'))
+        contrast_controls.addWidget(self.clahe_tiles)
         contrast_group.setLayout(contrast_controls)
         
         # Add all control groups
@@ -220,17 +1439,28 @@ class ImageViewer(QMainWindow):
         self.apply_btn2 = QPushButton('Apply to Output 2 (F6)')
         self.apply_btn2.setToolTip('Apply current settings to Output 2')
         self.measure_snr_btn = QPushButton('Measure SNR/CNR (F7)')
-        self.measure_snr_btn.setToolTip('Select two ROIs to measure SNR/CNR')
+        self.measure_snr_btn.setToolTip('Measure SNR/CNR from three ROIs: signal, background and noise')
         self.show_histogram_btn = QPushButton('Show Histogram (F8)')
         self.show_histogram_btn.setToolTip('Display image histogram')
+        self.sweep_btn = QPushButton('Parameter Sweep (F11)')
+        self.sweep_btn.setToolTip('Rank denoise and contrast settings on a downscaled copy of the input')
+        self.metrics_btn = QPushButton('Quality Metrics (F10)')
+        self.metrics_btn.setToolTip('Compare the outputs with the input: PSNR, SSIM, MS-SSIM and noise')
         self.reset_btn = QPushButton('Reset All (F9)')
         self.reset_btn.setToolTip('Reset all settings to default')
         
-        buttons_layout = QHBoxLayout()
+        self.live_preview = QCheckBox('Live Preview')
+        self.live_preview.setToolTip('Process the last applied output while controls change')
+        
+        self.buttons_layout = QHBoxLayout()
+        buttons_layout = self.buttons_layout
+        buttons_layout.addWidget(self.live_preview)
         buttons_layout.addWidget(self.apply_btn)
         buttons_layout.addWidget(self.apply_btn2)
         buttons_layout.addWidget(self.measure_snr_btn)
         buttons_layout.addWidget(self.show_histogram_btn)
+        buttons_layout.addWidget(self.metrics_btn)
+        buttons_layout.addWidget(self.sweep_btn)
         buttons_layout.addWidget(self.reset_btn)
         
         # Connect buttons
@@ -238,6 +1468,8 @@ class ImageViewer(QMainWindow):
         self.apply_btn2.clicked.connect(lambda: self.apply_processing(2))
         self.measure_snr_btn.clicked.connect(self.measure_snr_cnr)
         self.show_histogram_btn.clicked.connect(self.show_histogram)
+        self.metrics_btn.clicked.connect(self.show_metrics)
+        self.sweep_btn.clicked.connect(self.show_sweep)
         self.reset_btn.clicked.connect(self.reset_settings)
         
         # Keyboard shortcuts
@@ -248,19 +1480,138 @@ class ImageViewer(QMainWindow):
         QShortcut(QKeySequence('F7'), self, self.measure_snr_cnr)
         QShortcut(QKeySequence('F8'), self, self.show_histogram)
         QShortcut(QKeySequence('F9'), self, self.reset_settings)
+        QShortcut(QKeySequence('F10'), self, self.show_metrics)
+        QShortcut(QKeySequence('F11'), self, self.show_sweep)
         
         # Add status bar
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
         
+        # Live ROI statistics, from integral images built once per image
+        self.measurement_label = QLabel()
+        self.statusBar.addPermanentWidget(self.measurement_label)
+        self.region_stats = OrderedDict()
+        self.pending_measurement = None
+        self.connect_view(self.input_view)
+        
+        # Docked histogram of the view being worked on
+        self.histogram_panel = HistogramPanel()
+        self.histogram_dock = QDockWidget('Histogram', self)
+        self.histogram_dock.setWidget(self.histogram_panel)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.histogram_dock)
+        self.histogram_dock.hide()
+        
+        # Docked comparison of the outputs with the input, computed on the
+        # thread pool and cached per (input, output) pair
+        metrics_widget = QWidget()
+        metrics_layout = QVBoxLayout(metrics_widget)
+        self.metrics_label = QLabel('Process an output to compare it with the input')
+        self.metrics_map_choice = QComboBox()
+        self.metrics_map_choice.currentIndexChanged.connect(self.show_metric_map)
+        self.metrics_view = ROISelector('Metric Map')
+        metrics_layout.addWidget(self.metrics_label)
+        metrics_layout.addWidget(self.metrics_map_choice)
+        metrics_layout.addWidget(self.metrics_view)
+        self.metrics_dock = QDockWidget('Quality Metrics', self)
+        self.metrics_dock.setWidget(metrics_widget)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.metrics_dock)
+        self.metrics_dock.hide()
+        self.metrics_dock.visibilityChanged.connect(lambda visible: visible and self.update_metrics())
+        self.metrics = {}
+        self.metrics_pending = set()
+        self.metrics_signals = ProcessingSignals()
+        self.metrics_signals.finished.connect(self.on_metrics_finished)
+        
+        # Docked parameter sweep: the grid is given as value lists, scored
+        # points are memoized by their pipeline key so refining the grid
+        # only evaluates new points
+        sweep_widget = QWidget()
+        sweep_layout = QVBoxLayout(sweep_widget)
+        self.sweep_kernels = QLineEdit('3, 5, 7, 9')
+        self.sweep_nlm = QLineEdit('3, 5, 7, 10')
+        self.sweep_clips = QLineEdit('1, 2, 4')
+        self.sweep_tiles = QLineEdit('4, 8')
+        self.sweep_score = QComboBox()
+        self.sweep_score.addItems(list(SWEEP_SCORES))
+        self.sweep_score.currentIndexChanged.connect(self.refresh_sweep_gallery)
+        self.sweep_run_btn = QPushButton('Run Sweep')
+        self.sweep_run_btn.clicked.connect(self.run_sweep)
+        self.sweep_status = QLabel()
+        self.sweep_gallery = QListWidget()
+        self.sweep_gallery.setViewMode(QListWidget.IconMode)
+        self.sweep_gallery.setIconSize(QSize(SWEEP_THUMBNAIL_SIZE, SWEEP_THUMBNAIL_SIZE))
+        self.sweep_gallery.setResizeMode(QListWidget.Adjust)
+        self.sweep_gallery.setToolTip('Double-click a result to load its settings')
+        self.sweep_gallery.itemDoubleClicked.connect(self.apply_sweep_point)
+        for label, widget in (('Kernel sizes:', self.sweep_kernels), ('NLM strengths:', self.sweep_nlm),
+                              ('CLAHE clip limits:', self.sweep_clips), ('CLAHE tile grids:', self.sweep_tiles),
+                              ('Score:', self.sweep_score)):
+            sweep_layout.addWidget(QLabel(label))
+            sweep_layout.addWidget(widget)
+        sweep_layout.addWidget(self.sweep_run_btn)
+        sweep_layout.addWidget(self.sweep_status)
+        sweep_layout.addWidget(self.sweep_gallery)
+        self.sweep_dock = QDockWidget('Parameter Sweep', self)
+        self.sweep_dock.setWidget(sweep_widget)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.sweep_dock)
+        self.sweep_dock.hide()
+        self.sweep_results = {}
+        self.sweep_points = OrderedDict()
+        self.sweep_task = None
+        self.sweep_signals = ProcessingSignals()
+        self.sweep_signals.finished.connect(self.on_sweep_result)
+        
         # Add all layouts to main layout
         layout.addLayout(controls_layout)
         layout.addLayout(buttons_layout)
         
         # Initialize image variables
         self.input_image = None
-        self.output1_image = None
-        self.output2_image = None
+        self.input_key = None
+        
+        # Output chain: each output is processed from the previous one
+        self.outputs = []
+        self.result_cache = ResultCache()
+        self.add_output()
+        self.add_output()
+        
+        # Processing runs on worker threads; a newer request for an output
+        # makes its older jobs stale, and their results are dropped
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(2)
+        # Metrics and sweeps get their own pool: Qt converts images for the
+        # GUI thread on the global pool, which must not be filled with
+        # Python tasks waiting for the GIL
+        self.analysis_pool = QThreadPool(self)
+        self.analysis_pool.setMaxThreadCount(2)
+        self.processing_signals = ProcessingSignals()
+        self.processing_signals.finished.connect(self.on_processing_finished)
+        self.processing_generation = 0
+        # Output number -> generation of its latest request
+        self.output_generations = {}
+        # Output number -> generation of its running full-resolution job
+        self.pending_outputs = {}
+        # Source output number -> (output number, pipeline, generation) waiting for it
+        self.queued_outputs = {}
+        # Output number -> generation of the full-resolution result on screen
+        self.shown_generations = {}
+        self.preview_output = 1
+        
+        # Debounced previews: a fast proxy first, full resolution once the controls settle
+        self.proxy_timer = QTimer(self)
+        self.proxy_timer.setSingleShot(True)
+        self.proxy_timer.timeout.connect(lambda: self.start_processing(self.preview_output, proxy=True))
+        self.full_timer = QTimer(self)
+        self.full_timer.setSingleShot(True)
+        self.full_timer.timeout.connect(lambda: self.start_processing(self.preview_output))
+        
+        self.live_preview.toggled.connect(self.schedule_preview)
+        for slider in (self.zoom_factor, self.brightness, self.contrast, self.kernel_size,
+                       self.nlm_strength, self.clahe_clip, self.clahe_tiles):
+            slider.valueChanged.connect(self.schedule_preview)
+        for combo in (self.interpolation_method, self.noise_type, self.denoise_type,
+                      self.filter_type, self.contrast_method):
+            combo.currentIndexChanged.connect(self.schedule_preview)
         
         # Show initial help message
         self.show_help()
@@ -281,6 +1632,8 @@ class ImageViewer(QMainWindow):
         3. Apply to Output 1 or 2 using F5/F6
         4. Use F7 to measure SNR/CNR
         5. Use F8 to view histograms
+        6. Use F10 to compare the outputs with the input
+        7. Use F11 to rank denoise and contrast settings
         """
         QMessageBox.information(self, "Help", help_text)
         
@@ -292,12 +1645,114 @@ class ImageViewer(QMainWindow):
         self.denoise_type.setCurrentIndex(0)
         self.filter_type.setCurrentIndex(0)
         self.contrast_method.setCurrentIndex(0)
+        self.kernel_size.setValue(5)
+        self.nlm_strength.setValue(3.0)
+        self.clahe_clip.setValue(2.0)
+        self.clahe_tiles.setValue(8)
         self.statusBar.showMessage('All settings reset to default', 3000)
         
+    def add_output(self):
+        """
+        Add an output view, processed from the previous output
+        """
+        number = len(self.outputs) + 1
+        group = QGroupBox(f"Output {number}")
+        group_layout = QVBoxLayout()
+        view = ROISelector(f"Output {number} View")
+        group_layout.addWidget(view)
+        group.setLayout(group_layout)
+        self.viewers_layout.addWidget(group)
+        self.outputs.append({'view': view, 'image': None, 'key': None, 'pipeline': None})
+        self.connect_view(view)
+        
+        # The first two outputs have their buttons and shortcuts in initUI
+        if number > 2:
+            apply_btn = QPushButton(f'Apply to Output {number}')
+            apply_btn.setToolTip(f'Apply current settings to Output {number}')
+            apply_btn.clicked.connect(lambda: self.apply_processing(number))
+            self.buttons_layout.insertWidget(number - 1, apply_btn)
+            
+    def connect_view(self, view):
+        view.roisChanged.connect(lambda: self.on_rois_changed(view))
+        view.roiDragged.connect(lambda roi: self.show_region_stats(view, roi))
+        
+    def view_image(self, view):
+        """
+        The image shown in a view, its key and its name
+        """
+        for number, output in enumerate(self.outputs, 1):
+            if output['view'] is view:
+                return output['image'], output['key'], f"Output {number}"
+        return self.input_image, self.input_key, "Input"
+        
+    def focused_output(self):
+        """
+        The view with keyboard focus, its image and its name (the input by default)
+        """
+        for number, output in enumerate(self.outputs, 1):
+            if output['view'].hasFocus():
+                return output['view'], output['image'], f"Output {number}"
+        return self.input_view, self.input_image, "Input"
+        
+    def pipeline_from_controls(self):
+        """
+        Build a processing pipeline from the current control values
+        """
+        kernel_size = self.kernel_size.value() | 1
+        return ProcessingPipeline([
+            ('zoom', {'factor': self.zoom_factor.value() / 100.0,
+                      'interpolation': self.interpolation_method.currentText()}),
+            ('noise', {'kind': self.noise_type.currentText()}),
+            ('denoise', {'method': self.denoise_type.currentText(), 'kernel_size': kernel_size,
+                         'h': self.nlm_strength.value()}),
+            ('filter', {'kind': self.filter_type.currentText(), 'kernel_size': kernel_size}),
+            ('contrast_method', {'method': self.contrast_method.currentText(),
+                                 'clip_limit': self.clahe_clip.value(),
+                                 'tile_grid': self.clahe_tiles.value()}),
+            ('brightness_contrast', {'alpha': self.contrast.value() / 100.0,
+                                     'beta': self.brightness.value()}),
+        ])
+        
+    def save_recipe_file(self):
+        pipelines = []
+        for output in self.outputs:
+            if output['pipeline'] is None:
+                break
+            pipelines.append(output['pipeline'])
+        if not pipelines:
+            self.statusBar.showMessage('Apply processing to Output 1 first!', 3000)
+            return
+            
+        file_name, _ = QFileDialog.getSaveFileName(self, "Save Recipe", "", "Recipes (*.json)")
+        if file_name:
+            save_recipe(file_name, pipelines)
+            self.statusBar.showMessage(f'Recipe with {len(pipelines)} outputs saved to {file_name}', 3000)
+            
+    def load_recipe_file(self):
+        if self.input_image is None:
+            self.statusBar.showMessage('No image loaded!', 3000)
+            return
+        file_name, _ = QFileDialog.getOpenFileName(self, "Load Recipe", "", "Recipes (*.json)")
+        if not file_name:
+            return
+            
+        try:
+            pipelines = load_recipe(file_name)
+        except Exception as e:
+            self.statusBar.showMessage(f'Error loading recipe: {str(e)}', 3000)
+            return
+        while len(self.outputs) < len(pipelines):
+            self.add_output()
+            
+        # Replayed on the worker threads, each output waiting for the previous one
+        self.proxy_timer.stop()
+        self.full_timer.stop()
+        for number, pipeline in enumerate(pipelines, 1):
+            self.start_processing(number, pipeline=pipeline, generation=self.request_generation(number))
+        self.statusBar.showMessage(f'Replaying {len(pipelines)} outputs from {file_name}...')
+        
     def save_image(self):
-        if not any([self.input_image is not None, 
-                   self.output1_image is not None, 
-                   self.output2_image is not None]):
+        if self.input_image is None and not any(output['image'] is not None for output in self.outputs):
             self.statusBar.showMessage('No image to save!', 3000)
             return
             
@@ -305,12 +1760,11 @@ class ImageViewer(QMainWindow):
                                                  "Image Files (*.png *.jpg *.bmp *.tif)")
         if file_name:
             # Determine which image to save based on focus
-            if self.output2_view.hasFocus():
-                cv2.imwrite(file_name, self.output2_image)
-            elif self.output1_view.hasFocus():
-                cv2.imwrite(file_name, self.output1_image)
-            else:
-                cv2.imwrite(file_name, self.input_image)
+            _, image, _ = self.focused_output()
+            if image is None:
+                self.statusBar.showMessage('No image in selected view!', 3000)
+                return
+            cv2.imwrite(file_name, image)
             self.statusBar.showMessage(f'Image saved to {file_name}', 3000)
         
     def load_image(self):
@@ -318,406 +1772,462 @@ class ImageViewer(QMainWindow):
                                                 "Image Files (*.png *.jpg *.bmp *.tif)")
         if file_name:
             self.input_image = cv2.imread(file_name)  # Removed cv2.IMREAD_GRAYSCALE
+            # Hashed once, processed results are keyed from it
+            self.input_key = image_key(self.input_image)
             self.display_image(self.input_image, self.input_view)
+            self.show_region_stats(self.input_view)
             self.statusBar.showMessage(f'Loaded image: {file_name}', 3000)
+            self.schedule_preview()
     
             
-    def display_image(self, image, view):
+    def display_image(self, image, view, shape=None):
+        """
+        Show an image in a view, stretched to shape (height, width) if given,
+        so a downscaled preview keeps the scene in full-size image pixels
+        """
         if image is not None:
-            height, width = image.shape[:2]  # Changed to handle both color and grayscale
-            if len(image.shape) == 3:  # Color image
-                bytes_per_line = 3 * width
-                # Convert BGR to RGB for Qt
-                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                q_image = QImage(rgb_image.data, width, height, bytes_per_line, QImage.Format_RGB888)
-            else:  # Grayscale image
-                bytes_per_line = width
-                q_image = QImage(image.data, width, height, bytes_per_line, QImage.Format_Grayscale8)
-                
-            scene = QGraphicsScene()
-            scene.addPixmap(QPixmap.fromImage(q_image))
-            view.setScene(scene)
-            view.fitInView(scene.sceneRect(), Qt.KeepAspectRatio)
+            view.set_image(image, shape)
                 
     def apply_processing(self, output_num):
+        # Live preview follows the output that was applied last
+        self.preview_output = output_num
+        self.proxy_timer.stop()
+        self.full_timer.stop()
+        self.start_processing(output_num, generation=self.request_generation(output_num))
+        
+    def schedule_preview(self, *args):
+        """
+        Restart the debounce timers after a control change in live preview mode
+        """
+        if not self.live_preview.isChecked() or self.input_image is None:
+            return
+        # Anything queued or running for older settings of this output is now stale
+        self.request_generation(self.preview_output)
+        self.proxy_timer.start(50)
+        self.full_timer.start(400)
+        
+    def request_generation(self, output_num):
+        """
+        Start a new generation for an output, making its older jobs stale
+        """
+        self.processing_generation += 1
+        self.output_generations[output_num] = self.processing_generation
+        return self.processing_generation
+        
+    def is_stale(self, output_num, generation):
+        return self.output_generations.get(output_num) != generation
+        
+    def output_busy(self, output_num):
+        """
+        Whether an output has a full-resolution job running or waiting
+        """
+        return (output_num in self.pending_outputs
+                or any(queued[0] == output_num for queued in self.queued_outputs.values()))
+        
+    def start_processing(self, output_num, proxy=False, pipeline=None, generation=None):
+        """
+        Process an output on a worker thread
+        
+        A full-resolution job whose source output is still being processed
+        waits for it, so it starts from the new source image.
+        
+        Args:
+            output_num (int): Output to process, from the input or the previous output
+            proxy (bool): Process a downscaled copy for a quick preview
+            pipeline (ProcessingPipeline): Pipeline to run, the current settings if None
+            generation (int): Generation of the request, the output's latest if None
+        """
         if self.input_image is None:
             self.statusBar.showMessage('No image loaded!', 3000)
             return
+        if generation is None:
+            generation = self.output_generations.get(output_num) or self.request_generation(output_num)
+        # Only stages whose parameters (or input) changed are recomputed
+        pipeline = pipeline or self.pipeline_from_controls()
             
-        # Check if trying to process output 2 without output 1
-        if output_num == 2 and self.output1_image is None:
-            self.statusBar.showMessage('Please process Output 1 first!', 3000)
-            return
+        # Each output is processed from the previous one
+        if output_num > 1:
+            if not proxy and self.output_busy(output_num - 1):
+                self.queued_outputs[output_num - 1] = (output_num, pipeline, generation)
+                self.statusBar.showMessage(f'Output {output_num} waits for Output {output_num - 1}...')
+                return
+            if self.outputs[output_num - 2]['image'] is None:
+                if not proxy:
+                    self.statusBar.showMessage(f'Please process Output {output_num - 1} first!', 3000)
+                return
                 
         # Get source image based on output number
-        source_image = self.input_image if output_num == 1 else self.output1_image
+        if output_num == 1:
+            source_image, source_key = self.input_image, self.input_key
+        else:
+            previous = self.outputs[output_num - 2]
+            source_image, source_key = previous['image'], previous['key']
+        # The full-size result shape, which zoom changes, for stretching the preview
+        zoom = dict(pipeline.stages).get('zoom', {})
+        factor = zoom.get('factor', 1.0)
+        shape = (int(source_image.shape[0] * factor), int(source_image.shape[1] * factor))
+        if proxy:
+            source_image, source_key = proxy_image(source_image, source_key, cache=self.result_cache)
+        
+        self.thread_pool.start(ProcessingTask(
+            pipeline, source_image, source_key, self.result_cache, generation,
+            functools.partial(self.is_stale, output_num), self.processing_signals,
+            output_num=output_num, proxy=proxy, shape=shape))
+        if not proxy:
+            self.pending_outputs[output_num] = generation
+            self.statusBar.showMessage(f'Processing Output {output_num}...')
+            
+    def on_processing_finished(self, result):
+        output_num = result['output_num']
+        if not result['proxy'] and self.pending_outputs.get(output_num) == result['generation']:
+            del self.pending_outputs[output_num]
+        if result['cancelled'] or self.is_stale(output_num, result['generation']):
+            return
+        if result['error'] is not None:
+            # Outputs waiting for this one have no source to start from
+            self.queued_outputs.pop(output_num, None)
+            self.statusBar.showMessage(f"Error processing image: {result['error']}", 3000)
+            print(f"Error details: {result['error']}")  # For debugging
+            return
+            
+        # Update appropriate output view
+        output = self.outputs[output_num - 1]
+        if result['proxy']:
+            # A late preview must not replace the full-resolution result
+            if self.shown_generations.get(output_num) == result['generation']:
+                return
+            self.display_image(result['image'], output['view'], result['shape'])
+            self.statusBar.showMessage(f'Preview of Output {output_num}...')
+            return
+        self.display_image(result['image'], output['view'])
+        output.update(image=result['image'], key=result['key'], pipeline=result['pipeline'])
+        self.shown_generations[output_num] = result['generation']
+        self.show_region_stats(output['view'])
+        self.update_metrics()
+        self.statusBar.showMessage(
+            f"Processing applied to Output {output_num} "
+            f"({result['computed']} of {len(result['pipeline'].stages)} stages recomputed)", 3000)
+        
+        # Start the output that was waiting for this one
+        queued = self.queued_outputs.pop(output_num, None)
+        if queued is not None:
+            waiting, pipeline, generation = queued
+            if not self.is_stale(waiting, generation):
+                self.start_processing(waiting, pipeline=pipeline, generation=generation)
         
+    def region_stats_for(self, view):
+        """
+        RegionStats of the image in a view, built on first use
+        """
+        image, key, _ = self.view_image(view)
+        if image is None:
+            return None
+        stats = self.region_stats.get(key)
+        if stats is None:
+            stats = self.region_stats[key] = RegionStats(image)
+            # Only the images on screen are worth keeping
+            while len(self.region_stats) > len(self.outputs) + 1:
+                self.region_stats.popitem(last=False)
+        else:
+            self.region_stats.move_to_end(key)
+        return stats
+        
+    def show_region_stats(self, view, dragged=None):
+        """
+        Show the statistics of a view's ROIs, and of the one being drawn
+        """
+        rois = view.rois + ([dragged] if dragged is not None else [])
+        if not rois and not self.histogram_dock.isVisible():
+            self.measurement_label.clear()
+            return
+        stats = self.region_stats_for(view)
+        self.update_histogram(view, stats, rois)
+        if stats is None or not rois:
+            self.measurement_label.clear()
+            return
         try:
-            # Apply selected processing
-            processed_image = None
+            parts = []
+            for number, roi in enumerate(rois, 1):
+                roi_stats = stats.stats(roi)
+                parts.append(f"ROI {number}: {roi_stats['mean']:.1f} ± {roi_stats['std']:.1f} "
+                             f"(p5 {roi_stats['p5']}, median {roi_stats['median']}, p95 {roi_stats['p95']})")
+            if len(rois) >= 3:
+                snr, cnr = stats.snr_cnr(*rois[:3])
+                parts.append(f"SNR {snr:.2f}, CNR {cnr:.2f}")
+            self.measurement_label.setText('   '.join(parts))
+        except ValueError as e:
+            self.measurement_label.setText(str(e))
             
-            # Zoom processing
-            if self.zoom_factor.value() != 100:
-                zoom_value = self.zoom_factor.value() / 100.0
-                new_size = (int(source_image.shape[1] * zoom_value),
-                        int(source_image.shape[0] * zoom_value))
-                
-                interpolation_methods = {
-                    'Nearest Neighbor': cv2.INTER_NEAREST,
-                    'Linear': cv2.INTER_LINEAR,
-                    'Bilinear': cv2.INTER_LINEAR,
-                    'Cubic': cv2.INTER_CUBIC
-                }
-                
-                method = interpolation_methods[self.interpolation_method.currentText()]
-                processed_image = cv2.resize(source_image, new_size, interpolation=method)
-                
-            # Initialize processed image if not yet done
-            if processed_image is None:
-                processed_image = source_image.copy()
-
-            # Split image into channels if it's color
-            is_color = len(processed_image.shape) == 3
-            if is_color:
-                b, g, r = cv2.split(processed_image)
-            else:
-                processed_image = processed_image.copy()
-                
-            # Noise processing
-            if self.noise_type.currentText() != 'None':
-                if self.noise_type.currentText() == 'Gaussian':
-                    if is_color:
-                        for channel in [b, g, r]:
-                            noise = np.random.normal(0, 25, channel.shape).astype(np.uint8)
-                            channel[:] = cv2.add(channel, noise)
-                    else:
-                        noise = np.random.normal(0, 25, processed_image.shape).astype(np.uint8)
-                        processed_image = cv2.add(processed_image, noise)
-                        
-                elif self.noise_type.currentText() == 'Salt & Pepper':
-                    prob = 0.05
-                    if is_color:
-                        for channel in [b, g, r]:
-                            noise = np.random.random(channel.shape)
-                            channel[noise < prob/2] = 0
-                            channel[noise > 1 - prob/2] = 255
-                    else:
-                        noise = np.random.random(processed_image.shape)
-                        processed_image[noise < prob/2] = 0
-                        processed_image[noise > 1 - prob/2] = 255
-                        
-                elif self.noise_type.currentText() == 'Speckle':
-                    if is_color:
-                        for channel in [b, g, r]:
-                            noise = np.random.normal(0, 25, channel.shape).astype(np.uint8)
-                            channel[:] = channel + channel * noise/255
-                    else:
-                        noise = np.random.normal(0, 25, processed_image.shape).astype(np.uint8)
-                        processed_image = processed_image + processed_image * noise/255
-                    
-            # Denoising
-            if self.denoise_type.currentText() != 'None':
-                if self.denoise_type.currentText() == 'Median Filter':
-                    if is_color:
-                        b = cv2.medianBlur(b, 5)
-                        g = cv2.medianBlur(g, 5)
-                        r = cv2.medianBlur(r, 5)
-                    else:
-                        processed_image = cv2.medianBlur(processed_image, 5)
-                        
-                elif self.denoise_type.currentText() == 'Gaussian Filter':
-                    if is_color:
-                        b = cv2.GaussianBlur(b, (5,5), 0)
-                        g = cv2.GaussianBlur(g, (5,5), 0)
-                        r = cv2.GaussianBlur(r, (5,5), 0)
-                    else:
-                        processed_image = cv2.GaussianBlur(processed_image, (5,5), 0)
-                        
-                elif self.denoise_type.currentText() == 'Non-local Means':
-                    if is_color:
-                        processed_image = cv2.fastNlMeansDenoisingColored(processed_image)
-                    else:
-                        processed_image = cv2.fastNlMeansDenoising(processed_image)
-                    
-            # Filters
-            if self.filter_type.currentText() != 'None':
-                if self.filter_type.currentText() == 'Lowpass':
-                    kernel = np.ones((5,5), np.float32)/25
-                    if is_color:
-                        b = cv2.filter2D(b, -1, kernel)
-                        g = cv2.filter2D(g, -1, kernel)
-                        r = cv2.filter2D(r, -1, kernel)
-                    else:
-                        processed_image = cv2.filter2D(processed_image, -1, kernel)
-                        
-                elif self.filter_type.currentText() == 'Highpass':
-                    kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-                    if is_color:
-                        b = cv2.filter2D(b, -1, kernel)
-                        g = cv2.filter2D(g, -1, kernel)
-                        r = cv2.filter2D(r, -1, kernel)
-                    else:
-                        processed_image = cv2.filter2D(processed_image, -1, kernel)
-                    
-            # Contrast adjustment
-            if self.contrast_method.currentText() != 'None':
-                if self.contrast_method.currentText() == 'Histogram Equalization':
-                    if is_color:
-                        # Convert to LAB color space
-                        lab = cv2.cvtColor(processed_image, cv2.COLOR_BGR2LAB)
-                        l, a, b = cv2.split(lab)
-                        # Apply histogram equalization to L channel
-                        l = cv2.equalizeHist(l)
-                        # Merge channels and convert back to BGR
-                        lab = cv2.merge((l, a, b))
-                        processed_image = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-                    else:
-                        processed_image = cv2.equalizeHist(processed_image)
-                        
-                elif self.contrast_method.currentText() == 'CLAHE':
-                    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-                    if is_color:
-                        lab = cv2.cvtColor(processed_image, cv2.COLOR_BGR2LAB)
-                        l, a, b = cv2.split(lab)
-                        l = clahe.apply(l)
-                        lab = cv2.merge((l, a, b))
-                        processed_image = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-                    else:
-                        processed_image = clahe.apply(processed_image)
-                        
-            # Merge channels back if color image
-            if is_color and self.noise_type.currentText() != 'None' or self.denoise_type.currentText() != 'None' or self.filter_type.currentText() != 'None':
-                processed_image = cv2.merge([b, g, r])
-                    
-            # Apply brightness and contrast
-            alpha = self.contrast.value() / 100.0
-            beta = self.brightness.value()
-            processed_image = cv2.convertScaleAbs(processed_image, alpha=alpha, beta=beta)
-                
-            # Ensure image is in valid range
-            processed_image = np.clip(processed_image, 0, 255).astype(np.uint8)
-                
-            # Update appropriate output view
-            if output_num == 1:
-                self.output1_image = processed_image.copy()
-                self.display_image(self.output1_image, self.output1_view)
-            else:
-                self.output2_image = processed_image.copy()
-                self.display_image(self.output2_image, self.output2_view)
-                
-            self.statusBar.showMessage(f'Processing applied to Output {output_num}', 3000)
+    def on_rois_changed(self, view):
+        self.show_region_stats(view)
+        if self.pending_measurement is view and len(view.rois) >= 3:
+            self.pending_measurement = None
+            self.report_snr_cnr(view)
             
-        except Exception as e:
-            self.statusBar.showMessage(f'Error processing image: {str(e)}', 3000)
-            print(f"Error details: {str(e)}")  # For debugging
     def measure_snr_cnr(self):
         # Determine which view is currently focused
-        if self.output2_view.hasFocus():
-            current_view = self.output2_view
-            current_image = self.output2_image
-            view_name = "Output 2"
-        elif self.output1_view.hasFocus():
-            current_view = self.output1_view
-            current_image = self.output1_image
-            view_name = "Output 1"
-        else:
-            current_view = self.input_view
-            current_image = self.input_image
-            view_name = "Input"
+        current_view, current_image, view_name = self.focused_output()
 
         if current_image is None:
             self.statusBar.showMessage('No image in selected view!', 3000)
             return
-
-        # Clear previous ROIs
-        current_view.rois = []
-        
-        self.statusBar.showMessage(f'Select three ROIs in {view_name}', 3000)
-        
-        # Wait for user to select two ROIs
-        while len(current_view.rois) < 3:
-            QApplication.processEvents()
             
+        # Measured as soon as the view has three ROIs: signal, background and noise
+        if len(current_view.rois) >= 3:
+            self.report_snr_cnr(current_view)
+            return
+        self.pending_measurement = current_view
+        self.statusBar.showMessage(
+            f'Select {3 - len(current_view.rois)} more ROIs in {view_name} (signal, background, noise)', 5000)
+        
+    def report_snr_cnr(self, view):
+        _, _, view_name = self.view_image(view)
         try:
-            # Calculate SNR/CNR from ROIs
-            roi1 = current_view.rois[0]
-            roi2 = current_view.rois[1]
-            roi3 = current_view.rois[2]
-            # Convert view coordinates to scene coordinates
-            scene_rect = current_view.scene().sceneRect()
-            
-            # Calculate scaling factors
-            scale_x = current_image.shape[1] / scene_rect.width()
-            scale_y = current_image.shape[0] / scene_rect.height()
-            
-            # Convert ROI coordinates to scene coordinates
-            roi1_scene = current_view.mapToScene(roi1).boundingRect()
-            roi2_scene = current_view.mapToScene(roi2).boundingRect()
-            roi3_scene = current_view.mapToScene(roi3).boundingRect()
-            # Convert scene coordinates to image coordinates
-            roi1_x = int(roi1_scene.x() * scale_x)
-            roi1_y = int(roi1_scene.y() * scale_y)
-            roi1_width = int(roi1_scene.width() * scale_x)
-            roi1_height = int(roi1_scene.height() * scale_y)
-            
-            roi2_x = int(roi2_scene.x() * scale_x)
-            roi2_y = int(roi2_scene.y() * scale_y)
-            roi2_width = int(roi2_scene.width() * scale_x)
-            roi2_height = int(roi2_scene.height() * scale_y)
-            
-            roi3_x = int(roi3_scene.x() * scale_x)
-            roi3_y = int(roi3_scene.y() * scale_y)
-            roi3_width = int(roi3_scene.width() * scale_x)
-            roi3_height = int(roi3_scene.height() * scale_y)
-            
-            # Ensure coordinates are within image bounds
-            roi1_x = max(0, min(roi1_x, current_image.shape[1] - 1))
-            roi1_y = max(0, min(roi1_y, current_image.shape[0] - 1))
-            roi2_x = max(0, min(roi2_x, current_image.shape[1] - 1))
-            roi2_y = max(0, min(roi2_y, current_image.shape[0] - 1))
-            roi3_x = max(0, min(roi3_x, current_image.shape[1] - 1))
-            roi3_y = max(0, min(roi3_y, current_image.shape[0] - 1))
-            
-            
-            roi1_width = min(roi1_width, current_image.shape[1] - roi1_x)
-            roi1_height = min(roi1_height, current_image.shape[0] - roi1_y)
-            roi2_width = min(roi2_width, current_image.shape[1] - roi2_x)
-            roi2_height = min(roi2_height, current_image.shape[0] - roi2_y)
-            roi3_width = min(roi3_width, current_image.shape[1] - roi2_x)
-            roi3_height = min(roi3_height, current_image.shape[0] - roi2_y)
-            
-            # Extract ROI data
-            roi1_data = current_image[roi1_y:roi1_y+roi1_height, roi1_x:roi1_x+roi1_width]
-            roi2_data = current_image[roi2_y:roi2_y+roi2_height, roi2_x:roi2_x+roi2_width]
-            roi3_data = current_image[roi3_y:roi3_y+roi3_height, roi3_x:roi3_x+roi3_width]
-
-            # Handle color images by converting to grayscale if needed
-            if len(current_image.shape) == 3:
-                roi1_data = cv2.cvtColor(roi1_data, cv2.COLOR_BGR2GRAY)
-                roi2_data = cv2.cvtColor(roi2_data, cv2.COLOR_BGR2GRAY)
-                roi3_data = cv2.cvtColor(roi3_data, cv2.COLOR_BGR2GRAY)
-                
-            # Calculate metrics
-            signal_mean = np.mean(roi1_data)
-            noise_mean = np.mean(roi2_data)
-            noise_std = np.std(roi3_data)
-            
-            snr = signal_mean / noise_std if noise_std != 0 else 0
-            cnr = abs(signal_mean - noise_mean) / noise_std if noise_std != 0 else 0
-            
-            # Show results
-            msg = f'{view_name} Measurements:\nSNR: {snr:.2f}\nCNR: {cnr:.2f}'
-            QMessageBox.information(self, 'Measurements', msg)
-            
+            snr, cnr = self.region_stats_for(view).snr_cnr(*view.rois[:3])
         except Exception as e:
             self.statusBar.showMessage(f'Error calculating measurements: {str(e)}', 3000)
-            print(f"Error details: {str(e)}")  # For debugging)
-    def show_histogram(self):
+            print(f"Error details: {str(e)}")  # For debugging
+            return
+        # Show results
+        msg = f'{view_name} Measurements:\nSNR: {snr:.2f}\nCNR: {cnr:.2f}'
+        QMessageBox.information(self, 'Measurements', msg)
+        
+    def update_histogram(self, view, stats, rois):
+        """
+        Plot the histogram of the last ROI in a view, or of its whole image
+        """
+        if stats is None or not self.histogram_dock.isVisible():
+            return
+        _, _, view_name = self.view_image(view)
         try:
-            # Get the currently focused view
-            if self.output2_view.hasFocus():
-                image = self.output2_image
-                current_view = self.output2_view
-                title = "Output 2 Histogram"
-            elif self.output1_view.hasFocus():
-                image = self.output1_image
-                current_view = self.output1_view
-                title = "Output 1 Histogram"
+            if rois:
+                hist, title = stats.histogram(rois[-1]), f'{view_name} - ROI {len(rois)}'
             else:
-                image = self.input_image
-                current_view = self.input_view
-                title = "Input Image Histogram"
+                hist, title = stats.histogram(), f'{view_name} - Full Image'
+        except ValueError:
+            return
+        self.histogram_panel.set_histogram(hist, title)
+        
+    def metrics_key(self, output):
+        return self.input_key, output['key']
+        
+    def show_metrics(self):
+        if self.input_image is None:
+            self.statusBar.showMessage('No image loaded!', 3000)
+            return
+        self.metrics_dock.show()
+        self.metrics_dock.raise_()
+        self.update_metrics()
+        
+    def update_metrics(self):
+        """
+        Start computing metrics for outputs that changed since the last update
+        """
+        if not self.metrics_dock.isVisible() or self.input_image is None:
+            return
+        current = {self.metrics_key(output) for output in self.outputs if output['image'] is not None}
+        # Results for images no longer shown are dropped
+        self.metrics = {key: value for key, value in self.metrics.items() if key in current}
+        for output in self.outputs:
+            key = self.metrics_key(output)
+            if output['image'] is None or key in self.metrics or key in self.metrics_pending:
+                continue
+            self.metrics_pending.add(key)
+            self.analysis_pool.start(MetricsTask(self.input_image, output['image'], key,
+                                                 self.metrics_signals))
+        self.refresh_metrics()
+        
+    def on_metrics_finished(self, result):
+        self.metrics_pending.discard(result['key'])
+        if result['error'] is not None:
+            self.statusBar.showMessage(f"Error computing metrics: {result['error']}", 3000)
+            return
+        self.metrics[result['key']] = result['metrics']
+        self.refresh_metrics()
+        
+    def refresh_metrics(self):
+        """
+        Show the cached metrics of the current outputs and their map choices
+        """
+        lines, choices = [], []
+        for number, output in enumerate(self.outputs, 1):
+            metrics = self.metrics.get(self.metrics_key(output))
+            if metrics is None:
+                continue
+            if not lines:
+                lines.append(f"Input: noise σ {metrics['reference_noise']:.2f}")
+            lines.append(f"Output {number}: PSNR {metrics['psnr']:.2f} dB, SSIM {metrics['ssim']:.4f}, "
+                         f"MS-SSIM {metrics['ms_ssim']:.4f}, noise σ {metrics['noise']:.2f}")
+            choices += [(f'Output {number} SSIM map', number, 'ssim_map'),
+                        (f'Output {number} absolute error', number, 'error_map')]
+        if not lines:
+            # Scores of replaced outputs must not stay on screen
+            self.metrics_label.setText('Computing metrics...' if self.metrics_pending
+                                       else 'Process an output to compare it with the input')
+            self.metrics_map_choice.clear()
+            self.metrics_view.clear_image()
+            return
+        self.metrics_label.setText('\n'.join(lines))
+        
+        # Keep the selected map if it is still available
+        selected = self.metrics_map_choice.currentText()
+        self.metrics_map_choice.blockSignals(True)
+        self.metrics_map_choice.clear()
+        for label, number, name in choices:
+            self.metrics_map_choice.addItem(label, (number, name))
+        self.metrics_map_choice.setCurrentIndex(max(0, self.metrics_map_choice.findText(selected)))
+        self.metrics_map_choice.blockSignals(False)
+        self.show_metric_map()
+        
+    def show_metric_map(self, *args):
+        choice = self.metrics_map_choice.currentData()
+        if choice is None:
+            return
+        number, name = choice
+        metrics = self.metrics.get(self.metrics_key(self.outputs[number - 1]))
+        if metrics is not None:
+            self.metrics_view.set_image(metrics[name])
+        
+    def show_sweep(self):
+        self.sweep_dock.show()
+        self.sweep_dock.raise_()
+        
+    def run_sweep(self):
+        """
+        Evaluate the grid on a proxy of the input with the current recipe,
+        with the denoise and contrast stages taken from the grid
+        """
+        if self.input_image is None:
+            self.statusBar.showMessage('No image loaded!', 3000)
+            return
+        if self.sweep_task is not None:
+            self.statusBar.showMessage('A sweep is already running', 3000)
+            return
+        try:
+            values = [[float(value) for value in edit.text().replace(',', ' ').split()]
+                      for edit in (self.sweep_kernels, self.sweep_nlm, self.sweep_clips, self.sweep_tiles)]
+        except ValueError:
+            self.statusBar.showMessage('Sweep values must be numbers separated by commas', 3000)
+            return
+        kernels, strengths, clips, tiles = values
+        grid = sweep_grid([int(k) for k in kernels], strengths, clips, [int(t) for t in tiles])
+        
+        source, source_key = proxy_image(self.input_image, self.input_key, cache=self.result_cache)
+        base = dict(self.pipeline_from_controls().stages)
+        # Zoom only changes the size, and the proxy is compared with itself
+        base['zoom'] = {'factor': 1.0}
+        self.sweep_points = OrderedDict()
+        for denoise, contrast in grid:
+            params = dict(base, denoise=denoise, contrast_method=contrast)
+            stages = [(name, params[name]) for name in STAGES]
+            key = source_key
+            for name, stage_params in stages:
+                key = stage_key(key, name, stage_params)
+            self.sweep_points[key] = (denoise, contrast, stages)
+            
+        todo = [(key, stages) for key, (_, _, stages) in self.sweep_points.items() if key not in self.sweep_results]
+        self.refresh_sweep_gallery()
+        if not todo:
+            self.sweep_status.setText(f'All {len(self.sweep_points)} settings already evaluated')
+            return
+        self.sweep_status.setText(f'Evaluating {len(todo)} of {len(self.sweep_points)} settings...')
+        self.sweep_run_btn.setEnabled(False)
+        self.sweep_task = SweepTask(source, todo, self.sweep_signals)
+        self.analysis_pool.start(self.sweep_task)
+        
+    def on_sweep_result(self, result):
+        if result.get('done'):
+            self.sweep_task = None
+            self.sweep_run_btn.setEnabled(True)
+            done = sum(key in self.sweep_results for key in self.sweep_points)
+            self.sweep_status.setText(f'{done} of {len(self.sweep_points)} settings evaluated')
+            return
+        if result['error'] is not None:
+            self.statusBar.showMessage(f"Sweep point failed: {result['error']}", 3000)
+            return
+        self.sweep_results[result['key']] = result['metrics']
+        self.refresh_sweep_gallery()
+        
+    def refresh_sweep_gallery(self, *args):
+        """
+        Rank the evaluated points of the current grid by the selected score
+        """
+        score = SWEEP_SCORES[self.sweep_score.currentText()]
+        ranked = sorted((key for key in self.sweep_points if key in self.sweep_results),
+                        key=lambda key: score(self.sweep_results[key]), reverse=True)
+        self.sweep_gallery.clear()
+        for rank, key in enumerate(ranked, 1):
+            metrics = self.sweep_results[key]
+            denoise, contrast, _ = self.sweep_points[key]
+            q_image, _ = numpy_to_qimage(metrics['thumbnail'])
+            item = QListWidgetItem(QIcon(QPixmap.fromImage(q_image)),
+                                   f"#{rank} {sweep_label(denoise, contrast)}\n{score(metrics):.4g}")
+            item.setData(Qt.UserRole, key)
+            item.setToolTip(f"PSNR {metrics['psnr']:.2f} dB, SSIM {metrics['ssim']:.4f}, "
+                            f"MS-SSIM {metrics['ms_ssim']:.4f}, noise σ {metrics['noise']:.2f}, "
+                            f"entropy {metrics['entropy']:.2f}")
+            self.sweep_gallery.addItem(item)
+            
+    def apply_sweep_point(self, item):
+        denoise, contrast, _ = self.sweep_points[item.data(Qt.UserRole)]
+        self.denoise_type.setCurrentText(denoise['method'])
+        if 'kernel_size' in denoise:
+            self.kernel_size.setValue(denoise['kernel_size'])
+        if 'h' in denoise:
+            self.nlm_strength.setValue(denoise['h'])
+        self.contrast_method.setCurrentText(contrast['method'])
+        if contrast['method'] == 'CLAHE':
+            self.clahe_clip.setValue(contrast['clip_limit'])
+            self.clahe_tiles.setValue(contrast['tile_grid'])
+        self.statusBar.showMessage(f'Loaded {sweep_label(denoise, contrast)}, apply with F5/F6', 3000)
+        
+    def show_histogram(self):
+        # Dock the histogram of the focused view
+        current_view, image, _ = self.focused_output()
+        if image is None:
+            self.statusBar.showMessage('No image selected!', 3000)
+            return
+        self.histogram_dock.show()
+        self.histogram_dock.raise_()
+        self.show_region_stats(current_view)
 
-            if image is None:
-                self.statusBar.showMessage('No image selected!', 3000)
-                return
 
-            # Check for ROIs
-            rois = current_view.rois
-            if not rois:
-                # If no ROIs, show histogram for entire image
-                if len(image.shape) == 3:  # Color image
-                    plt.figure(figsize=(10, 8))
-                    colors = ('b', 'g', 'r')
-                    for i, color in enumerate(colors):
-                        hist = cv2.calcHist([image], [i], None, [256], [0, 256])
-                        plt.plot(hist, color=color)
-                    plt.title(f'{title} - Full Image')
-                    plt.xlabel('Pixel Value')
-                    plt.ylabel('Count')
-                    plt.legend(['Blue', 'Green', 'Red'])
-                else:  # Grayscale image
-                    plt.figure(figsize=(10, 8))
-                    hist = cv2.calcHist([image], [0], None, [256], [0, 256])
-                    plt.plot(hist)
-                    plt.title(f'{title} - Full Image')
-                    plt.xlabel('Pixel Value')
-                    plt.ylabel('Count')
-                
-                plt.grid(True)
-                plt.show()
-                return
+def main():
+    parser = argparse.ArgumentParser(
+        description='Image quality viewer. With --batch, process images headless with a saved recipe.')
+    parser.add_argument('--batch', metavar='RECIPE', help='Recipe JSON saved from the viewer')
+    parser.add_argument('inputs', nargs='*', help='Input image glob patterns for --batch')
+    parser.add_argument('--output-dir', default='processed', help='Folder for processed images')
+    parser.add_argument('--csv', help='Metrics CSV, OUTPUT_DIR/metrics.csv by default')
+    parser.add_argument('--workers', type=int, help='Worker processes, one per CPU by default')
+    parser.add_argument('--signal-roi', type=parse_roi, metavar='X,Y,W,H')
+    parser.add_argument('--background-roi', type=parse_roi, metavar='X,Y,W,H')
+    parser.add_argument('--noise-roi', type=parse_roi, metavar='X,Y,W,H')
+    # Anything else is left for Qt
+    args, qt_args = parser.parse_known_args()
 
-            # Process ROIs
-            scene = current_view.scene()
-            view_rect = current_view.viewport().rect()
-            scale_x = image.shape[1] / scene.width()
-            scale_y = image.shape[0] / scene.height()
+    if args.batch:
+        rois = (args.signal_roi, args.background_roi, args.noise_roi)
+        if any(rois) and not all(rois):
+            parser.error('SNR/CNR needs --signal-roi, --background-roi and --noise-roi together')
+        try:
+            pipelines = load_recipe(args.batch)
+        except Exception as e:
+            parser.error(f'Could not load recipe {args.batch}: {e}')
+        if not pipelines:
+            parser.error(f'Recipe {args.batch} has no outputs')
+        try:
+            failed = run_batch(pipelines, args.inputs, args.output_dir, args.csv, args.workers,
+                               rois if all(rois) else None)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        sys.exit(1 if failed else 0)
 
-            fig = plt.figure(figsize=(15, 5 * len(rois)))
-            fig.suptitle(f'{title} - ROI Analysis', fontsize=16)
+    app = QApplication(sys.argv[:1] + qt_args)
+    viewer = ImageViewer()
+    viewer.show()
+    sys.exit(app.exec_())
 
-            for idx, roi in enumerate(rois):
-                # Convert ROI to scene coordinates
-                roi_scene = current_view.mapToScene(roi).boundingRect()
-                
-                # Calculate image coordinates
-                x = int(max(0, min(roi_scene.x() * scale_x, image.shape[1]-1)))
-                y = int(max(0, min(roi_scene.y() * scale_y, image.shape[0]-1)))
-                w = int(min(roi_scene.width() * scale_x, image.shape[1]-x))
-                h = int(min(roi_scene.height() * scale_y, image.shape[0]-y))
-
-                # Extract ROI from image
-                roi_img = image[y:y+h, x:x+w]
-
-                if len(image.shape) == 3:  # Color image
-                    plt.subplot(len(rois), 2, 2*idx + 1)
-                    plt.imshow(cv2.cvtColor(roi_img, cv2.COLOR_BGR2RGB))
-                    plt.title(f'ROI {idx+1}')
-                    plt.axis('off')
-
-                    plt.subplot(len(rois), 2, 2*idx + 2)
-                    colors = ('b', 'g', 'r')
-                    for i, color in enumerate(colors):
-                        hist = cv2.calcHist([roi_img], [i], None, [256], [0, 256])
-                        plt.plot(hist, color=color)
-                    plt.title(f'ROI {idx+1} Histogram')
-                    plt.xlabel('Pixel Value')
-                    plt.ylabel('Count')
-                    plt.legend(['Blue', 'Green', 'Red'])
-                    plt.grid(True)
-                else:  # Grayscale image
-                    plt.subplot(len(rois), 2, 2*idx + 1)
-                    plt.imshow(roi_img, cmap='gray')
-                    plt.title(f'ROI {idx+1}')
-                    plt.axis('off')
-
-                    plt.subplot(len(rois), 2, 2*idx + 2)
-                    hist = cv2.calcHist([roi_img], [0], None, [256], [0, 256])
-                    plt.plot(hist)
-                    plt.title(f'ROI {idx+1} Histogram')
-                    plt.xlabel('Pixel Value')
-                    plt.ylabel('Count')
-                    plt.grid(True)
-
-            plt.tight_layout()
-            plt.show()
 
-        except Exception as e:
-            self.statusBar.showMessage(f'Error showing histogram: {str(e)}', 3000)
-            print(f"Error details: {str(e)}")  # For debugging
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    viewer = ImageViewer()
-    viewer.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    main()
\ No newline at end of file